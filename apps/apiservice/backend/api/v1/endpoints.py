@@ -21,6 +21,7 @@ from typing import Optional
 from pysrc.scraper.utils import convert_seed_type
 from pysrc.db.web_page import web_page_seed_from_dict, WebPage
 from pysrc.scraper.store import ServiceScraperStore
+from pysrc.scraper.crawler import RzDomainStats
 
 router = APIRouter()
 
@@ -60,6 +61,7 @@ async def detailed_health_check(
 @router.get("/web-pages")
 async def get_web_page_by_url(
     url: str,
+    include_content: bool = True,
     web_page_service: WebPageService = Depends(get_web_page_service)
 ) -> FAWebPage | None:
     try:
@@ -68,11 +70,11 @@ async def get_web_page_by_url(
         if web_page is None:
             logging.info(f"Web page not found for url: {url}")
             return None
-        web_page_content = await web_page_service.get_content(web_page)
+        web_page_content = await web_page_service.get_content(web_page, API_WEB_PAGE_FIELDS)
         if web_page_content is None:
             logging.info(f"Web page content not found for url: {url}")
             return None
-        return to_api_web_page(web_page, web_page_content) 
+        return await to_api_web_page(web_page, web_page_content, include_content)
     except Exception as e:
         logging.error(f"Error similar-embeddings: {str(e)}")
         raise HTTPException(
@@ -84,6 +86,7 @@ async def get_web_page_by_url(
 @router.get("/get-web-pages-by-channel-id")
 async def get_web_pages_by_channel_id(
     channel_id: str,
+    include_content: bool = True,
     web_page_service: WebPageService = Depends(get_web_page_service)
 ) -> list[FAWebPage]:
     try:
@@ -91,10 +94,10 @@ async def get_web_pages_by_channel_id(
         web_pages = await web_page_service.find_by_channel_id(channel_id)
         result = []
         for web_page in web_pages:
-            web_page_content = await web_page_service.get_content(web_page)
+            web_page_content = await web_page_service.get_content(web_page, API_WEB_PAGE_FIELDS)
             if web_page_content is None:
                 continue
-            result.append(to_api_web_page(web_page, web_page_content))
+            result.append(await to_api_web_page(web_page, web_page_content, include_content))
         return result
     except Exception as e:
         logging.error(f"Error fetching web pages by channel id: {str(e)}")
@@ -105,14 +108,17 @@ async def get_web_pages_by_channel_id(
     return []
 
 
-def to_api_web_page(web_page: WebPage, web_page_content: WebPageContent) -> FAWebPage:
+# the sections of a web page content the api returns, the raw html only when asked for
+API_WEB_PAGE_FIELDS = ("outgoing_urls", "visible_text", "sitemap_urls", "robots_content", "text_chunks")
+
+async def to_api_web_page(web_page: WebPage, web_page_content: WebPageContent, include_content: bool) -> FAWebPage:
     return FAWebPage(
             normalized_url_hash=web_page.normalized_url_hash,
             normalized_url=web_page.normalized_url,
             url=web_page.url,
             status_code=web_page.status_code,
             headers=web_page_content.headers,
-            content=web_page_content.content,
+            content=await web_page_content.load_content() if include_content else None,
             content_type=web_page_content.content_type,
             content_charset=web_page_content.content_charset,
             metadata_title=web_page_content.metadata_title,
@@ -170,9 +176,31 @@ async def scraper_run(
         success_urls_count=stats.success_urls_count,
         error_urls_count=stats.error_urls_count,
         skipped_urls_count=stats.skipped_urls_count,
+        prioritized_urls_count=stats.prioritized_urls_count,
+        fetches_saved_count=stats.fetches_saved_count,
+        change_detection_counts=stats.change_detection_counts,
+        revalidated_urls_count=stats.revalidated_urls_count,
+        not_modified_urls_count=stats.not_modified_urls_count,
+        bytes_saved=stats.bytes_saved,
+        seconds_saved=stats.seconds_saved,
+        write_flush_count=stats.write_flush_count,
+        write_max_queue_depth=stats.write_max_queue_depth,
+        write_average_flush_seconds=stats.write_average_flush_seconds,
+        incremental_skipped_urls_count=stats.incremental_skipped_urls_count,
+        incremental_skipped_sitemaps_count=stats.incremental_skipped_sitemaps_count,
 
         domain_stats={
             domain: FADomainStats(
+                domain=domain,
+                frequent_subpaths=domain_stats.frequent_subpaths,
+                concurrency=domain_stats.concurrency,
+                delay_seconds=domain_stats.delay_seconds,
+                timeout_seconds=domain_stats.timeout_seconds,
+                average_latency_seconds=domain_stats.average_latency_seconds,
+                requests_count=domain_stats.requests_count,
+                errors_count=domain_stats.errors_count,
+                throttled_count=domain_stats.throttled_count,
+            ) if isinstance(domain_stats, RzDomainStats) else FADomainStats(
                 domain=domain,
                 frequent_subpaths=domain_stats.frequent_subpaths
             ) for domain, domain_stats in stats.domain_stats.items()
@@ -41,6 +41,13 @@ class FAWebPageChannel(BaseModel):
 class FADomainStats(BaseModel):
     domain: str
     frequent_subpaths: dict[str, int]
+    concurrency: int|None = None
+    delay_seconds: float|None = None
+    timeout_seconds: float|None = None
+    average_latency_seconds: float|None = None
+    requests_count: int = 0
+    errors_count: int = 0
+    throttled_count: int = 0
 
 class FAScraperStats(BaseModel):
     queued_urls_count: int
@@ -48,6 +55,18 @@ class FAScraperStats(BaseModel):
     success_urls_count: int
     error_urls_count: int
     skipped_urls_count: int
+    prioritized_urls_count: int
+    fetches_saved_count: int
+    change_detection_counts: dict[str, int]
+    revalidated_urls_count: int
+    not_modified_urls_count: int
+    bytes_saved: int
+    seconds_saved: float
+    write_flush_count: int
+    write_max_queue_depth: int
+    write_average_flush_seconds: float
+    incremental_skipped_urls_count: int
+    incremental_skipped_sitemaps_count: int
     domain_stats: dict[str, FADomainStats]
     
 
@@ -41,6 +41,48 @@ export interface FADomainStats {
      * @memberof FADomainStats
      */
     'frequent_subpaths': { [key: string]: number; };
+    /**
+     * 
+     * @type {number}
+     * @memberof FADomainStats
+     */
+    'concurrency'?: number | null;
+    /**
+     * 
+     * @type {number}
+     * @memberof FADomainStats
+     */
+    'delay_seconds'?: number | null;
+    /**
+     * 
+     * @type {number}
+     * @memberof FADomainStats
+     */
+    'timeout_seconds'?: number | null;
+    /**
+     * 
+     * @type {number}
+     * @memberof FADomainStats
+     */
+    'average_latency_seconds'?: number | null;
+    /**
+     * 
+     * @type {number}
+     * @memberof FADomainStats
+     */
+    'requests_count'?: number;
+    /**
+     * 
+     * @type {number}
+     * @memberof FADomainStats
+     */
+    'errors_count'?: number;
+    /**
+     * 
+     * @type {number}
+     * @memberof FADomainStats
+     */
+    'throttled_count'?: number;
 }
 /**
  * 
@@ -219,6 +261,78 @@ export interface FAScraperStats {
      * @memberof FAScraperStats
      */
     'skipped_urls_count': number;
+    /**
+     * 
+     * @type {number}
+     * @memberof FAScraperStats
+     */
+    'prioritized_urls_count': number;
+    /**
+     * 
+     * @type {number}
+     * @memberof FAScraperStats
+     */
+    'fetches_saved_count': number;
+    /**
+     * 
+     * @type {{ [key: string]: number; }}
+     * @memberof FAScraperStats
+     */
+    'change_detection_counts': { [key: string]: number; };
+    /**
+     * 
+     * @type {number}
+     * @memberof FAScraperStats
+     */
+    'revalidated_urls_count': number;
+    /**
+     * 
+     * @type {number}
+     * @memberof FAScraperStats
+     */
+    'not_modified_urls_count': number;
+    /**
+     * 
+     * @type {number}
+     * @memberof FAScraperStats
+     */
+    'bytes_saved': number;
+    /**
+     * 
+     * @type {number}
+     * @memberof FAScraperStats
+     */
+    'seconds_saved': number;
+    /**
+     * 
+     * @type {number}
+     * @memberof FAScraperStats
+     */
+    'write_flush_count': number;
+    /**
+     * 
+     * @type {number}
+     * @memberof FAScraperStats
+     */
+    'write_max_queue_depth': number;
+    /**
+     * 
+     * @type {number}
+     * @memberof FAScraperStats
+     */
+    'write_average_flush_seconds': number;
+    /**
+     * 
+     * @type {number}
+     * @memberof FAScraperStats
+     */
+    'incremental_skipped_urls_count': number;
+    /**
+     * 
+     * @type {number}
+     * @memberof FAScraperStats
+     */
+    'incremental_skipped_sitemaps_count': number;
     /**
      * 
      * @type {{ [key: string]: FADomainStats; }}
@@ -52,7 +52,8 @@ async def publish_audio( normalized_url: str ) -> None:
         if web_page is None:
             logging.info(f"Skipping (no web page) processing summary for URL: {web_page_summary.normalized_url}")
             return
-        web_page_content = await web_page_service.get_content(web_page)
+        # only whether the content exists, none of its sections are decoded
+        web_page_content = await web_page_service.get_content(web_page, ())
         if web_page_content is None:
             logging.info(f"Skipping (no content) processing summary for URL: {web_page_summary.normalized_url}")
             return
@@ -121,6 +122,7 @@ async def main() -> None:
         task_manager.submit_task(unpublish_audio(normalized_url))        
 
     await task_manager.wait_all()
+    await Jobs.shutdown()
                 
     
 def cli() -> None:
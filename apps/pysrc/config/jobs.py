@@ -1,10 +1,14 @@
 from ..db.database import Database
 from .rzconfig import RzConfig
 from ..observe.log import Logging
+from ..dfs.storage import AsyncStorage
 
 class Jobs:
     @classmethod
     async def initialize(cls) -> None:
-        Logging.initialize(RzConfig.instance().google_account_file, RzConfig.instance().service_name, RzConfig.instance().env_name)        
+        Logging.initialize(RzConfig.instance().google_account_file, RzConfig.instance().service_name, RzConfig.instance().env_name)
 
-        
\ No newline at end of file
+    @classmethod
+    async def shutdown(cls) -> None:
+        # the storage client's keep-alive connections
+        await AsyncStorage.close_instance()
@@ -30,4 +30,55 @@ class RzConfig:
         self.image_resource_dir = os.getenv('IMAGE_RESOURCE_DIR', 'unknown')
         
         self.ollama_model = os.getenv('OLLAMA_MODEL', 'unknown')
-        self.dfs_bucket_prefix = os.getenv('DFS_BUCKET_PREFIX', 'unknown')
\ No newline at end of file
+        self.dfs_bucket_prefix = os.getenv('DFS_BUCKET_PREFIX', 'unknown')
+        # read-through disk cache of downloaded objects, shared by the containers mounting the directory, empty disables it
+        self.dfs_cache_dir = os.getenv('DFS_CACHE_DIR', '')
+        self.dfs_cache_max_bytes = int(os.getenv('DFS_CACHE_MAX_BYTES', str(10 * 1024 ** 3)))
+        # object storage: "async" is the aiohttp client of pysrc.dfs.storage, "firebase" the firebase_admin executor
+        self.dfs_backend = os.getenv('DFS_BACKEND', 'async')
+        self.dfs_bucket = os.getenv('DFS_BUCKET', 'radiozilla-92c5f.firebasestorage.app')
+        self.dfs_storage_url = os.getenv('DFS_STORAGE_URL', 'https://storage.googleapis.com')
+        # concurrent storage requests per process, attempts per request and resumable upload chunk size
+        self.dfs_concurrency = int(os.getenv('DFS_CONCURRENCY', '32'))
+        self.dfs_max_attempts = int(os.getenv('DFS_MAX_ATTEMPTS', '5'))
+        self.dfs_upload_chunk_bytes = int(os.getenv('DFS_UPLOAD_CHUNK_BYTES', str(8 * 1024 * 1024)))
+
+        # 0 runs CPU-bound scraper work in-process, unset defaults to the CPU count
+        process_pool_workers = os.getenv('PROCESS_POOL_WORKERS')
+        self.process_pool_workers = int(process_pool_workers) if process_pool_workers else None
+        self.process_pool_max_tasks_per_child = int(os.getenv('PROCESS_POOL_MAX_TASKS_PER_CHILD', '256'))
+
+        # write-behind buffer of scraped pages: rows per flush, seconds between flushes and concurrent DFS uploads
+        self.scraper_write_batch_size = int(os.getenv('SCRAPER_WRITE_BATCH_SIZE', '50'))
+        self.scraper_write_flush_seconds = float(os.getenv('SCRAPER_WRITE_FLUSH_SECONDS', '5'))
+        self.scraper_write_upload_concurrency = int(os.getenv('SCRAPER_WRITE_UPLOAD_CONCURRENCY', '8'))
+
+        # image stage: concurrent image downloads and thumbnail format, png or webp
+        self.scraper_image_workers = int(os.getenv('SCRAPER_IMAGE_WORKERS', '4'))
+        self.scraper_thumbnail_format = os.getenv('SCRAPER_THUMBNAIL_FORMAT', 'png')
+
+        # politeness: per-host request cap shared by all channels, starting, minimum and maximum delay between requests to a host
+        self.scraper_max_host_concurrency = int(os.getenv('SCRAPER_MAX_HOST_CONCURRENCY', '8'))
+        self.scraper_crawl_delay_seconds = float(os.getenv('SCRAPER_CRAWL_DELAY_SECONDS', '1'))
+        self.scraper_min_crawl_delay_seconds = float(os.getenv('SCRAPER_MIN_CRAWL_DELAY_SECONDS', '0.1'))
+        self.scraper_max_crawl_delay_seconds = float(os.getenv('SCRAPER_MAX_CRAWL_DELAY_SECONDS', '60'))
+        self.scraper_request_timeout_seconds = float(os.getenv('SCRAPER_REQUEST_TIMEOUT_SECONDS', '30'))
+
+        # shared crawl of all channels through one frontier: workers and pooled connections in total, workers one channel may occupy
+        self.scraper_shared_crawl_workers = int(os.getenv('SCRAPER_SHARED_CRAWL_WORKERS', '32'))
+        self.scraper_shared_crawl_channel_workers = int(os.getenv('SCRAPER_SHARED_CRAWL_CHANNEL_WORKERS', '8'))
+
+        # incremental crawl: queue only sitemap and feed entries whose lastmod/pubDate is newer than the last crawl
+        self.scraper_incremental = os.getenv('SCRAPER_INCREMENTAL', 'true').lower() in ('1', 'true', 'yes')
+
+        # crawl checkpoints for resuming interrupted crawls: write interval, size bounds, age after which a checkpoint is ignored
+        self.scraper_checkpoint_seconds = float(os.getenv('SCRAPER_CHECKPOINT_SECONDS', '60'))
+        self.scraper_checkpoint_max_pending_urls = int(os.getenv('SCRAPER_CHECKPOINT_MAX_PENDING_URLS', '50000'))
+        self.scraper_checkpoint_max_visited_urls = int(os.getenv('SCRAPER_CHECKPOINT_MAX_VISITED_URLS', '200000'))
+        self.scraper_checkpoint_max_age_hours = float(os.getenv('SCRAPER_CHECKPOINT_MAX_AGE_HOURS', '24'))
+
+        # sharded runs: channels a replica crawls at once, lease length, heartbeat interval, claims per channel and run
+        self.scraper_shard_channels = int(os.getenv('SCRAPER_SHARD_CHANNELS', '5'))
+        self.scraper_shard_lease_seconds = float(os.getenv('SCRAPER_SHARD_LEASE_SECONDS', '90'))
+        self.scraper_shard_heartbeat_seconds = float(os.getenv('SCRAPER_SHARD_HEARTBEAT_SECONDS', '20'))
+        self.scraper_shard_max_attempts = int(os.getenv('SCRAPER_SHARD_MAX_ATTEMPTS', '3'))
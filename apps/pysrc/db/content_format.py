@@ -0,0 +1,199 @@
+import json
+import struct
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Collection
+import zstandard
+
+# blob layout: MAGIC, version and header length, the zstd compressed json header with the scalar
+# fields and the section table, then every large field as its own zstd frame; an external section
+# has no frame, its value is stored in another object; a section compressed with a dictionary
+# names it in the section table
+MAGIC = b"RZWC"
+# readers accept older versions, bump on layout changes an older reader could not skip over:
+# 2 added external sections, 3 dictionary compressed sections
+FORMAT_VERSION = 3
+COMPRESSION_LEVEL = 3
+# fields stored as sections, decoded only when asked for; every other field goes in the header
+SECTION_FIELDS = frozenset(("content", "visible_text", "article_text", "outgoing_urls", "sitemap_urls", "feed_urls", "robots_content", "text_chunks"))
+# the raw html, what the pages of a channel share is its template
+DICTIONARY_FIELDS = frozenset(("content",))
+# largest dictionary trained, zstd's default size
+DICTIONARY_SIZE = 112_640
+
+_PREFIX = struct.Struct(">4sBI")
+
+def is_content_format(data: bytes) -> bool:
+    """False for the pickled blobs written before this format, a pickle starts with its protocol opcode."""
+    return data[:len(MAGIC)] == MAGIC
+
+def _encode_section(value: Any) -> tuple[str, bytes]:
+    if isinstance(value, bytes):
+        return "bytes", value
+    if isinstance(value, str):
+        return "text", value.encode("utf-8")
+    return "json", json.dumps(value, ensure_ascii=False).encode("utf-8")
+
+def _decode_section(kind: str, raw: bytes) -> Any:
+    if kind == "bytes":
+        return raw
+    if kind == "text":
+        return raw.decode("utf-8")
+    if kind == "json":
+        return json.loads(raw)
+    raise ValueError(f"Unsupported content section kind {kind}")
+
+def _encode_scalar(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return {"$datetime": value.isoformat()}
+    return value
+
+def _decode_scalar(value: Any) -> Any:
+    if isinstance(value, dict) and value.keys() == {"$datetime"}:
+        return datetime.fromisoformat(value["$datetime"])
+    return value
+
+class ContentDictionary:
+    """A trained zstd dictionary, its name is stored with every section it compressed and must never be reused."""
+
+    def __init__(self, name: str, data: bytes) -> None:
+        self.name = name
+        self.data = data
+        self._compression_dict: zstandard.ZstdCompressionDict | None = None
+
+    @property
+    def compression_dict(self) -> zstandard.ZstdCompressionDict:
+        if self._compression_dict is None:
+            compression_dict = zstandard.ZstdCompressionDict(self.data)
+            # the tables are built once per dictionary instead of once per compressor
+            compression_dict.precompute_compress(level=COMPRESSION_LEVEL)
+            self._compression_dict = compression_dict
+        return self._compression_dict
+
+def train_dictionary(name: str, samples: list[bytes], max_size: int = DICTIONARY_SIZE) -> ContentDictionary:
+    """
+    Raises zstandard.ZstdError when the samples are too few or too small to train on. The
+    dictionary is kept to a hundredth of the samples, zstd trains poor dictionaries from less.
+    """
+    size = min(max_size, max(sum(len(sample) for sample in samples) // 100, 4096))
+    return ContentDictionary(name, zstandard.train_dictionary(size, samples).as_bytes())
+
+def compressed_size(samples: list[bytes], dictionary: ContentDictionary | None = None) -> int:
+    """Bytes the samples take stored as raw bodies, to compare a dictionary with plain zstd."""
+    return sum(len(encode_fields({"content": sample}, dictionary=dictionary)) for sample in samples)
+
+class ContentDictionaryCache:
+    """The most recently used dictionaries by name, dictionaries are immutable so entries never go stale."""
+
+    def __init__(self, max_count: int = 64) -> None:
+        self.max_count = max_count
+        self._dictionaries: OrderedDict[str, ContentDictionary] = OrderedDict()
+
+    def get(self, name: str) -> ContentDictionary | None:
+        dictionary = self._dictionaries.get(name)
+        if dictionary is not None:
+            self._dictionaries.move_to_end(name)
+        return dictionary
+
+    def put(self, dictionary: ContentDictionary) -> None:
+        self._dictionaries[dictionary.name] = dictionary
+        self._dictionaries.move_to_end(dictionary.name)
+        while len(self._dictionaries) > self.max_count:
+            self._dictionaries.popitem(last=False)
+
+def encode_fields(fields: dict[str, Any], external_fields: Collection[str] = (), dictionary: ContentDictionary | None = None) -> bytes:
+    """
+    Sections in external_fields are only recorded in the section table, with their raw size. The
+    DICTIONARY_FIELDS sections are compressed with dictionary when given.
+    """
+    compressor = zstandard.ZstdCompressor(level=COMPRESSION_LEVEL)
+    dictionary_compressor = zstandard.ZstdCompressor(dict_data=dictionary.compression_dict) if dictionary is not None else None
+    scalars: dict[str, Any] = {}
+    sections: list[list[Any]] = []
+    frames: list[bytes] = []
+    offset = 0
+    for name, value in fields.items():
+        if name not in SECTION_FIELDS:
+            scalars[name] = _encode_scalar(value)
+        elif value is not None and name in external_fields:
+            sections.append([name, "external", 0, 0, len(value)])
+        elif value is not None:
+            kind, raw = _encode_section(value)
+            if dictionary is not None and dictionary_compressor is not None and name in DICTIONARY_FIELDS:
+                frame = dictionary_compressor.compress(raw)
+                sections.append([name, kind, offset, len(frame), len(raw), dictionary.name])
+            else:
+                frame = compressor.compress(raw)
+                sections.append([name, kind, offset, len(frame), len(raw)])
+            frames.append(frame)
+            offset += len(frame)
+    header = compressor.compress(json.dumps({"fields": scalars, "sections": sections}, ensure_ascii=False).encode("utf-8"))
+    return b"".join([_PREFIX.pack(MAGIC, FORMAT_VERSION, len(header)), header, *frames])
+
+class ContentReader:
+    """
+    Decodes the fields of one blob on demand: the header is read once and a section is only
+    decompressed when its field is asked for, so visible_text is read without the raw html.
+    """
+
+    def __init__(self, data: bytes) -> None:
+        magic, version, header_length = _PREFIX.unpack_from(data)
+        if magic != MAGIC:
+            raise ValueError("Not a content format blob")
+        if version > FORMAT_VERSION:
+            raise ValueError(f"Unsupported content format version {version}")
+        # slices of a memoryview do not copy the sections
+        self.data = memoryview(data)
+        self.version = version
+        self._decompressor = zstandard.ZstdDecompressor()
+        header = json.loads(self._decompressor.decompress(self.data[_PREFIX.size:_PREFIX.size + header_length]))
+        self._sections_start = _PREFIX.size + header_length
+        self._scalars: dict[str, Any] = header["fields"]
+        self._sections: dict[str, tuple[str, int, int, int]] = {
+            section[0]: (section[1], section[2], section[3], section[4]) for section in header["sections"]}
+        self._section_dictionaries: dict[str, str] = {section[0]: section[5] for section in header["sections"] if len(section) > 5}
+        self._dictionaries: dict[str, ContentDictionary] = {}
+
+    def names(self) -> set[str]:
+        return set(self._scalars) | set(self._sections)
+
+    def dictionary_names(self) -> set[str]:
+        """The dictionaries use_dictionary must be given before the sections they compressed are read."""
+        return set(self._section_dictionaries.values())
+
+    def use_dictionary(self, dictionary: ContentDictionary) -> None:
+        self._dictionaries[dictionary.name] = dictionary
+
+    def section_sizes(self) -> dict[str, tuple[int, int]]:
+        """(compressed, raw) bytes of every section."""
+        return {name: (length, raw_length) for name, (_, _, length, raw_length) in self._sections.items()}
+
+    def is_external(self, name: str) -> bool:
+        section = self._sections.get(name)
+        return section is not None and section[0] == "external"
+
+    def field(self, name: str) -> Any:
+        """The field's value, None for a field the blob does not have or stores in another object."""
+        if name in self._scalars:
+            return _decode_scalar(self._scalars[name])
+        section = self._sections.get(name)
+        if section is None or section[0] == "external":
+            return None
+        kind, offset, length, raw_length = section
+        start = self._sections_start + offset
+        decompressor = self._decompressor
+        dictionary_name = self._section_dictionaries.get(name)
+        if dictionary_name is not None:
+            dictionary = self._dictionaries.get(dictionary_name)
+            if dictionary is None:
+                raise ValueError(f"Section {name} needs dictionary {dictionary_name}")
+            decompressor = zstandard.ZstdDecompressor(dict_data=dictionary.compression_dict)
+        return _decode_section(kind, decompressor.decompress(self.data[start:start + length], max_output_size=raw_length))
+
+    def fields(self, names: Collection[str] | None = None) -> dict[str, Any]:
+        """Every scalar field and the sections in names, all sections when names is None, except external ones."""
+        values = {name: _decode_scalar(value) for name, value in self._scalars.items()}
+        for name in self._sections:
+            if (names is None or name in names) and not self.is_external(name):
+                values[name] = self.field(name)
+        return values
@@ -4,6 +4,7 @@ from sqlalchemy.ext.asyncio import async_sessionmaker
 from pysrc.config.rzconfig import RzConfig
 from pysrc.utils import asynchelper
 from .base import Base
+from .migrations import migrate
 import logging
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 from typing import AsyncGenerator
@@ -61,4 +62,5 @@ class Database:
     async def create_tables(cls):
         async with cls._engine.begin() as conn:
             await conn.run_sync(Base.metadata.create_all)
+            await migrate(conn)
         
\ No newline at end of file
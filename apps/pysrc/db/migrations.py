@@ -0,0 +1,45 @@
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+# create_all creates missing tables only, columns added to an existing table are added here.
+# Every statement is idempotent, they all run in order on every create_tables.
+MIGRATIONS: list[str] = [
+    # change detection hashes of the raw content and of the normalized text
+    "ALTER TABLE web_pages ADD COLUMN IF NOT EXISTS content_hash VARCHAR(32)",
+    "ALTER TABLE web_pages ADD COLUMN IF NOT EXISTS text_hash VARCHAR(32)",
+    # origin validators for conditional revalidation
+    "ALTER TABLE web_pages ADD COLUMN IF NOT EXISTS etag VARCHAR",
+    "ALTER TABLE web_pages ADD COLUMN IF NOT EXISTS last_modified VARCHAR",
+    # the channel of the page, the per channel queries of the scraper filter on it
+    "ALTER TABLE web_pages ADD COLUMN IF NOT EXISTS channel_normalized_url_hash VARCHAR(32)",
+    "CREATE INDEX IF NOT EXISTS ix_web_pages_channel_normalized_url_hash ON web_pages (channel_normalized_url_hash)",
+    # pages written before the column get a channel of their host, preferring the longest channel
+    # url that prefixes the page url; pages of no known host stay NULL until their next fetch
+    """
+    UPDATE web_pages SET channel_normalized_url_hash = matches.channel_normalized_url_hash
+    FROM (
+        SELECT DISTINCT ON (web_pages.normalized_url_hash)
+            web_pages.normalized_url_hash, web_page_channels.normalized_url_hash AS channel_normalized_url_hash
+        FROM web_pages
+        JOIN web_page_channels ON split_part(web_pages.normalized_url, '/', 3) = split_part(web_page_channels.normalized_url, '/', 3)
+        WHERE web_pages.channel_normalized_url_hash IS NULL
+        ORDER BY web_pages.normalized_url_hash,
+            starts_with(web_pages.normalized_url, web_page_channels.normalized_url) DESC,
+            length(web_page_channels.normalized_url) DESC
+    ) AS matches
+    WHERE web_pages.normalized_url_hash = matches.normalized_url_hash
+    """,
+    # near-duplicates are looked up across channels under one "article:" index, bands of the
+    # former per template indexes are never read again
+    "DELETE FROM web_page_min_hash_bands WHERE index_id NOT LIKE 'article:%'",
+    # the url classifier's label, pages written before the column are labelled from their stored metadata
+    "ALTER TABLE web_pages ADD COLUMN IF NOT EXISTS is_article BOOLEAN",
+    "UPDATE web_pages SET is_article = (coalesce(metadata_title, '') <> '' AND metadata_published_at IS NOT NULL) WHERE is_article IS NULL",
+    # rejected dictionary trainings are recorded on a row without a dictionary
+    "ALTER TABLE web_page_channel_dictionaries ALTER COLUMN name DROP NOT NULL",
+    "ALTER TABLE web_page_channel_dictionaries ADD COLUMN IF NOT EXISTS attempted_at TIMESTAMP WITHOUT TIME ZONE",
+]
+
+async def migrate(conn: AsyncConnection) -> None:
+    for statement in MIGRATIONS:
+        await conn.execute(text(statement))
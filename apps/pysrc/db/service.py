@@ -1,23 +1,27 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import text as sql_text, select, func
+from sqlalchemy import text as sql_text, select, func, update, delete, or_, any_, bindparam, tuple_, String
+from sqlalchemy.dialects.postgresql import ARRAY
 
-from pysrc.db.user import Audio, AudioContent, Channel
+from pysrc.db.user import Audio, AudioContent, AudioContentState, Channel
 from pysrc.db.upserter import Upserter
 from pysrc.config.rzconfig import RzConfig
-from pysrc.dfs.dfs import FRONTEND_IMAGES, WEB_IMAGES, WEB_PAGES_CONTENT, DFSClient
-from .web_page import WebImageContent, WebPage, WebPageContent, WebPageChannel, WebImage
+from pysrc.dfs.dfs import FRONTEND_IMAGES, WEB_IMAGES, WEB_PAGES_CONTENT, WEB_PAGES_RAW_CONTENT, WEB_PAGES_DICTIONARIES, DFSClient
+from pysrc.utils.parallel import ParallelTaskManager
+from .content_format import ContentDictionary, ContentDictionaryCache, ContentReader
+from .web_page import WebImageContent, WebPage, WebPageContent, LazyWebPageContent, WebPageChannel, WebImage, WebPageMinHashBand, WebPageChannelTemplate, WebPageChannelDictionary, WebPageChannelCrawlState, WebPageChannelCrawlCheckpoint, WebPageChannelLease
 import logging
 from pyminiscraper.url import normalized_url_hash
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
-from typing import Callable, Awaitable, Optional
+from typing import Callable, Awaitable, Optional, Collection
 from ..summarizer.texts import EmbeddingService
 from dataclasses import dataclass
 from sqlalchemy.orm import Mapped
-from datetime import datetime
+from datetime import datetime, timedelta
 import pickle
 import hashlib
 import base64
+import time
 
 from sqlalchemy.dialects.postgresql import insert as pg_insert
 
@@ -77,6 +81,196 @@ class WebPageChannelService:
         channels = result.all()
         return list(channels)
 
+class WebPageChannelTemplateService:
+
+    def __init__(self, session: AsyncSession) -> None:
+        self.session = session
+        self.logger = logging.getLogger("web_page_channel_template_service")
+
+    async def upsert(self, template: WebPageChannelTemplate) -> None:
+        await Upserter[WebPageChannelTemplate](self.session).upsert(template)
+
+    async def find_by_channel(self, channel_normalized_url_hash: str) -> WebPageChannelTemplate|None:
+        stmt = select(WebPageChannelTemplate).execution_options(readonly=True) \
+            .where(WebPageChannelTemplate.channel_normalized_url_hash == channel_normalized_url_hash)
+        result = await self.session.execute(stmt)
+        return result.scalar_one_or_none()
+
+class WebPageChannelDictionaryService:
+    """
+    Dictionaries are downloaded from DFS once per process and kept in memory by name; the current
+    version of a channel is looked up at most every CURRENT_TTL_SECONDS, so writers pick up a
+    retrained dictionary within that time.
+    """
+
+    CURRENT_TTL_SECONDS = 300.0
+    _dictionaries = ContentDictionaryCache()
+    _current_names: dict[str, tuple[float, str | None]] = {}
+
+    def __init__(self, session: AsyncSession) -> None:
+        self.session = session
+        self.logger = logging.getLogger("web_page_channel_dictionary_service")
+
+    async def upsert(self, channel_dictionary: WebPageChannelDictionary, dictionary: ContentDictionary) -> None:
+        """Uploads the dictionary before the row makes it the channel's current version."""
+        await DFSClient(RzConfig.instance()).upload_buffer(WEB_PAGES_DICTIONARIES, dictionary.name, dictionary.data)
+        await Upserter[WebPageChannelDictionary](self.session).upsert(channel_dictionary)
+        self._dictionaries.put(dictionary)
+        self._current_names[channel_dictionary.channel_normalized_url_hash] = (time.monotonic(), dictionary.name)
+
+    async def record_attempt(self, channel_normalized_url_hash: str, attempted_at: datetime) -> None:
+        """Records a training that kept no dictionary, the channel's current version stays."""
+        stmt = pg_insert(WebPageChannelDictionary).values(
+            channel_normalized_url_hash=channel_normalized_url_hash, version=0, attempted_at=attempted_at,
+        ).on_conflict_do_update(
+            index_elements=[WebPageChannelDictionary.channel_normalized_url_hash],
+            set_=dict(attempted_at=attempted_at),
+        )
+        await self.session.execute(stmt)
+
+    async def find_by_channel(self, channel_normalized_url_hash: str) -> WebPageChannelDictionary|None:
+        stmt = select(WebPageChannelDictionary).execution_options(readonly=True) \
+            .where(WebPageChannelDictionary.channel_normalized_url_hash == channel_normalized_url_hash)
+        result = await self.session.execute(stmt)
+        return result.scalar_one_or_none()
+
+    async def get_dictionary(self, name: str) -> ContentDictionary:
+        dictionary = self._dictionaries.get(name)
+        if dictionary is None:
+            data = await DFSClient(RzConfig.instance()).download_buffer(WEB_PAGES_DICTIONARIES, name)
+            dictionary = ContentDictionary(name, data)
+            self._dictionaries.put(dictionary)
+        return dictionary
+
+    async def find_current_dictionary(self, channel_normalized_url_hash: str) -> ContentDictionary | None:
+        cached = self._current_names.get(channel_normalized_url_hash)
+        if cached is None or time.monotonic() - cached[0] > self.CURRENT_TTL_SECONDS:
+            channel_dictionary = await self.find_by_channel(channel_normalized_url_hash)
+            cached = (time.monotonic(), channel_dictionary.name if channel_dictionary else None)
+            self._current_names[channel_normalized_url_hash] = cached
+        return await self.get_dictionary(cached[1]) if cached[1] is not None else None
+
+    async def decode_content(self, data: bytes) -> bytes | None:
+        """The raw body of a WEB_PAGES_RAW_CONTENT object, with the dictionaries it was compressed with."""
+        reader = ContentReader(data)
+        for name in reader.dictionary_names():
+            reader.use_dictionary(await self.get_dictionary(name))
+        return reader.field("content")
+
+class WebPageChannelCrawlStateService:
+
+    def __init__(self, session: AsyncSession) -> None:
+        self.session = session
+        self.logger = logging.getLogger("web_page_channel_crawl_state_service")
+
+    async def upsert(self, crawl_state: WebPageChannelCrawlState) -> None:
+        await Upserter[WebPageChannelCrawlState](self.session).upsert(crawl_state)
+
+    async def find_by_channel(self, channel_normalized_url_hash: str) -> WebPageChannelCrawlState|None:
+        stmt = select(WebPageChannelCrawlState).execution_options(readonly=True) \
+            .where(WebPageChannelCrawlState.channel_normalized_url_hash == channel_normalized_url_hash)
+        result = await self.session.execute(stmt)
+        return result.scalar_one_or_none()
+
+class WebPageChannelCrawlCheckpointService:
+
+    def __init__(self, session: AsyncSession) -> None:
+        self.session = session
+        self.logger = logging.getLogger("web_page_channel_crawl_checkpoint_service")
+
+    async def upsert(self, crawl_checkpoint: WebPageChannelCrawlCheckpoint) -> None:
+        await Upserter[WebPageChannelCrawlCheckpoint](self.session).upsert(crawl_checkpoint)
+
+    async def find_by_channel(self, channel_normalized_url_hash: str) -> WebPageChannelCrawlCheckpoint|None:
+        stmt = select(WebPageChannelCrawlCheckpoint).execution_options(readonly=True) \
+            .where(WebPageChannelCrawlCheckpoint.channel_normalized_url_hash == channel_normalized_url_hash)
+        result = await self.session.execute(stmt)
+        return result.scalar_one_or_none()
+
+    async def delete(self, channel_normalized_url_hash: str) -> None:
+        await self.session.execute(delete(WebPageChannelCrawlCheckpoint)
+            .where(WebPageChannelCrawlCheckpoint.channel_normalized_url_hash == channel_normalized_url_hash))
+
+class WebPageChannelLeaseService:
+    """
+    Leases of a sharded scraper run: every replica claims the next free channel with FOR UPDATE
+    SKIP LOCKED, so concurrent claims never wait on or return the same row, and keeps it by
+    heartbeating. All times are the database's, replicas' clocks never need to agree.
+    """
+
+    def __init__(self, session: AsyncSession) -> None:
+        self.session = session
+        self.logger = logging.getLogger("web_page_channel_lease_service")
+
+    async def create_run(self, run_id: str, channel_normalized_url_hashes: list[str]) -> None:
+        """Adds the channels to the run, every replica calls it, existing leases are kept."""
+        if not channel_normalized_url_hashes:
+            return
+        stmt = pg_insert(WebPageChannelLease).values([
+            dict(run_id=run_id, channel_normalized_url_hash=channel_normalized_url_hash, attempts=0)
+            for channel_normalized_url_hash in channel_normalized_url_hashes
+        ]).on_conflict_do_nothing()
+        await self.session.execute(stmt)
+
+    async def claim(self, run_id: str, holder: str, lease_seconds: float, max_attempts: int) -> tuple[str, int]|None:
+        """
+        Leases an unfinished channel that is unclaimed or whose holder stopped heartbeating, as one
+        statement so the row lock lasts exactly as long as the claim. Returns (channel hash, attempt).
+        """
+        claimable = select(WebPageChannelLease.channel_normalized_url_hash) \
+            .where(WebPageChannelLease.run_id == run_id,
+                   WebPageChannelLease.finished_at.is_(None),
+                   WebPageChannelLease.attempts < max_attempts,
+                   or_(WebPageChannelLease.leased_until.is_(None), WebPageChannelLease.leased_until < func.now())) \
+            .order_by(WebPageChannelLease.attempts, WebPageChannelLease.channel_normalized_url_hash) \
+            .limit(1) \
+            .with_for_update(skip_locked=True)
+        stmt = update(WebPageChannelLease) \
+            .where(WebPageChannelLease.run_id == run_id,
+                   WebPageChannelLease.channel_normalized_url_hash == claimable.scalar_subquery()) \
+            .values(holder=holder,
+                    leased_until=func.now() + timedelta(seconds=lease_seconds),
+                    heartbeat_at=func.now(),
+                    attempts=WebPageChannelLease.attempts + 1) \
+            .returning(WebPageChannelLease.channel_normalized_url_hash, WebPageChannelLease.attempts)
+        row = (await self.session.execute(stmt)).one_or_none()
+        return (row.channel_normalized_url_hash, row.attempts) if row is not None else None
+
+    async def renew(self, run_id: str, channel_normalized_url_hash: str, holder: str, lease_seconds: float) -> bool:
+        """Heartbeat, False once the lease expired and another replica claimed the channel."""
+        stmt = update(WebPageChannelLease) \
+            .where(WebPageChannelLease.run_id == run_id,
+                   WebPageChannelLease.channel_normalized_url_hash == channel_normalized_url_hash,
+                   WebPageChannelLease.holder == holder,
+                   WebPageChannelLease.finished_at.is_(None)) \
+            .values(leased_until=func.now() + timedelta(seconds=lease_seconds), heartbeat_at=func.now())
+        result = await self.session.execute(stmt)
+        return result.rowcount > 0
+
+    async def finish(self, run_id: str, channel_normalized_url_hash: str, holder: str) -> None:
+        await self.session.execute(update(WebPageChannelLease)
+            .where(WebPageChannelLease.run_id == run_id,
+                   WebPageChannelLease.channel_normalized_url_hash == channel_normalized_url_hash,
+                   WebPageChannelLease.holder == holder)
+            .values(finished_at=func.now(), leased_until=None))
+
+    async def release(self, run_id: str, channel_normalized_url_hash: str, holder: str) -> None:
+        """Gives a failed channel back right away instead of after its lease expires."""
+        await self.session.execute(update(WebPageChannelLease)
+            .where(WebPageChannelLease.run_id == run_id,
+                   WebPageChannelLease.channel_normalized_url_hash == channel_normalized_url_hash,
+                   WebPageChannelLease.holder == holder,
+                   WebPageChannelLease.finished_at.is_(None))
+            .values(leased_until=None))
+
+    async def count_unfinished(self, run_id: str, max_attempts: int) -> int:
+        """Channels still leased or waiting for a claim, 0 once the run is over for every replica."""
+        stmt = select(func.count()).select_from(WebPageChannelLease).execution_options(readonly=True) \
+            .where(WebPageChannelLease.run_id == run_id,
+                   WebPageChannelLease.finished_at.is_(None),
+                   or_(WebPageChannelLease.attempts < max_attempts, WebPageChannelLease.leased_until >= func.now()))
+        return (await self.session.execute(stmt)).scalar_one()
+
 class WebImageService:
     
     def __init__(self, session: AsyncSession) -> None:
@@ -136,14 +330,45 @@ class WebPageService:
         self.session = session
         self.logger = logging.getLogger("web_page_service")
 
-    async def upsert(self, web_page: WebPage, web_page_content: WebPageContent) -> None:
-        await DFSClient(RzConfig.instance()).upload_buffer(
-            WEB_PAGES_CONTENT, 
-            web_page.normalized_url_hash,
-            web_page_content.to_bytes(),
-        )
+    async def _upload_content(self, dfs_client: DFSClient, web_page: WebPage, web_page_content: WebPageContent, dictionary: ContentDictionary | None) -> None:
+        """The raw body and the extracted fields as separate objects, the body first so the fields never point at a missing one."""
+        await web_page_content.load_content()
+        raw_content = web_page_content.content_to_bytes(dictionary)
+        if raw_content is not None:
+            await dfs_client.upload_buffer(WEB_PAGES_RAW_CONTENT, web_page.normalized_url_hash, raw_content)
+        await dfs_client.upload_buffer(WEB_PAGES_CONTENT, web_page.normalized_url_hash, web_page_content.to_bytes(external_content=True))
+
+    async def upsert(self, web_page: WebPage, web_page_content: WebPageContent, dictionary: ContentDictionary | None = None) -> None:
+        """dictionary is the current one of the page's channel, see WebPageChannelDictionaryService.find_current_dictionary."""
+        await self._upload_content(DFSClient(RzConfig.instance()), web_page, web_page_content, dictionary)
         await Upserter[WebPage](self.session).upsert(web_page)        
         
+    async def upsert_many(self, 
+                          web_pages: list[tuple[WebPage, WebPageContent]], 
+                          max_concurrent_uploads: int = 8, 
+                          dictionary: ContentDictionary | None = None) -> list[WebPage]:
+        """
+        Uploads the contents concurrently, then writes the rows of the uploaded pages in multi-row
+        upserts so no row points at missing content. Returns the written pages. The pages are of
+        one channel, dictionary is its current one.
+        """
+        dfs_client = DFSClient(RzConfig.instance())
+
+        async def upload(web_page: WebPage, web_page_content: WebPageContent) -> WebPage | None:
+            try:
+                await self._upload_content(dfs_client, web_page, web_page_content, dictionary)
+                return web_page
+            except Exception as e:
+                self.logger.error(f"Failed to upload content for {web_page.normalized_url}: {e}")
+                return None
+
+        task_manager = ParallelTaskManager[WebPage | None](max_concurrent_uploads)
+        for web_page, web_page_content in web_pages:
+            task_manager.submit_function(upload, web_page, web_page_content)
+        uploaded_web_pages = [web_page for web_page in await task_manager.wait_all() if web_page is not None]
+        await Upserter[WebPage](self.session).upsert_many(uploaded_web_pages)
+        return uploaded_web_pages
+
 
     async def find_by_url(self, normalized_url: str) -> WebPage|None:
         hash = normalized_url_hash(normalized_url)
@@ -158,29 +383,125 @@ class WebPageService:
         result = await self.session.scalars(stmt)
         return list(result.all())
     
+    async def find_recent(self, limit: int) -> list[WebPage]:
+        stmt = select(WebPage).execution_options(readonly=True) \
+            .order_by(WebPage.requested_at.desc()) \
+            .limit(limit)
+        result = await self.session.scalars(stmt)
+        return list(result.all())
+    
     async def find_normalized_urls_by_channel(self, channel_normalized_url_hash: str) -> list[str]:
         stmt = select(WebPage.normalized_url).where(WebPage.channel_normalized_url_hash == channel_normalized_url_hash)    
         result = await self.session.execute(stmt)
         return list(result.scalars().all())
     
-    async def get_content(self, web_page: WebPage) -> WebPageContent | None:
+    async def find_sample_by_channel(self, channel_normalized_url_hash: str, sample_size: int) -> list[WebPage]:
+        """Up to sample_size random successfully fetched pages of the channel, in one query."""
+        stmt = select(WebPage).execution_options(readonly=True) \
+            .where(WebPage.channel_normalized_url_hash == channel_normalized_url_hash, WebPage.status_code == 200) \
+            .order_by(func.random()) \
+            .limit(sample_size)
+        result = await self.session.scalars(stmt)
+        return list(result.all())
+
+    async def find_url_training_pages_by_channel(self, channel_normalized_url_hash: str) -> list[tuple[str, bool]]:
+        """(normalized_url, is_article) of every page of the channel."""
+        stmt = select(WebPage.normalized_url, WebPage.is_article).where(
+            WebPage.channel_normalized_url_hash == channel_normalized_url_hash).execution_options(readonly=True)
+        result = await self.session.execute(stmt)
+        return [(row[0], bool(row[1])) for row in result.all()]
+    
+    async def find_url_index_by_channel(self, channel_normalized_url_hash: str) -> list[tuple[str, datetime | None, bool]]:
+        """(normalized_url_hash, requested_at, has_validators) of every page of the channel."""
+        stmt = select(
+                WebPage.normalized_url_hash,
+                WebPage.requested_at,
+                or_(WebPage.etag.is_not(None), WebPage.last_modified.is_not(None))) \
+            .where(WebPage.channel_normalized_url_hash == channel_normalized_url_hash) \
+            .execution_options(readonly=True)
+        result = await self.session.execute(stmt)
+        return [(row[0], row[1], bool(row[2])) for row in result.all()]
+    
+    async def get_content(self, web_page: WebPage, field_names: Collection[str] | None = None) -> WebPageContent | None:
+        """
+        The stored content, with only the large fields in field_names decoded when given. The raw
+        body is downloaded only when field_names is None or has "content", otherwise the content is
+        a LazyWebPageContent downloading it on load_content.
+        """
         try:
             dfs_client = DFSClient(RzConfig.instance())
             content = await dfs_client.download_buffer(
                 WEB_PAGES_CONTENT, 
                 web_page.normalized_url_hash)
-            return WebPageContent.from_bytes(content)
+
+            async def load_raw_content() -> bytes | None:
+                raw_content = await dfs_client.download_buffer(WEB_PAGES_RAW_CONTENT, web_page.normalized_url_hash)
+                return await WebPageChannelDictionaryService(self.session).decode_content(raw_content)
+
+            web_page_content = WebPageContent.from_bytes(content, field_names, load_raw_content)
+            if isinstance(web_page_content, LazyWebPageContent) and (field_names is None or "content" in field_names):
+                await web_page_content.load_content()
+            return web_page_content
         except Exception as e:
             self.logger.error(f"Failed to get content for {web_page.normalized_url}: {e}")
             return None
     
-    async def set_content(self, web_page: WebPage, content: WebPageContent) -> None:
-        dfs_client = DFSClient(RzConfig.instance())
-        await dfs_client.upload_buffer(
-            WEB_PAGES_CONTENT, 
-            web_page.normalized_url_hash,
-            content.to_bytes(),
-        )
+    async def update_min_hashes(self, web_page: WebPage, min_hashes: dict[str, str]) -> None:
+        stmt = update(WebPage) \
+            .where(WebPage.normalized_url_hash == web_page.normalized_url_hash) \
+            .values(min_hashes=min_hashes)
+        await self.session.execute(stmt)
+    
+    async def update_fetch_state(self, web_page: WebPage, requested_at: datetime | None, etag: str | None, last_modified: str | None) -> None:
+        """Records a fetch that did not change the stored content, and the page's channel and label when they are set."""
+        values = dict(requested_at=requested_at, etag=etag, last_modified=last_modified)
+        if web_page.channel_normalized_url_hash is not None:
+            values["channel_normalized_url_hash"] = web_page.channel_normalized_url_hash
+        if web_page.is_article is not None:
+            values["is_article"] = web_page.is_article
+        stmt = update(WebPage) \
+            .where(WebPage.normalized_url_hash == web_page.normalized_url_hash) \
+            .values(**values)
+        await self.session.execute(stmt)
+    
+    async def set_content(self, web_page: WebPage, content: WebPageContent, dictionary: ContentDictionary | None = None) -> None:
+        await self._upload_content(DFSClient(RzConfig.instance()), web_page, content, dictionary)
+
+    async def find_min_hashes(self, normalized_url_hashes: list[str]) -> dict[str, dict[str, str]]:
+        stmt = select(WebPage.normalized_url_hash, WebPage.min_hashes) \
+            .where(WebPage.normalized_url_hash.in_(normalized_url_hashes))
+        result = await self.session.execute(stmt)
+        return {row.normalized_url_hash: row.min_hashes for row in result if row.min_hashes}
+
+
+class WebPageMinHashBandService:
+
+    def __init__(self, session: AsyncSession) -> None:
+        self.session = session
+        self.logger = logging.getLogger("web_page_min_hash_band_service")
+
+    async def replace(self, index_id: str, normalized_url_hash: str, band_hashes: list[int]) -> None:
+        """The page's bands under index_id, its bands under any other index are stale and deleted."""
+        await self.session.execute(delete(WebPageMinHashBand).where(
+            WebPageMinHashBand.normalized_url_hash == normalized_url_hash))
+        if not band_hashes:
+            return
+        stmt = pg_insert(WebPageMinHashBand).values([
+            dict(index_id=index_id, band=band, band_hash=band_hash, normalized_url_hash=normalized_url_hash)
+            for band, band_hash in enumerate(band_hashes)
+        ]).on_conflict_do_nothing()
+        await self.session.execute(stmt)
+
+    async def find_candidates(self, index_id: str, band_hashes: list[int]) -> set[str]:
+        """Pages sharing at least one band hash, band by band, with the given ones."""
+        if not band_hashes:
+            return set()
+        stmt = select(WebPageMinHashBand.normalized_url_hash).distinct() \
+            .where(WebPageMinHashBand.index_id == index_id,
+                   tuple_(WebPageMinHashBand.band, WebPageMinHashBand.band_hash).in_(list(enumerate(band_hashes)))) \
+            .execution_options(readonly=True)
+        result = await self.session.execute(stmt)
+        return set(result.scalars().all())
 
    
 class AudioContentService:
@@ -192,12 +513,47 @@ class AudioContentService:
 
     async def upsert(self, audio_job: AudioContent) -> None:
         await Upserter[AudioContent](self.session).upsert(audio_job)        
+
+    async def upsert_many(self, audio_contents: list[AudioContent]) -> None:
+        """Audio contents without an id update the existing row of their web page, if there is one."""
+        missing_ids = [audio_content.web_page_normalized_url_hash for audio_content in audio_contents if audio_content.id is None]
+        if missing_ids:
+            stmt = select(AudioContent.web_page_normalized_url_hash, AudioContent.id) \
+                .where(AudioContent.web_page_normalized_url_hash.in_(missing_ids)) \
+                .execution_options(readonly=True)
+            result = await self.session.execute(stmt)
+            existing_ids = {row[0]: row[1] for row in result.all()}
+            for audio_content in audio_contents:
+                if audio_content.id is None:
+                    audio_content.id = existing_ids.get(audio_content.web_page_normalized_url_hash)
+        await Upserter[AudioContent](self.session).upsert_many(audio_contents)
                 
     async def find_by_url(self, normalized_url: str) -> AudioContent|None:
         hash = normalized_url_hash(normalized_url)
         stmt = select(AudioContent).execution_options(readonly=True).where(AudioContent.web_page_normalized_url_hash == hash)
         result = await self.session.execute(stmt)
         return result.scalar_one_or_none()
+
+    async def find_unhidden_by_channel(self, channel_normalized_url_hash: str) -> list[tuple[str, str]]:
+        """(normalized_url, normalized_url_hash) of every page of the channel with audio content that is not hidden."""
+        stmt = select(WebPage.normalized_url, WebPage.normalized_url_hash) \
+            .join(AudioContent, AudioContent.web_page_normalized_url_hash == WebPage.normalized_url_hash) \
+            .where(WebPage.channel_normalized_url_hash == channel_normalized_url_hash,
+                   AudioContent.state != AudioContentState.HIDDEN) \
+            .execution_options(readonly=True)
+        result = await self.session.execute(stmt)
+        return [(row[0], row[1]) for row in result.all()]
+
+    async def hide_many(self, web_page_normalized_url_hashes: list[str]) -> int:
+        """Hides the audio contents of the pages in one statement, returns how many changed."""
+        if not web_page_normalized_url_hashes:
+            return 0
+        stmt = update(AudioContent) \
+            .where(AudioContent.web_page_normalized_url_hash == any_(bindparam("hashes", web_page_normalized_url_hashes, type_=ARRAY(String))),
+                   AudioContent.state != AudioContentState.HIDDEN) \
+            .values(state=AudioContentState.HIDDEN)
+        result = await self.session.execute(stmt)
+        return result.rowcount
     
 
 @dataclass
@@ -1,4 +1,4 @@
-from typing import TypeVar, Generic, Dict, Any, Optional
+from typing import TypeVar, Generic, Dict, Any, Optional, List, Sequence
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.orm import DeclarativeBase
@@ -6,6 +6,9 @@ from sqlalchemy.inspection import inspect
 
 ModelType = TypeVar('ModelType', bound=DeclarativeBase)
 
+# postgres accepts at most 32767 bind parameters per statement
+MAX_BIND_PARAMETERS = 32767
+
 class Upserter(Generic[ModelType]):
 
     def __init__(self, session: AsyncSession) -> None:
@@ -38,3 +41,42 @@ class Upserter(Generic[ModelType]):
         
         result = await self.session.execute(stmt)
         return result.scalar_one_or_none()
+
+    async def upsert_many(self, instances: Sequence[ModelType]) -> None:
+        """
+        Multi-row upsert, None attributes are skipped like in upsert. Rows are grouped by the
+        columns they set, each group is written with as few INSERT ... ON CONFLICT statements
+        as the bind parameter limit allows. The last instance wins for repeated primary keys.
+        """
+        if not instances:
+            return
+        model_class = instances[0].__class__
+        columns = inspect(model_class).columns
+        primary_key_keys = [column.key for column in inspect(model_class).primary_key]
+
+        rows: Dict[Any, Dict[str, Any]] = {}
+        for position, instance in enumerate(instances):
+            instance_dict = {
+                column.key: getattr(instance, column.key)
+                for column in columns
+                if hasattr(instance, column.key) and
+                getattr(instance, column.key) is not None
+            }
+            primary_key = tuple(instance_dict.get(key) for key in primary_key_keys)
+            # rows without a primary key are generated by the database and never conflict
+            rows[primary_key if None not in primary_key else ("new", position)] = instance_dict
+
+        groups: Dict[tuple[str, ...], List[Dict[str, Any]]] = {}
+        for instance_dict in rows.values():
+            groups.setdefault(tuple(instance_dict.keys()), []).append(instance_dict)
+
+        primary_key_columns = [getattr(model_class, key) for key in primary_key_keys]
+        for keys, group in groups.items():
+            chunk_size = max(1, MAX_BIND_PARAMETERS // len(keys))
+            for start in range(0, len(group), chunk_size):
+                stmt = pg_insert(model_class).values(group[start:start + chunk_size])
+                stmt = stmt.on_conflict_do_update(
+                    index_elements=primary_key_columns,
+                    set_={key: stmt.excluded[key] for key in keys}
+                )
+                await self.session.execute(stmt)
@@ -1,14 +1,15 @@
 import pickle
-from sqlalchemy import Index, Integer, DateTime, event,LargeBinary, Boolean, Any, Tuple
+from sqlalchemy import Index, Integer, BigInteger, DateTime, Float, event,LargeBinary, Boolean, Tuple
 from sqlalchemy.orm import Mapped, mapped_column
 from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy import String
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Collection, Callable, Awaitable, Any
 from datetime import datetime
 from .base import TimestampModel
 from pyminiscraper.url import normalized_url_hash, normalize_url
 from enum import Enum
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, asdict, fields
+from .content_format import ContentDictionary, ContentReader, encode_fields, is_content_format
 
 class WebPageSeedType(str, Enum):
     HTML = "HTML"
@@ -151,13 +152,103 @@ class WebPageContent:
     feed_urls: List[str] | None
     robots_content: List[str] | None
     text_chunks: List[str] | None
+    # main content without page chrome, None when no article body was found
+    article_text: str | None = None
 
-    def to_bytes(self) -> bytes:
-        return pickle.dumps(self)
+    def to_bytes(self, external_content: bool = False) -> bytes:
+        """With external_content the raw body is left out, to be stored as its own object from content_to_bytes."""
+        return encode_fields({field.name: getattr(self, field.name) for field in fields(self)}, ("content",) if external_content else ())
+
+    async def load_content(self) -> bytes | None:
+        """The raw body, a LazyWebPageContent downloads it on the first call."""
+        return self.content
+
+    @property
+    def content_size(self) -> int:
+        """Bytes of the raw body, known without loading it."""
+        return len(self.content or b"")
+
+    def content_to_bytes(self, dictionary: ContentDictionary | None = None) -> bytes | None:
+        """The raw body as its own object, compressed with the channel's dictionary when it has one."""
+        return None if self.content is None else encode_fields({"content": self.content}, dictionary=dictionary)
+
+    @staticmethod
+    def content_from_bytes(data: bytes, dictionaries: Collection[ContentDictionary] = ()) -> bytes | None:
+        reader = ContentReader(data)
+        for dictionary in dictionaries:
+            reader.use_dictionary(dictionary)
+        return reader.field("content")
     
     @classmethod
-    def from_bytes(cls, data: bytes) -> "WebPageContent":
-        return pickle.loads(data)
+    def from_bytes(cls, 
+                   data: bytes, 
+                   field_names: Collection[str] | None = None, 
+                   load_external_content: Callable[[], Awaitable[bytes | None]] | None = None) -> "WebPageContent":
+        """
+        Decodes the scalar fields and the section fields in field_names, all of them when None; the
+        other section fields are left None, so a partially decoded content must not be stored back.
+        With load_external_content a content whose raw body was not decoded, because it was not
+        asked for or is stored as its own object, is returned as a LazyWebPageContent.
+        Blobs pickled before the content format are still read, always whole.
+        """
+        if not is_content_format(data):
+            return pickle.loads(data)
+        reader = ContentReader(data)
+        values = reader.fields(field_names)
+        # fields a newer writer added are skipped, fields an older writer did not have are None
+        field_values = {field.name: values.get(field.name) for field in fields(WebPageContent)}
+        if load_external_content is None or "content" in values:
+            return cls(**field_values)
+        _, content_size = reader.section_sizes().get("content", (0, 0))
+        if reader.is_external("content"):
+            return LazyWebPageContent(load_external_content, content_size, **field_values)
+        async def load_content() -> bytes | None:
+            return reader.field("content")
+        return LazyWebPageContent(load_content, content_size, **field_values)
+
+class WebPageContentNotLoadedException(Exception):
+    pass
+
+class LazyWebPageContent(WebPageContent):
+    """
+    A WebPageContent without its raw body: the summarizer, publisher and api mostly need the
+    extracted text and metadata, the html is downloaded by the first load_content. Reading
+    .content before that raises, a fetch cannot hide behind an attribute in async code.
+    """
+
+    def __init__(self, load_content: Callable[[], Awaitable[bytes | None]], content_size: int = 0, **field_values: Any) -> None:
+        super().__init__(**field_values)
+        self._load_content = load_content
+        self._content_loaded = False
+        # from the blob's section table, the body need not be loaded to know it
+        self._content_size = content_size
+
+    @property  # type: ignore[override]
+    def content(self) -> bytes | None:
+        if not self._content_loaded:
+            raise WebPageContentNotLoadedException(f"Content of {self.normalized_url} is not loaded, await load_content() first")
+        return self._content
+
+    @content.setter
+    def content(self, content: bytes | None) -> None:
+        self._content = content
+        self._content_loaded = True
+
+    @property
+    def content_loaded(self) -> bool:
+        return self._content_loaded
+
+    @property
+    def content_size(self) -> int:
+        return len(self._content or b"") if self._content_loaded else self._content_size
+
+    async def load_content(self) -> bytes | None:
+        if not self._content_loaded:
+            self.content = await self._load_content()
+        return self._content
+
+    def __repr__(self) -> str:
+        return f"LazyWebPageContent(normalized_url={self.normalized_url!r}, content_loaded={self._content_loaded})"
 
 
 class WebPage(TimestampModel):
@@ -167,14 +258,24 @@ class WebPage(TimestampModel):
     normalized_url: Mapped[str] = mapped_column(String)    
     url: Mapped[str] = mapped_column(String)
     web_channel_id: Mapped[int] = mapped_column(Integer)
+    # normalized_url_hash of the WebPageChannel the page was scraped for
+    channel_normalized_url_hash: Mapped[Optional[str]] = mapped_column(String(32), nullable=True, default=None, index=True)
     status_code: Mapped[int] = mapped_column(Integer)
     requested_at: Mapped[datetime] = mapped_column(DateTime, nullable=True, default=None)
     min_hashes: Mapped[Dict[str, str]] = mapped_column(JSONB, nullable=True, default=dict)    
+    # change detection: hash of the raw content bytes and of the normalized text signatures are computed from
+    content_hash: Mapped[Optional[str]] = mapped_column(String(32), nullable=True, default=None)
+    text_hash: Mapped[Optional[str]] = mapped_column(String(32), nullable=True, default=None)
+    # origin validators for conditional revalidation
+    etag: Mapped[Optional[str]] = mapped_column(String, nullable=True, default=None)
+    last_modified: Mapped[Optional[str]] = mapped_column(String, nullable=True, default=None)
     
     metadata_title: Mapped[Optional[str]] = mapped_column(String, nullable=True, default=None)
     metadata_description: Mapped[Optional[str]] = mapped_column(String, nullable=True, default=None)
     metadata_image_url: Mapped[Optional[str]] = mapped_column(String, nullable=True, default=None)
     metadata_published_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True, default=None)
+    # the url classifier's label, a title and a publication date in the metadata or in the url
+    is_article: Mapped[Optional[bool]] = mapped_column(Boolean, nullable=True, default=None)
     
 # Automatically set hash when content is modified
 @event.listens_for(WebPage.url, 'set')
@@ -190,3 +291,69 @@ def web_page_ensure_hash(mapper, connection, target: WebPage):
         target.normalized_url = normalize_url(target.url)
         target.normalized_url_hash = normalized_url_hash(target.normalized_url)        
 
+class WebPageMinHashBand(TimestampModel):
+    __tablename__ = "web_page_min_hash_bands"
+
+    index_id: Mapped[str] = mapped_column(String, primary_key=True)
+    band: Mapped[int] = mapped_column(Integer, primary_key=True)
+    band_hash: Mapped[int] = mapped_column(BigInteger, primary_key=True)
+    normalized_url_hash: Mapped[str] = mapped_column(String(32), primary_key=True, index=True)
+
+class WebPageChannelTemplate(TimestampModel):
+    __tablename__ = "web_page_channel_templates"
+
+    channel_normalized_url_hash: Mapped[str] = mapped_column(String(32), primary_key=True)
+    block_hashes: Mapped[List[str]] = mapped_column(JSONB, nullable=False, default=list)
+    page_count: Mapped[int] = mapped_column(Integer, nullable=True, default=None)
+    tokens_before: Mapped[int] = mapped_column(Integer, nullable=True, default=None)
+    tokens_after: Mapped[int] = mapped_column(Integer, nullable=True, default=None)
+    learned_at: Mapped[datetime] = mapped_column(DateTime, nullable=True, default=None)
+
+class WebPageChannelDictionary(TimestampModel):
+    __tablename__ = "web_page_channel_dictionaries"
+
+    channel_normalized_url_hash: Mapped[str] = mapped_column(String(32), primary_key=True)
+    # the current version, stored pages keep the name of the version they were compressed with
+    # and older versions stay in DFS for them
+    version: Mapped[int] = mapped_column(Integer, nullable=False, default=1)
+    # None while no trained dictionary beat plain zstd on the channel's pages
+    name: Mapped[Optional[str]] = mapped_column(String, nullable=True, default=None)
+    size_bytes: Mapped[int] = mapped_column(Integer, nullable=True, default=None)
+    sample_count: Mapped[int] = mapped_column(Integer, nullable=True, default=None)
+    # raw / compressed size of the held out sample pages, with plain zstd and with the dictionary
+    plain_compression_ratio: Mapped[float] = mapped_column(Float, nullable=True, default=None)
+    compression_ratio: Mapped[float] = mapped_column(Float, nullable=True, default=None)
+    trained_at: Mapped[datetime] = mapped_column(DateTime, nullable=True, default=None)
+    # last training, kept or rejected, the channel is not trained again before max_age after it
+    attempted_at: Mapped[datetime] = mapped_column(DateTime, nullable=True, default=None)
+
+class WebPageChannelCrawlState(TimestampModel):
+    __tablename__ = "web_page_channel_crawl_states"
+
+    channel_normalized_url_hash: Mapped[str] = mapped_column(String(32), primary_key=True)
+    # newest lastmod/pubDate per sitemap or feed url seen by the last finished crawl, isoformat
+    high_water_marks: Mapped[Dict[str, str]] = mapped_column(JSONB, nullable=False, default=dict)
+    crawled_at: Mapped[datetime] = mapped_column(DateTime, nullable=True, default=None)
+
+class WebPageChannelCrawlCheckpoint(TimestampModel):
+    __tablename__ = "web_page_channel_crawl_checkpoints"
+
+    channel_normalized_url_hash: Mapped[str] = mapped_column(String(32), primary_key=True)
+    # zlib compressed CrawlCheckpoint of an unfinished crawl, see pysrc.scraper.checkpoint
+    checkpoint: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
+    pending_urls_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    visited_urls_count: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    checkpointed_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+
+class WebPageChannelLease(TimestampModel):
+    __tablename__ = "web_page_channel_leases"
+
+    # one row per channel and sharded scraper run, claimed by one replica at a time
+    run_id: Mapped[str] = mapped_column(String, primary_key=True)
+    channel_normalized_url_hash: Mapped[str] = mapped_column(String(32), primary_key=True)
+    holder: Mapped[str] = mapped_column(String, nullable=True, default=None)
+    # database time, a holder that stops heartbeating loses the channel once it passes
+    leased_until: Mapped[datetime] = mapped_column(DateTime, nullable=True, default=None)
+    heartbeat_at: Mapped[datetime] = mapped_column(DateTime, nullable=True, default=None)
+    finished_at: Mapped[datetime] = mapped_column(DateTime, nullable=True, default=None)
+    attempts: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
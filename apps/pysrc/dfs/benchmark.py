@@ -0,0 +1,52 @@
+import os
+import time
+import asyncclick as click
+from ..config.rzconfig import RzConfig
+from ..fb import rzfb
+from ..utils.parallel import ParallelTaskManager
+from .storage import AsyncStorage
+
+BENCHMARK_DIRECTORY = "benchmark"
+
+@click.group()
+async def cli() -> None:
+    pass
+
+@cli.command()
+@click.option("--objects", default=200, help="Number of objects to upload, then download")
+@click.option("--size", default=100_000, help="Bytes per object")
+@click.option("--concurrency", default=32, help="Concurrent operations submitted, as the jobs' task managers do")
+@click.option("--backend", "backends", multiple=True, default=["firebase", "async"])
+async def throughput(objects: int, size: int, concurrency: int, backends: tuple[str, ...]) -> None:
+    """Uploads and downloads objects of the benchmark directory in the DFS_BUCKET bucket through each backend."""
+    config = RzConfig.instance()
+    buffers = [os.urandom(size) for _ in range(objects)]
+    click.echo(f"storage throughput of {objects} objects of {size / 1000:.0f} KB, {concurrency} concurrent operations submitted")
+    for backend in backends:
+        if backend == "firebase":
+            storage: AsyncStorage | rzfb.Firebase = rzfb.Firebase.instance()
+        else:
+            storage = AsyncStorage.instance()
+        remote_directory = f"{config.dfs_bucket_prefix}_{BENCHMARK_DIRECTORY}"
+
+        task_manager = ParallelTaskManager[str](concurrency)
+        start = time.perf_counter()
+        for i, buffer in enumerate(buffers):
+            task_manager.submit_task(storage.upload_buffer(remote_directory, f"{backend}-{i}", buffer))
+        await task_manager.wait_all()
+        upload_seconds = time.perf_counter() - start
+
+        download_task_manager = ParallelTaskManager[bytes](concurrency)
+        start = time.perf_counter()
+        for i in range(objects):
+            download_task_manager.submit_task(storage.download_buffer(remote_directory, f"{backend}-{i}"))
+        await download_task_manager.wait_all()
+        download_seconds = time.perf_counter() - start
+
+        total_mb = objects * size / 1_000_000
+        click.echo(f"  {backend:>8}: upload {objects / upload_seconds:8.1f} objects/s {total_mb / upload_seconds:8.1f} MB/s, "
+                   f"download {objects / download_seconds:8.1f} objects/s {total_mb / download_seconds:8.1f} MB/s")
+    await AsyncStorage.close_instance()
+
+if __name__ == "__main__":
+    cli()
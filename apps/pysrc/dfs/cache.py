@@ -0,0 +1,126 @@
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+from dataclasses import dataclass
+
+logger = logging.getLogger("dfs_cache")
+
+@dataclass
+class DiskCacheStats:
+    hits: int = 0
+    misses: int = 0
+    hit_bytes: int = 0
+    # bytes of the misses, downloaded from storage
+    miss_bytes: int = 0
+    written_bytes: int = 0
+    evicted_count: int = 0
+    evicted_bytes: int = 0
+
+class DiskCache:
+    """
+    Content addressed files under directory, one per (bucket, object, generation): a generation
+    is immutable, so a cached file never needs invalidating and containers sharing the directory
+    through a mounted volume can all read it. Files are written to a temporary name and renamed,
+    readers never see a partial file. Reads refresh the file's mtime and eviction removes the
+    least recently used files once the directory grows over max_bytes; the size is tracked per
+    process and recounted from the directory on every eviction, so containers sharing the
+    volume keep it near the cap between them.
+    """
+
+    _instance: "DiskCache | None" = None
+
+    def __init__(self, directory: str, max_bytes: int) -> None:
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.stats = DiskCacheStats()
+        self._lock = threading.Lock()
+        self._size_bytes: int | None = None
+
+    @classmethod
+    def instance(cls, directory: str, max_bytes: int) -> "DiskCache":
+        """Process-wide cache, DFSClient is constructed per call but the cache and its stats are shared."""
+        if cls._instance is None or cls._instance.directory != directory:
+            cls._instance = DiskCache(directory, max_bytes)
+        return cls._instance
+
+    def _path(self, bucket_name: str, object_name: str, generation: int) -> str:
+        key = hashlib.sha256(f"{bucket_name}/{object_name}#{generation}".encode("utf-8")).hexdigest()
+        return os.path.join(self.directory, key[:2], key[2:])
+
+    def get(self, bucket_name: str, object_name: str, generation: int) -> bytes | None:
+        path = self._path(bucket_name, object_name, generation)
+        try:
+            with open(path, "rb") as file:
+                data = file.read()
+            os.utime(path)
+        except FileNotFoundError:
+            # never cached or evicted by another container between the open and the utime
+            self.stats.misses += 1
+            return None
+        self.stats.hits += 1
+        self.stats.hit_bytes += len(data)
+        return data
+
+    def put(self, bucket_name: str, object_name: str, generation: int, data: bytes) -> None:
+        if len(data) > self.max_bytes:
+            return
+        path = self._path(bucket_name, object_name, generation)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        file_descriptor, temporary_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".tmp-")
+        try:
+            with os.fdopen(file_descriptor, "wb") as file:
+                file.write(data)
+            os.replace(temporary_path, path)
+        except BaseException:
+            if os.path.exists(temporary_path):
+                os.unlink(temporary_path)
+            raise
+        self.stats.written_bytes += len(data)
+        with self._lock:
+            if self._size_bytes is None:
+                self._size_bytes = self._scan_size()
+            else:
+                self._size_bytes += len(data)
+            if self._size_bytes > self.max_bytes:
+                self._evict()
+
+    def _entries(self) -> list[tuple[float, int, str]]:
+        entries = []
+        for shard in os.scandir(self.directory):
+            if not shard.is_dir():
+                continue
+            for entry in os.scandir(shard.path):
+                if entry.name.startswith(".tmp-"):
+                    # being written, renamed once complete
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    def _scan_size(self) -> int:
+        return sum(size for _, size, _ in self._entries())
+
+    def _evict(self) -> None:
+        """Removes the least recently used files down to 90% of max_bytes, leaving room for the next writes."""
+        entries = sorted(self._entries())
+        size_bytes = sum(size for _, size, _ in entries)
+        target_bytes = self.max_bytes * 0.9
+        for _, size, path in entries:
+            if size_bytes <= target_bytes:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                # evicted by another container
+                pass
+            size_bytes -= size
+            self.stats.evicted_count += 1
+            self.stats.evicted_bytes += size
+        self._size_bytes = size_bytes
+        logger.info(f"Evicted dfs cache {self.directory} down to {size_bytes / 1_000_000:.0f} MB, "
+                    f"{self.stats.evicted_count} files evicted so far")
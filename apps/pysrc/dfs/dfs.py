@@ -1,18 +1,55 @@
+import asyncio
+import logging
 from typing import Optional
+from google.api_core.exceptions import PreconditionFailed  # type: ignore
 from ..fb import rzfb
 from ..config.rzconfig import RzConfig
+from .cache import DiskCache, DiskCacheStats
+from .storage import AsyncStorage, StorageException
+
+logger = logging.getLogger("dfs")
 
 WEB_IMAGES = "web_images"
 FRONTEND_IMAGES = "frontend_images"
 WEB_PAGES_CONTENT = "web_pages_content"
+# raw bodies of the pages, WEB_PAGES_CONTENT holds the extracted fields
+WEB_PAGES_RAW_CONTENT = "web_pages_raw_content"
+# per channel zstd dictionaries of the raw bodies, one immutable object per version
+WEB_PAGES_DICTIONARIES = "web_pages_dictionaries"
 AUTHOR_IMAGES = "author_images"
 CHANNEL_IMAGES = "channel_images"
 AUDIO_FILES = "audio_files"
 
+def _is_generation_mismatch(e: Exception) -> bool:
+    """A download of a generation that an upload replaced after it was looked up."""
+    return isinstance(e, PreconditionFailed) or (isinstance(e, StorageException) and e.status == 412)
+
 class DFSClient:
     def __init__(self, config: RzConfig):
         """Initialize MinIO client with credentials."""
         self._config = config
+        self._storage: AsyncStorage | rzfb.Firebase = rzfb.Firebase.instance() if config.dfs_backend == "firebase" else AsyncStorage.instance()
+        self._cache = DiskCache.instance(config.dfs_cache_dir, config.dfs_cache_max_bytes) if config.dfs_cache_dir else None
+
+    @property
+    def cache_stats(self) -> DiskCacheStats | None:
+        return self._cache.stats if self._cache is not None else None
+
+    async def _cache_get(self, full_bucket_name: str, object_name: str, generation: int) -> bytes | None:
+        assert self._cache is not None
+        try:
+            return await asyncio.to_thread(self._cache.get, full_bucket_name, object_name, generation)
+        except OSError as e:
+            logger.error(f"Failed to read {full_bucket_name}/{object_name} from the dfs cache: {e}")
+            return None
+
+    async def _cache_put(self, full_bucket_name: str, object_name: str, generation: int, buffer: bytes) -> None:
+        assert self._cache is not None
+        try:
+            await asyncio.to_thread(self._cache.put, full_bucket_name, object_name, generation, buffer)
+        except OSError as e:
+            # a full or unwritable cache volume costs the next read a download, nothing more
+            logger.error(f"Failed to write {full_bucket_name}/{object_name} to the dfs cache: {e}")
 
     def __get_bucket_name(self, bucket_name: str) -> str:
         """Get the bucket name with prefix."""
@@ -25,7 +62,7 @@ class DFSClient:
         file_path: str,
     ) -> str:
         full_bucket_name = self.__get_bucket_name(bucket_name)
-        return await rzfb.Firebase.instance().upload_file(
+        return await self._storage.upload_file(
             remote_directory=full_bucket_name,
             remote_file_name=object_name,
             local_file_path=file_path
@@ -38,11 +75,20 @@ class DFSClient:
         buffer: bytes,
     ) -> str:
         full_bucket_name = self.__get_bucket_name(bucket_name)
-        return await rzfb.Firebase.instance().upload_buffer(
+        if self._cache is None:
+            return await self._storage.upload_buffer(
+                remote_directory=full_bucket_name,
+                remote_file_name=object_name,
+                buffer=buffer
+            )
+        url, generation = await self._storage.upload_buffer_generation(
             remote_directory=full_bucket_name,
             remote_file_name=object_name,
             buffer=buffer
         )
+        # write-through, the summarizer and publisher read what the scraper just wrote
+        await self._cache_put(full_bucket_name, object_name, generation, buffer)
+        return url
 
     
     async def download_file(
@@ -51,7 +97,7 @@ class DFSClient:
         object_name: str,
         file_path: str
     ) -> bool:
-        await rzfb.Firebase.instance().download_file(
+        await self._storage.download_file(
             remote_directory=self.__get_bucket_name(bucket_name),
             remote_file_name=object_name,
             local_file_path=file_path
@@ -63,8 +109,35 @@ class DFSClient:
         bucket_name: str,
         object_name: str,
     ) -> bytes:
-        buffer = await rzfb.Firebase.instance().download_buffer(
-            remote_directory=self.__get_bucket_name(bucket_name),
+        """Read-through the disk cache when DFS_CACHE_DIR is set, a metadata request checks the live generation."""
+        full_bucket_name = self.__get_bucket_name(bucket_name)
+        if self._cache is None:
+            return await self._storage.download_buffer(
+                remote_directory=full_bucket_name,
+                remote_file_name=object_name,
+            )
+        try:
+            return await self._download_live_generation(full_bucket_name, object_name)
+        except Exception as e:
+            if not _is_generation_mismatch(e):
+                raise
+            # overwritten between the generation lookup and the download, the next lookup sees the new one
+            logger.info(f"{full_bucket_name}/{object_name} changed during its download, retrying")
+            return await self._download_live_generation(full_bucket_name, object_name)
+
+    async def _download_live_generation(self, full_bucket_name: str, object_name: str) -> bytes:
+        assert self._cache is not None
+        generation = await self._storage.get_generation(full_bucket_name, object_name)
+        if generation is not None:
+            buffer = await self._cache_get(full_bucket_name, object_name, generation)
+            if buffer is not None:
+                return buffer
+        buffer = await self._storage.download_buffer(
+            remote_directory=full_bucket_name,
             remote_file_name=object_name,
+            generation=generation,
         )
-        return buffer
\ No newline at end of file
+        if generation is not None:
+            self._cache.stats.miss_bytes += len(buffer)
+            await self._cache_put(full_bucket_name, object_name, generation, buffer)
+        return buffer
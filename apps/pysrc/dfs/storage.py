@@ -0,0 +1,280 @@
+import asyncio
+import json
+import logging
+import mimetypes
+import os
+import random
+from dataclasses import dataclass
+from typing import Any, BinaryIO
+from urllib.parse import quote
+import aiohttp
+from ..config.rzconfig import RzConfig
+
+logger = logging.getLogger("storage")
+
+SCOPE = "https://www.googleapis.com/auth/devstorage.read_write"
+# resumable upload chunks must be multiples of 256 KiB
+CHUNK_ALIGNMENT = 256 * 1024
+RETRIABLE_STATUSES = frozenset((408, 429, 500, 502, 503, 504))
+
+class StorageException(Exception):
+    def __init__(self, message: str, status: int | None = None) -> None:
+        super().__init__(message)
+        self.status = status
+
+@dataclass
+class StorageStats:
+    requests: int = 0
+    retries: int = 0
+    uploaded_bytes: int = 0
+    downloaded_bytes: int = 0
+
+class _Credentials:
+    """Service account access tokens, refreshed in a thread shortly before they expire."""
+
+    def __init__(self, account_file: str) -> None:
+        from google.oauth2 import service_account  # type: ignore
+        self._credentials = service_account.Credentials.from_service_account_file(account_file, scopes=[SCOPE])
+        self._lock = asyncio.Lock()
+
+    async def token(self) -> str:
+        async with self._lock:
+            if not self._credentials.valid:
+                from google.auth.transport.requests import Request  # type: ignore
+                await asyncio.to_thread(self._credentials.refresh, Request())
+            return self._credentials.token
+
+class AsyncStorage:
+    """
+    Google Cloud Storage through its JSON api on one keep-alive aiohttp session, the methods of
+    rzfb.Firebase without its executor threads. At most concurrency requests run at once,
+    requests failing with a connection error, a timeout or a retriable status are retried with
+    full jitter backoff, objects are made public by the upload request itself and files are
+    streamed in resumable upload chunks, an interrupted chunk is resumed from what the server
+    acknowledged. An empty account file sends no credentials, for the storage emulator.
+    """
+
+    _instance: "AsyncStorage | None" = None
+
+    def __init__(self,
+                 bucket_name: str,
+                 account_file: str = "",
+                 base_url: str = "https://storage.googleapis.com",
+                 concurrency: int = 32,
+                 max_attempts: int = 5,
+                 backoff_seconds: float = 0.5,
+                 max_backoff_seconds: float = 30.0,
+                 chunk_bytes: int = 8 * 1024 * 1024,
+                 request_timeout_seconds: float = 120.0) -> None:
+        self.bucket_name = bucket_name
+        self.base_url = base_url.rstrip("/")
+        self.concurrency = concurrency
+        self.max_attempts = max_attempts
+        self.backoff_seconds = backoff_seconds
+        self.max_backoff_seconds = max_backoff_seconds
+        self.chunk_bytes = max(CHUNK_ALIGNMENT, chunk_bytes - chunk_bytes % CHUNK_ALIGNMENT)
+        self.request_timeout_seconds = request_timeout_seconds
+        self.stats = StorageStats()
+        self._credentials = _Credentials(account_file) if account_file else None
+        # the session and the semaphore belong to the event loop they were created on
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._session: aiohttp.ClientSession | None = None
+        self._semaphore: asyncio.Semaphore | None = None
+
+    @classmethod
+    def instance(cls) -> "AsyncStorage":
+        if cls._instance is None:
+            config = RzConfig.instance()
+            cls._instance = AsyncStorage(
+                bucket_name=config.dfs_bucket,
+                account_file=config.google_account_file,
+                base_url=config.dfs_storage_url,
+                concurrency=config.dfs_concurrency,
+                max_attempts=config.dfs_max_attempts,
+                chunk_bytes=config.dfs_upload_chunk_bytes,
+            )
+        return cls._instance
+
+    async def _get_session(self) -> tuple[aiohttp.ClientSession, asyncio.Semaphore]:
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._semaphore is None or self._loop is not loop or self._session.closed:
+            # a session of the previous loop is closed before it is replaced, it would leak its connections
+            await self._close_session()
+            connector = aiohttp.TCPConnector(limit=self.concurrency, keepalive_timeout=60)
+            self._session = aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=self.request_timeout_seconds))
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+            self._loop = loop
+        return self._session, self._semaphore
+
+    async def _close_session(self) -> None:
+        session, loop = self._session, self._loop
+        self._session = None
+        if session is None or session.closed:
+            return
+        if loop is None or loop is asyncio.get_running_loop() or loop.is_closed():
+            # the connector of a closed loop drops its connections without awaiting on that loop
+            await session.close()
+        else:
+            # the loop of the session runs in another thread or is stopped, it closes the session itself
+            asyncio.run_coroutine_threadsafe(session.close(), loop)
+
+    async def close(self) -> None:
+        await self._close_session()
+
+    @classmethod
+    async def close_instance(cls) -> None:
+        if cls._instance is None:
+            return
+        stats = cls._instance.stats
+        logger.info(f"Storage: {stats.requests} requests, {stats.retries} retried, {stats.uploaded_bytes / 1_000_000:.1f} MB uploaded, "
+                    f"{stats.downloaded_bytes / 1_000_000:.1f} MB downloaded")
+        await cls._instance.close()
+
+    def _object_name(self, remote_directory: str, remote_file_name: str) -> str:
+        return f"{remote_directory}/{remote_file_name}"
+
+    def _object_url(self, object_name: str) -> str:
+        return f"{self.base_url}/storage/v1/b/{self.bucket_name}/o/{quote(object_name, safe='')}"
+
+    def _upload_url(self) -> str:
+        return f"{self.base_url}/upload/storage/v1/b/{self.bucket_name}/o"
+
+    def public_url(self, object_name: str) -> str:
+        return f"https://storage.googleapis.com/{self.bucket_name}/{quote(object_name, safe='/~')}"
+
+    async def _headers(self, headers: dict[str, str] | None = None) -> dict[str, str]:
+        all_headers = dict(headers or {})
+        if self._credentials is not None:
+            all_headers["Authorization"] = f"Bearer {await self._credentials.token()}"
+        return all_headers
+
+    def _backoff(self, attempt: int) -> float:
+        return random.uniform(0, min(self.max_backoff_seconds, self.backoff_seconds * 2 ** attempt))
+
+    async def _request(self,
+                       method: str,
+                       url: str,
+                       params: dict[str, str] | None = None,
+                       headers: dict[str, str] | None = None,
+                       data: bytes | None = None,
+                       expected_statuses: tuple[int, ...] = (200,),
+                       sink: BinaryIO | None = None) -> tuple[int, dict[str, str], bytes]:
+        """(status, headers, body) of the first attempt with an expected status, the body is streamed into sink when given."""
+        session, semaphore = await self._get_session()
+        for attempt in range(self.max_attempts):
+            try:
+                async with semaphore:
+                    self.stats.requests += 1
+                    async with session.request(method, url, params=params, headers=await self._headers(headers), data=data) as response:
+                        if response.status in expected_statuses and sink is not None:
+                            await asyncio.to_thread(sink.seek, 0)
+                            await asyncio.to_thread(sink.truncate)
+                            async for chunk in response.content.iter_chunked(self.chunk_bytes):
+                                await asyncio.to_thread(sink.write, chunk)
+                            return response.status, dict(response.headers), b""
+                        body = await response.read()
+                        if response.status in expected_statuses:
+                            return response.status, dict(response.headers), body
+                        if response.status not in RETRIABLE_STATUSES or attempt == self.max_attempts - 1:
+                            raise StorageException(f"{method} {url} failed with {response.status}: {body[:200]!r}", response.status)
+                        logger.warning(f"{method} {url} failed with {response.status}, retrying")
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                if attempt == self.max_attempts - 1:
+                    raise StorageException(f"{method} {url} failed: {e}") from e
+                logger.warning(f"{method} {url} failed: {e}, retrying")
+            self.stats.retries += 1
+            await asyncio.sleep(self._backoff(attempt))
+        raise StorageException(f"{method} {url} failed after {self.max_attempts} attempts")
+
+    async def upload_buffer(self, remote_directory: str, remote_file_name: str, buffer: bytes, mime_type: None|str = None) -> str:
+        gs_url, _ = await self.upload_buffer_generation(remote_directory, remote_file_name, buffer, mime_type)
+        return gs_url
+
+    async def upload_buffer_generation(self, remote_directory: str, remote_file_name: str, buffer: bytes, mime_type: None|str = None) -> tuple[str, int]:
+        """One multipart request with the metadata, the acl and the buffer."""
+        object_name = self._object_name(remote_directory, remote_file_name)
+        content_type = mime_type if mime_type else "application/octet-stream"
+        boundary = f"rz{random.getrandbits(64):016x}"
+        body = b"".join([
+            f"--{boundary}\r\nContent-Type: application/json; charset=UTF-8\r\n\r\n".encode(),
+            json.dumps({"name": object_name, "contentType": content_type}).encode(),
+            f"\r\n--{boundary}\r\nContent-Type: {content_type}\r\n\r\n".encode(),
+            buffer,
+            f"\r\n--{boundary}--\r\n".encode(),
+        ])
+        _, _, response_body = await self._request(
+            "POST", self._upload_url(),
+            params={"uploadType": "multipart", "predefinedAcl": "publicRead"},
+            headers={"Content-Type": f"multipart/related; boundary={boundary}"},
+            data=body)
+        self.stats.uploaded_bytes += len(buffer)
+        return self.public_url(object_name), int(json.loads(response_body)["generation"])
+
+    async def upload_file(self, remote_directory: str, remote_file_name: str, local_file_path: str) -> str:
+        """A resumable upload streamed from the file chunk by chunk, the file is never read whole."""
+        object_name = self._object_name(remote_directory, remote_file_name)
+        mime_type, _ = mimetypes.guess_type(local_file_path)
+        content_type = mime_type if mime_type else "application/octet-stream"
+        total_bytes = os.path.getsize(local_file_path)
+        _, headers, _ = await self._request(
+            "POST", self._upload_url(),
+            params={"uploadType": "resumable", "predefinedAcl": "publicRead"},
+            headers={"Content-Type": "application/json; charset=UTF-8", "X-Upload-Content-Type": content_type,
+                     "X-Upload-Content-Length": str(total_bytes)},
+            data=json.dumps({"name": object_name, "contentType": content_type}).encode())
+        session_url = headers["Location"]
+        with open(local_file_path, "rb") as file:
+            offset = 0
+            while True:
+                chunk = await asyncio.to_thread(self._read_chunk, file, offset)
+                content_range = f"bytes {offset}-{offset + len(chunk) - 1}/{total_bytes}" if chunk else f"bytes */{total_bytes}"
+                # a failed chunk is sent again, the upload never restarts from the first byte
+                status, headers, _ = await self._request("PUT", session_url, headers={"Content-Range": content_range}, data=chunk,
+                                                         expected_statuses=(200, 201, 308))
+                if status in (200, 201):
+                    self.stats.uploaded_bytes += len(chunk)
+                    return self.public_url(object_name)
+                if not chunk:
+                    raise StorageException(f"Resumable upload of {object_name} was not finalized", status)
+                # the server may have stored only part of the chunk, the rest is read again
+                next_offset = self._resume_offset(headers)
+                self.stats.uploaded_bytes += max(0, next_offset - offset)
+                offset = next_offset
+
+    def _read_chunk(self, file: BinaryIO, offset: int) -> bytes:
+        file.seek(offset)
+        return file.read(self.chunk_bytes)
+
+    @staticmethod
+    def _resume_offset(headers: dict[str, str]) -> int:
+        """The byte after the last one a 308 response says the server has, 0 without a Range header."""
+        range_header = headers.get("Range")
+        if not range_header:
+            return 0
+        return int(range_header.rsplit("-", 1)[1]) + 1
+
+    async def download_buffer(self, remote_directory: str, remote_file_name: str, generation: int|None = None) -> bytes:
+        """Downloads the object, with a generation only while it is still the live one."""
+        params = {"alt": "media"}
+        if generation is not None:
+            params["ifGenerationMatch"] = str(generation)
+        _, _, body = await self._request("GET", self._object_url(self._object_name(remote_directory, remote_file_name)), params=params)
+        self.stats.downloaded_bytes += len(body)
+        return body
+
+    async def download_file(self, remote_directory: str, remote_file_name: str, local_file_path: str) -> str:
+        """Streams the object into the file, a retried download rewrites it from the start."""
+        object_name = self._object_name(remote_directory, remote_file_name)
+        with open(local_file_path, "wb") as file:
+            await self._request("GET", self._object_url(object_name), params={"alt": "media"}, sink=file)
+            self.stats.downloaded_bytes += file.tell()
+        return f"gs://{self.bucket_name}/{object_name}"
+
+    async def get_generation(self, remote_directory: str, remote_file_name: str) -> int|None:
+        """Generation of the live object from its metadata, None when there is no such object."""
+        status, _, body = await self._request("GET", self._object_url(self._object_name(remote_directory, remote_file_name)),
+                                              params={"fields": "generation"}, expected_statuses=(200, 404))
+        if status == 404:
+            return None
+        metadata: dict[str, Any] = json.loads(body)
+        return int(metadata["generation"])
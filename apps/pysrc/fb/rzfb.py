@@ -16,7 +16,7 @@ class Firebase:
     def __init__(self, config: RzConfig) -> None:
         self._cred = credentials.Certificate(config.google_account_file)
         initialize_app(self._cred, {
-            'storageBucket': "radiozilla-92c5f.firebasestorage.app",
+            'storageBucket': config.dfs_bucket,
         })
         self._db = firestore.Client.from_service_account_json(config.google_account_file)
         self._bucket = storage.bucket()
@@ -42,16 +42,19 @@ class Firebase:
     
     
     async def upload_buffer(self, remote_directory: str, remote_file_name: str, buffer: bytes, mime_type: None|str = None) -> str:                
-        def synchronous_worker() -> str:
+        gs_url, _ = await self.upload_buffer_generation(remote_directory, remote_file_name, buffer, mime_type)
+        return gs_url
+
+    async def upload_buffer_generation(self, remote_directory: str, remote_file_name: str, buffer: bytes, mime_type: None|str = None) -> tuple[str, int]:
+        """Uploads like upload_buffer, also returns the generation the upload created."""
+        def synchronous_worker() -> tuple[str, int]:
             content_type = mime_type if mime_type else 'application/octet-stream'
             blob = self._bucket.blob(f"{remote_directory}/{remote_file_name}")
             blob.upload_from_string(buffer, content_type=content_type)
             blob.make_public()
-            public_url = blob.public_url
-            return public_url    
-    
-        gs_url = await asyncio.get_event_loop().run_in_executor(executor, synchronous_worker)
-        return gs_url
+            return blob.public_url, blob.generation
+
+        return await asyncio.get_event_loop().run_in_executor(executor, synchronous_worker)
     
     async def download_file(self, remote_directory: str, remote_file_name: str, local_file_path: str) -> str:
         def synchronous_worker() -> str:
@@ -63,12 +66,20 @@ class Firebase:
         gs_url = await asyncio.get_event_loop().run_in_executor(executor, synchronous_worker)
         return gs_url
     
-    async def download_buffer(self, remote_directory: str, remote_file_name: str) -> bytes:
+    async def download_buffer(self, remote_directory: str, remote_file_name: str, generation: int|None = None) -> bytes:
+        """Downloads the object, with a generation only while it is still the live one."""
         def synchronous_worker() -> bytes:
             blob = self._bucket.blob(f"{remote_directory}/{remote_file_name}")
-            return blob.download_as_bytes()
+            return blob.download_as_bytes(if_generation_match=generation)
         buffer = await asyncio.get_event_loop().run_in_executor(executor, synchronous_worker)
         return buffer
+
+    async def get_generation(self, remote_directory: str, remote_file_name: str) -> int|None:
+        """Generation of the live object from its metadata, None when there is no such object."""
+        def synchronous_worker() -> int|None:
+            blob = self._bucket.get_blob(f"{remote_directory}/{remote_file_name}")
+            return blob.generation if blob is not None else None
+        return await asyncio.get_event_loop().run_in_executor(executor, synchronous_worker)
         
 
     
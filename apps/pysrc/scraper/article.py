@@ -0,0 +1,168 @@
+from typing import Dict, List, Optional
+import re
+from lxml import etree
+from lxml import html as lxml_html
+from lxml.etree import ParserError
+from .boilerplate import BLOCK_TAGS
+from .text import TEXTIFY_SKIPPED_TAGS
+
+# Readability-style main content extraction: paragraphs vote for their ancestors,
+# the best scoring container wins and keeps its related siblings.
+
+ARTICLE_REMOVED_TAGS = TEXTIFY_SKIPPED_TAGS | frozenset(["nav", "aside", "footer", "form", "button", "select", "svg", "iframe"])
+PARAGRAPH_TAGS = frozenset(["p", "pre", "td", "blockquote"])
+CONTAINER_TAGS = frozenset(["div", "section", "article", "main"])
+
+UNLIKELY_CANDIDATES = re.compile(r"banner|breadcrumb|combx|comment|community|cookie|disqus|extra|foot|header|legends|menu|modal|"
+                                 r"related|remark|replies|rss|share|shoutbox|sidebar|skyscraper|social|sponsor|ad-break|agegate|"
+                                 r"pagination|pager|popup|newsletter|subscribe", re.IGNORECASE)
+MAYBE_CANDIDATES = re.compile(r"and|article|body|column|content|main|shadow", re.IGNORECASE)
+POSITIVE_HINTS = re.compile(r"article|body|content|entry|hentry|h-entry|main|page|post|story|text|blog", re.IGNORECASE)
+NEGATIVE_HINTS = re.compile(r"hidden|banner|combx|comment|contact|foot|footer|footnote|masthead|media|meta|outbrain|promo|"
+                            r"related|scroll|share|shoutbox|sidebar|skyscraper|sponsor|shopping|tags|tool|widget", re.IGNORECASE)
+
+MIN_PARAGRAPH_LENGTH = 25
+
+def _normalized_text(element: lxml_html.HtmlElement) -> str:
+    return ' '.join(element.text_content().split())
+
+def _hints(element: lxml_html.HtmlElement) -> str:
+    return f"{element.get('class', '')} {element.get('id', '')}"
+
+def _class_weight(element: lxml_html.HtmlElement) -> float:
+    hints = _hints(element)
+    weight = 0.0
+    if NEGATIVE_HINTS.search(hints):
+        weight -= 25
+    if POSITIVE_HINTS.search(hints):
+        weight += 25
+    return weight
+
+def _initial_score(element: lxml_html.HtmlElement) -> float:
+    if element.tag in ("article", "main"):
+        score = 10.0
+    elif element.tag in ("div", "section"):
+        score = 5.0
+    elif element.tag in ("pre", "td", "blockquote"):
+        score = 3.0
+    elif element.tag in ("ol", "ul", "dl", "dd", "dt", "li", "address"):
+        score = -3.0
+    elif element.tag in ("h1", "h2", "h3", "h4", "h5", "h6", "th"):
+        score = -5.0
+    else:
+        score = 0.0
+    return score + _class_weight(element)
+
+def link_density(element: lxml_html.HtmlElement) -> float:
+    """Share of the element's text that sits inside links."""
+    text_length = len(_normalized_text(element))
+    if text_length == 0:
+        return 0.0
+    link_length = sum(len(_normalized_text(link)) for link in element.iter("a"))
+    return min(1.0, link_length / text_length)
+
+def _is_paragraph(element: lxml_html.HtmlElement) -> bool:
+    if element.tag in PARAGRAPH_TAGS:
+        return True
+    # divs used as paragraphs, i.e. containing text but no block-level children
+    return element.tag in CONTAINER_TAGS and not any(
+        child.tag in BLOCK_TAGS for child in element.iterdescendants() if isinstance(child.tag, str))
+
+def _clean(root: lxml_html.HtmlElement) -> None:
+    for element in list(root.iter(etree.Comment, etree.ProcessingInstruction)):
+        element.drop_tree()
+    for element in list(root.iter(*ARTICLE_REMOVED_TAGS)):
+        element.drop_tree()
+    for element in list(root.iter()):
+        if element.tag in ("html", "body", "article", "main") or element.getparent() is None:
+            continue
+        hints = _hints(element)
+        if UNLIKELY_CANDIDATES.search(hints) and not MAYBE_CANDIDATES.search(hints):
+            element.drop_tree()
+
+def score_candidates(root: lxml_html.HtmlElement) -> Dict[lxml_html.HtmlElement, float]:
+    """Content score of every container that holds at least one paragraph, adjusted by link density."""
+    scores: Dict[lxml_html.HtmlElement, float] = {}
+    for element in root.iter():
+        if not _is_paragraph(element):
+            continue
+        text = _normalized_text(element)
+        if len(text) < MIN_PARAGRAPH_LENGTH:
+            continue
+        score = 1 + text.count(",") + min(len(text) // 100, 3)
+        parent = element.getparent()
+        if parent is None:
+            continue
+        grandparent = parent.getparent()
+        for ancestor, share in ((parent, 1.0), (grandparent, 0.5)):
+            if ancestor is None:
+                continue
+            if ancestor not in scores:
+                scores[ancestor] = _initial_score(ancestor)
+            scores[ancestor] += score * share
+    return {element: score * (1 - link_density(element)) for element, score in scores.items()}
+
+def _element_blocks(element: lxml_html.HtmlElement, blocks: List[str]) -> None:
+    parts: List[str] = []
+
+    def flush() -> None:
+        text = ' '.join(''.join(parts).split())
+        if text:
+            blocks.append(text)
+        parts.clear()
+
+    for event, node in etree.iterwalk(element, events=("start", "end")):
+        if event == "start":
+            if node.tag in BLOCK_TAGS:
+                flush()
+            if node.text:
+                parts.append(node.text)
+        else:
+            if node.tag in BLOCK_TAGS:
+                flush()
+            if node is not element and node.tail:
+                parts.append(node.tail)
+    flush()
+
+def _article_elements(top: lxml_html.HtmlElement, scores: Dict[lxml_html.HtmlElement, float]) -> List[lxml_html.HtmlElement]:
+    """The top candidate plus siblings that look like part of the same article."""
+    parent = top.getparent()
+    if parent is None:
+        return [top]
+    threshold = max(10.0, scores[top] * 0.2)
+    elements = []
+    for sibling in parent:
+        if sibling is top:
+            elements.append(sibling)
+        elif sibling in scores and scores[sibling] >= threshold:
+            elements.append(sibling)
+        elif sibling.tag == "p":
+            text = _normalized_text(sibling)
+            density = link_density(sibling)
+            if (len(text) > 80 and density < 0.25) or (0 < len(text) <= 80 and density == 0 and re.search(r"\.( |$)", text)):
+                elements.append(sibling)
+    return elements
+
+def extract_article(html: str, min_length: int = 200) -> Optional[str]:
+    """
+    Main content of the page, one block per line, without navigation, sidebars and other chrome.
+    Returns None when no convincing article body is found so callers can fall back to the visible text.
+    """
+    if not html.strip():
+        return None
+    try:
+        root = lxml_html.document_fromstring(html)
+    except (ParserError, ValueError):
+        return None
+    _clean(root)
+    scores = score_candidates(root)
+    if not scores:
+        return None
+    top = max(scores, key=lambda element: scores[element])
+    blocks: List[str] = []
+    for element in _article_elements(top, scores):
+        _element_blocks(element, blocks)
+    article = '\n'.join(blocks)
+    if len(article) < min_length:
+        return None
+    return article
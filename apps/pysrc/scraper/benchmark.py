@@ -0,0 +1,436 @@
+import asyncio
+import io
+import os
+import pickle
+import time
+import uuid
+from datetime import datetime
+from typing import Callable, Sequence
+import asyncclick as click
+import numpy as np
+from pyminiscraper.url import normalize_url, normalized_url_hash
+from sqlalchemy import delete, event, select, update
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from ..db.database import Database
+from ..db.service import AudioContentService, WebPageChannelService, WebPageService
+from ..db.user import AudioContent, AudioContentState
+from ..db.web_page import WebPage, WebPageContent
+from ..db.content_format import ContentDictionary, ContentReader, encode_fields, train_dictionary
+from .text import TEXTIFIERS, TextifyBackend
+from .article import extract_article
+from .boilerplate import extract_blocks, count_tokens
+from ..summarizer.dateparser import extract_date_from_url, extract_dates_from_urls
+from .image import make_thumbnail, thumbnailed_image_width, thumbnailed_image_height
+from .path_filter import filtered_out
+from pyminiscraper.filter import PathFilter
+
+async def load_stored_page_contents(limit: int) -> list[WebPageContent]:
+    """Most recently scraped page contents, downloaded from DFS."""
+    async for session in Database.get_session():
+        web_page_service = WebPageService(session)
+        web_pages = await web_page_service.find_recent(limit)
+        contents = await asyncio.gather(*[web_page_service.get_content(web_page) for web_page in web_pages])
+        return [content for content in contents if content is not None and content.content]
+    return []
+
+def load_html_dir(html_dir: str) -> list[str]:
+    htmls = []
+    for file_name in sorted(os.listdir(html_dir)):
+        with open(os.path.join(html_dir, file_name), encoding="utf-8", errors="replace") as file:
+            htmls.append(file.read())
+    return htmls
+
+async def load_htmls(limit: int, html_dir: str | None) -> list[str]:
+    if html_dir:
+        return load_html_dir(html_dir)[:limit]
+    contents = await load_stored_page_contents(limit)
+    return [(content.content or b"").decode("utf-8", errors="replace") for content in contents]
+
+def measure_throughput(func: Callable[[str], object], documents: Sequence[str], repeat: int) -> tuple[float, float]:
+    """Returns (MB/s, seconds per document) over the utf-8 size of the documents."""
+    total_bytes = sum(len(document.encode("utf-8")) for document in documents) * repeat
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for document in documents:
+            func(document)
+    elapsed = time.perf_counter() - start
+    return total_bytes / elapsed / 1_000_000, elapsed / (len(documents) * repeat)
+
+async def load_urls(limit: int, url_file: str | None) -> list[str]:
+    if url_file:
+        with open(url_file, encoding="utf-8") as file:
+            return [line.strip() for line in file if line.strip()][:limit]
+    async for session in Database.get_session():
+        return [web_page.normalized_url for web_page in await WebPageService(session).find_recent(limit)]
+    return []
+
+def extract_date_from_url_legacy(url: str) -> datetime | None:
+    """The year-scanning implementation replaced by dateparser, kept as the benchmark baseline."""
+    try:
+        for year in range(2020, 2028):
+            year_str = str(year)
+            if year_str in url:
+                pos = url.find(year_str) + 4
+                nums = ""
+                while len(nums) < 4 and pos < len(url):
+                    if url[pos].isalpha():
+                        return None
+                    if url[pos].isdigit():
+                        nums += url[pos]
+                    pos += 1
+                if len(nums) == 4:
+                    month = int(nums[:2])
+                    day = int(nums[2:])
+                    if 1 <= month <= 12 and 1 <= day <= 31:
+                        parsed_date = datetime(year, month, day)
+                        if parsed_date > datetime.now():
+                            return None
+                        return parsed_date
+        return None
+    except (ValueError, IndexError):
+        return None
+
+def make_thumbnail_legacy(img_bytes: bytes) -> tuple[bytes, int]:
+    """The full resolution RGBA decode replaced by make_thumbnail, returns (png, decoded bytes)."""
+    from PIL import Image, ImageOps
+    img = Image.open(io.BytesIO(img_bytes)).convert("RGBA")
+    thumbnail = ImageOps.fit(img, (thumbnailed_image_width, thumbnailed_image_height), Image.Resampling.LANCZOS)
+    output_io = io.BytesIO()
+    thumbnail.save(output_io, format="PNG")
+    return output_io.getvalue(), img.size[0] * img.size[1] * 4
+
+def load_image_dir(image_dir: str) -> list[bytes]:
+    images = []
+    for file_name in sorted(os.listdir(image_dir)):
+        with open(os.path.join(image_dir, file_name), "rb") as file:
+            images.append(file.read())
+    return images
+
+@click.group()
+async def cli() -> None:
+    pass
+
+@cli.command()
+@click.option("--limit", default=200, help="Number of stored pages to benchmark")
+@click.option("--html-dir", default=None, help="Read pages from a directory instead of the database")
+@click.option("--repeat", default=3)
+async def textify(limit: int, html_dir: str | None, repeat: int) -> None:
+    htmls = await load_htmls(limit, html_dir)
+    if not htmls:
+        click.echo("No pages to benchmark")
+        return
+    size_mb = sum(len(html.encode("utf-8")) for html in htmls) / 1_000_000
+    click.echo(f"textify_html on {len(htmls)} pages ({size_mb:.1f} MB)")
+    for backend, textifier in TEXTIFIERS.items():
+        mb_per_second, seconds_per_page = measure_throughput(textifier, htmls, repeat)
+        click.echo(f"  {backend.value:>8}: {mb_per_second:8.2f} MB/s {seconds_per_page * 1000:8.2f} ms/page")
+    # pages whose text hash would change if the default moved off bs4
+    differing = sum(TEXTIFIERS[TextifyBackend.LXML](html) != TEXTIFIERS[TextifyBackend.BS4](html) for html in htmls)
+    click.echo(f"  {differing} of {len(htmls)} pages textify differently with lxml")
+
+@cli.command()
+@click.option("--limit", default=200, help="Number of stored pages to benchmark")
+@click.option("--html-dir", default=None, help="Read pages from a directory instead of the database")
+@click.option("--ollama-model", default=None, help="Also time summarization of both texts with this model")
+@click.option("--summaries", default=5, help="Number of pages to summarize when timing summarization")
+async def article(limit: int, html_dir: str | None, ollama_model: str | None, summaries: int) -> None:
+    htmls = await load_htmls(limit, html_dir)
+    if not htmls:
+        click.echo("No pages to benchmark")
+        return
+    
+    start = time.perf_counter()
+    articles = [extract_article(html) for html in htmls]
+    extraction_seconds = time.perf_counter() - start
+    visible_texts = ['\n'.join(extract_blocks(html)) for html in htmls]
+    # the summarizer falls back to the visible text when no article is found
+    prompt_texts = [article or visible_text for article, visible_text in zip(articles, visible_texts)]
+
+    visible_tokens = sum(count_tokens(text) for text in visible_texts)
+    article_tokens = sum(count_tokens(text) for text in prompt_texts)
+    found = sum(1 for article in articles if article is not None)
+    click.echo(f"extract_article on {len(htmls)} pages: {extraction_seconds / len(htmls) * 1000:.2f} ms/page, article found on {found} pages")
+    click.echo(f"  prompt tokens: visible text {visible_tokens}, article {article_tokens} "
+               f"({1 - article_tokens / max(visible_tokens, 1):.1%} reduction)")
+    
+    if ollama_model:
+        from ..summarizer.summarizer import SummarizerService
+        summarizer_service = SummarizerService(ollama_model)
+        for name, texts in (("visible text", visible_texts), ("article", prompt_texts)):
+            start = time.perf_counter()
+            for text in texts[:summaries]:
+                await summarizer_service.summarize_text_v2(text)
+            elapsed = time.perf_counter() - start
+            click.echo(f"  summarization of {name}: {elapsed / min(summaries, len(texts)):.2f} s/page")
+
+@cli.command()
+@click.option("--limit", default=10000, help="Number of stored page urls to benchmark")
+@click.option("--url-file", default=None, help="Read urls, one per line, from a file instead of the database")
+@click.option("--repeat", default=5)
+async def dates(limit: int, url_file: str | None, repeat: int) -> None:
+    urls = await load_urls(limit, url_file)
+    if not urls:
+        click.echo("No urls to benchmark")
+        return
+    click.echo(f"url date extraction on {len(urls)} urls")
+    extractors: list[tuple[str, Callable[[list[str]], list[datetime | None]]]] = [
+        ("legacy", lambda batch: [extract_date_from_url_legacy(url) for url in batch]),
+        ("regex", lambda batch: [extract_date_from_url(url) for url in batch]),
+        ("batch", extract_dates_from_urls),
+    ]
+    for name, extract in extractors:
+        start = time.perf_counter()
+        for _ in range(repeat):
+            results = extract(urls)
+        elapsed = time.perf_counter() - start
+        found = sum(1 for result in results if result is not None)
+        click.echo(f"  {name:>8}: {len(urls) * repeat / elapsed:12.0f} urls/s, dates found {found}")
+
+@cli.command()
+@click.option("--image-dir", required=True, help="Directory of downloaded page images")
+@click.option("--repeat", default=3)
+async def images(image_dir: str, repeat: int) -> None:
+    img_bytes_list = load_image_dir(image_dir)
+    click.echo(f"thumbnails of {len(img_bytes_list)} images")
+
+    start = time.perf_counter()
+    for _ in range(repeat):
+        legacy_decoded_bytes = [make_thumbnail_legacy(img_bytes)[1] for img_bytes in img_bytes_list]
+    elapsed = time.perf_counter() - start
+    click.echo(f"  {'legacy':>6}: {elapsed / (len(img_bytes_list) * repeat) * 1000:8.2f} ms/image, "
+               f"decoded max {max(legacy_decoded_bytes) / 1000:8.0f} KB, average {sum(legacy_decoded_bytes) / len(legacy_decoded_bytes) / 1000:8.0f} KB")
+
+    for format in ("png", "webp"):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            thumbnails = [make_thumbnail(img_bytes, format) for img_bytes in img_bytes_list]
+        elapsed = time.perf_counter() - start
+        decoded_bytes = [thumbnail.decoded_bytes for thumbnail in thumbnails]
+        decode_ms = sum(thumbnail.decode_seconds for thumbnail in thumbnails) / len(thumbnails) * 1000
+        output_bytes = sum(len(thumbnail.content) for thumbnail in thumbnails) / len(thumbnails)
+        click.echo(f"  {format:>6}: {elapsed / (len(img_bytes_list) * repeat) * 1000:8.2f} ms/image, "
+                   f"decoded max {max(decoded_bytes) / 1000:8.0f} KB, average {sum(decoded_bytes) / len(decoded_bytes) / 1000:8.0f} KB, "
+                   f"decode {decode_ms:.2f} ms, thumbnail {output_bytes:.0f} bytes")
+
+class StatementCounter:
+    """Counts the statements sent to the database while it is entered."""
+
+    def __init__(self) -> None:
+        self.count = 0
+
+    def _count(self, *args) -> None:
+        self.count += 1
+
+    def __enter__(self) -> "StatementCounter":
+        event.listen(Database._engine.sync_engine, "before_cursor_execute", self._count)  # type: ignore[union-attr]
+        return self
+
+    def __exit__(self, *args) -> None:
+        event.remove(Database._engine.sync_engine, "before_cursor_execute", self._count)  # type: ignore[union-attr]
+
+async def seed_cleanup_channel(channel_normalized_url_hash: str, urls: list[str], chunk_size: int = 2000) -> None:
+    """Web pages of the channel, each with an audio content waiting to be summarized."""
+    for chunk_start in range(0, len(urls), chunk_size):
+        chunk = [(url, normalize_url(url)) for url in urls[chunk_start:chunk_start + chunk_size]]
+        async for session in Database.get_session():
+            # urls of a url file may be stored pages already, those are left alone
+            result = await session.execute(pg_insert(WebPage).values([
+                dict(url=url, normalized_url=normalized_url, normalized_url_hash=normalized_url_hash(normalized_url),
+                     channel_normalized_url_hash=channel_normalized_url_hash, web_channel_id=0, status_code=200)
+                for url, normalized_url in chunk
+            ]).on_conflict_do_nothing().returning(WebPage.normalized_url_hash))
+            seeded_hashes = list(result.scalars().all())
+            if seeded_hashes:
+                await session.execute(pg_insert(AudioContent).values([
+                    dict(web_page_normalized_url_hash=seeded_hash, state=AudioContentState.IMPORTED_NEED_SUMMARIZING)
+                    for seeded_hash in seeded_hashes
+                ]))
+
+def of_channel_pages(channel_normalized_url_hash: str):
+    """Where clause of the audio contents of the channel's pages."""
+    return AudioContent.web_page_normalized_url_hash.in_(
+        select(WebPage.normalized_url_hash).where(WebPage.channel_normalized_url_hash == channel_normalized_url_hash))
+
+async def clean_channel_per_url(channel_normalized_url_hash: str, include_path_patterns: list[str], exclude_path_patterns: list[str]) -> int:
+    """The cleanup before batching: one query per page, one upsert per hidden page."""
+    hidden_count = 0
+    async for session in Database.get_session():
+        include_path_filter = PathFilter(include_path_patterns, True)
+        exclude_path_filter = PathFilter(exclude_path_patterns, False)
+        for normalized_url in await WebPageService(session).find_normalized_urls_by_channel(channel_normalized_url_hash):
+            result = await session.execute(select(AudioContent).where(AudioContent.web_page_normalized_url_hash == normalized_url_hash(normalized_url)))
+            audio_content = result.scalars().first()
+            if audio_content is None:
+                continue
+            if not include_path_filter.is_passing(normalized_url) or exclude_path_filter.is_passing(normalized_url):
+                if audio_content.state != AudioContentState.HIDDEN:
+                    audio_content.state = AudioContentState.HIDDEN
+                    await AudioContentService(session).upsert(audio_content)
+                    hidden_count += 1
+    return hidden_count
+
+async def clean_channel_batched(channel_normalized_url_hash: str, include_path_patterns: list[str], exclude_path_patterns: list[str]) -> tuple[int, float]:
+    """The sequence of scraperjob's clean_channel_web_pages, returns (hidden pages, seconds spent filtering)."""
+    async for session in Database.get_session():
+        audio_content_service = AudioContentService(session)
+        pages = await audio_content_service.find_unhidden_by_channel(channel_normalized_url_hash)
+        start = time.perf_counter()
+        excluded = filtered_out([normalized_url for normalized_url, _ in pages], include_path_patterns, exclude_path_patterns)
+        filter_seconds = time.perf_counter() - start
+        hidden_count = await audio_content_service.hide_many([pages[i][1] for i in np.flatnonzero(excluded)])
+        return hidden_count, filter_seconds
+    return 0, 0.0
+
+@cli.command()
+@click.option("--pages", default=50_000, help="Number of channel pages, generated unless read from a file")
+@click.option("--url-file", default=None, help="Read urls, one per line, from a file instead of generating them")
+@click.option("--include", "include_path_patterns", multiple=True, default=["/news/*", "/sport/*"])
+@click.option("--exclude", "exclude_path_patterns", multiple=True, default=["*/tag/*", "*/video/*"])
+async def cleanup(pages: int, url_file: str | None, include_path_patterns: tuple[str, ...], exclude_path_patterns: tuple[str, ...]) -> None:
+    """Seeds a throwaway channel in the database and times both cleanups on it, the rows are deleted afterwards."""
+    run_id = uuid.uuid4().hex
+    urls = await load_urls(pages, url_file) if url_file else [
+        f"https://{run_id}.example.com/{section}/{year}/{topic}/article-{i}.html"
+        for i in range(pages)
+        for section, year, topic in [(("news", "sport", "blog")[i % 3], 2020 + i % 5, ("politics", "tag", "video", "world")[i % 4])]
+    ]
+    include, exclude = list(include_path_patterns), list(exclude_path_patterns)
+    channel_normalized_url_hash = run_id
+    click.echo(f"channel cleanup of {len(urls)} pages")
+
+    start = time.perf_counter()
+    await seed_cleanup_channel(channel_normalized_url_hash, urls)
+    click.echo(f"  seeded in {time.perf_counter() - start:.1f} s")
+    try:
+        with StatementCounter() as per_url_statements:
+            start = time.perf_counter()
+            per_url_hidden_count = await clean_channel_per_url(channel_normalized_url_hash, include, exclude)
+            per_url_elapsed = time.perf_counter() - start
+
+        async for session in Database.get_session():
+            await session.execute(update(AudioContent).where(of_channel_pages(channel_normalized_url_hash))
+                                  .values(state=AudioContentState.IMPORTED_NEED_SUMMARIZING))
+
+        with StatementCounter() as batched_statements:
+            start = time.perf_counter()
+            batched_hidden_count, filter_seconds = await clean_channel_batched(channel_normalized_url_hash, include, exclude)
+            batched_elapsed = time.perf_counter() - start
+        assert batched_hidden_count == per_url_hidden_count
+
+        click.echo(f"  {'per url':>8}: {per_url_elapsed * 1000:10.1f} ms, {per_url_statements.count} statements, {per_url_hidden_count} pages hidden")
+        click.echo(f"  {'batched':>8}: {batched_elapsed * 1000:10.1f} ms, {batched_statements.count} statements, {batched_hidden_count} pages hidden, "
+                   f"path filtering {filter_seconds * 1000:.1f} ms")
+    finally:
+        async for session in Database.get_session():
+            await session.execute(delete(AudioContent).where(of_channel_pages(channel_normalized_url_hash)))
+            await session.execute(delete(WebPage).where(WebPage.channel_normalized_url_hash == channel_normalized_url_hash))
+
+def measure_seconds(func: Callable[[], object], repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat
+
+@cli.command()
+@click.option("--limit", default=200, help="Number of stored pages to benchmark")
+@click.option("--repeat", default=5)
+async def content(limit: int, repeat: int) -> None:
+    contents = await load_stored_page_contents(limit)
+    if not contents:
+        click.echo("No pages to benchmark")
+        return
+    pickled = [pickle.dumps(web_page_content) for web_page_content in contents]
+    encoded = [web_page_content.to_bytes() for web_page_content in contents]
+    click.echo(f"web page content storage of {len(contents)} pages")
+
+    for name, blobs, decode_all, decode_visible_text in (
+        ("pickle", pickled, pickle.loads, pickle.loads),
+        ("zstd", encoded, WebPageContent.from_bytes, lambda blob: ContentReader(blob).field("visible_text")),
+    ):
+        size = sum(len(blob) for blob in blobs)
+        all_seconds = measure_seconds(lambda: [decode_all(blob) for blob in blobs], repeat)
+        visible_text_seconds = measure_seconds(lambda: [decode_visible_text(blob) for blob in blobs], repeat)
+        click.echo(f"  {name:>6}: {size / len(blobs) / 1000:8.1f} KB/page, decode {all_seconds / len(blobs) * 1000:6.3f} ms/page, "
+                   f"visible_text only {visible_text_seconds / len(blobs) * 1000:6.3f} ms/page")
+
+    # what a reader of the extracted fields downloads once the raw body is its own object
+    fields_size = sum(len(web_page_content.to_bytes(external_content=True)) for web_page_content in contents)
+    raw_size = sum(len(web_page_content.content_to_bytes() or b"") for web_page_content in contents)
+    click.echo(f"  {'split':>6}: fields {fields_size / len(contents) / 1000:8.1f} KB/page, raw body {raw_size / len(contents) / 1000:8.1f} KB/page")
+
+    section_sizes: dict[str, list[int]] = {}
+    for blob in encoded:
+        for name, (size, raw_size) in ContentReader(blob).section_sizes().items():
+            sizes = section_sizes.setdefault(name, [0, 0])
+            sizes[0] += size
+            sizes[1] += raw_size
+    for name, (size, raw_size) in sorted(section_sizes.items(), key=lambda item: -item[1][1]):
+        click.echo(f"  {name:>16}: {raw_size / len(encoded) / 1000:8.1f} KB -> {size / len(encoded) / 1000:8.1f} KB")
+
+async def load_channel_bodies(pages_per_channel: int, html_dir: str | None) -> dict[str, list[bytes]]:
+    """Raw bodies of stored pages by channel, or of the files of every subdirectory of html_dir."""
+    if html_dir:
+        return {
+            channel_dir: [html.encode("utf-8") for html in load_html_dir(os.path.join(html_dir, channel_dir))[:pages_per_channel]]
+            for channel_dir in sorted(os.listdir(html_dir)) if os.path.isdir(os.path.join(html_dir, channel_dir))
+        }
+    bodies: dict[str, list[bytes]] = {}
+    async for session in Database.get_session():
+        web_page_service = WebPageService(session)
+        for channel in await WebPageChannelService(session).find_all():
+            normalized_urls = await web_page_service.find_normalized_urls_by_channel(channel.normalized_url_hash)
+            web_pages = [await web_page_service.find_by_url(normalized_url) for normalized_url in normalized_urls[:pages_per_channel]]
+            contents = await asyncio.gather(*[web_page_service.get_content(web_page, ("content",)) for web_page in web_pages if web_page])
+            bodies[channel.normalized_url] = [content.content for content in contents if content is not None and content.content]
+    return bodies
+
+def measure_compression(samples: list[bytes], dictionary: ContentDictionary | None, repeat: int) -> tuple[int, float, float]:
+    """(stored bytes, compression MB/s, decompression MB/s) of samples stored as raw bodies."""
+    raw_size = sum(len(sample) for sample in samples)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        blobs = [encode_fields({"content": sample}, dictionary=dictionary) for sample in samples]
+    compression_seconds = time.perf_counter() - start
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for blob in blobs:
+            reader = ContentReader(blob)
+            if dictionary is not None:
+                reader.use_dictionary(dictionary)
+            reader.field("content")
+    decompression_seconds = time.perf_counter() - start
+    return sum(len(blob) for blob in blobs), raw_size * repeat / compression_seconds / 1_000_000, raw_size * repeat / decompression_seconds / 1_000_000
+
+@cli.command()
+@click.option("--pages", default=250, help="Number of stored pages per channel, a fifth is held out of training")
+@click.option("--html-dir", default=None, help="Read pages from the subdirectories of a directory, one per channel, instead of the database")
+@click.option("--repeat", default=3)
+async def dictionary(pages: int, html_dir: str | None, repeat: int) -> None:
+    channel_bodies = {channel: bodies for channel, bodies in (await load_channel_bodies(pages, html_dir)).items() if len(bodies) >= 20}
+    if not channel_bodies:
+        click.echo("No channels with enough pages to benchmark")
+        return
+    click.echo(f"per channel zstd dictionaries on {len(channel_bodies)} channels, measured on held out pages")
+    totals = {"plain": [0, 0.0, 0.0], "dictionary": [0, 0.0, 0.0]}
+    raw_total = 0
+    for channel, bodies in channel_bodies.items():
+        held_out = bodies[::5]
+        start = time.perf_counter()
+        channel_dictionary = train_dictionary(channel, [body for i, body in enumerate(bodies) if i % 5])
+        training_seconds = time.perf_counter() - start
+        raw_size = sum(len(body) for body in held_out)
+        raw_total += raw_size
+        line = f"  {channel[:40]:>40}: {len(bodies)} pages, trained in {training_seconds:.2f} s"
+        for name, used_dictionary in (("plain", None), ("dictionary", channel_dictionary)):
+            size, compression_mb_per_second, decompression_mb_per_second = measure_compression(held_out, used_dictionary, repeat)
+            totals[name][0] += size
+            totals[name][1] += compression_mb_per_second * raw_size
+            totals[name][2] += decompression_mb_per_second * raw_size
+            line += f", {name} ratio {raw_size / size:.2f}"
+        click.echo(line)
+    for name, (size, compression_weighted, decompression_weighted) in totals.items():
+        click.echo(f"  {name:>10}: ratio {raw_total / size:6.2f}, compress {compression_weighted / raw_total:8.1f} MB/s, "
+                   f"decompress {decompression_weighted / raw_total:8.1f} MB/s")
+
+if __name__ == "__main__":
+    cli()
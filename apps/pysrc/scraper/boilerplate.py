@@ -0,0 +1,150 @@
+from typing import Dict, List, Optional
+import hashlib
+from collections import Counter
+from dataclasses import dataclass
+from lxml import etree
+from .text import TEXTIFY_SKIPPED_TAGS
+
+# Elements that start a new text block; text between them forms one block
+BLOCK_TAGS = frozenset([
+    "address", "article", "aside", "blockquote", "br", "dd", "details", "dialog", "div", "dl", "dt",
+    "fieldset", "figcaption", "figure", "footer", "form", "h1", "h2", "h3", "h4", "h5", "h6",
+    "header", "hr", "li", "main", "nav", "ol", "p", "pre", "section", "summary", "table", "td",
+    "th", "tr", "ul", "title", "body", "html", "head",
+])
+
+class _BlockTarget:
+    """lxml parser target splitting visible text into blocks at block-level element boundaries."""
+
+    def __init__(self) -> None:
+        self.blocks: List[str] = []
+        self.current: List[str] = []
+        self.skipped_depth = 0
+
+    def _flush(self) -> None:
+        text = ' '.join(''.join(self.current).split())
+        if text:
+            self.blocks.append(text)
+        self.current = []
+
+    def start(self, tag: str, attrib: Dict[str, str]) -> None:
+        if tag in TEXTIFY_SKIPPED_TAGS:
+            self.skipped_depth += 1
+        elif tag in BLOCK_TAGS:
+            self._flush()
+
+    def end(self, tag: str) -> None:
+        if tag in TEXTIFY_SKIPPED_TAGS:
+            if self.skipped_depth > 0:
+                self.skipped_depth -= 1
+        elif tag in BLOCK_TAGS:
+            self._flush()
+
+    def data(self, data: str) -> None:
+        if not self.skipped_depth:
+            self.current.append(data)
+
+    def comment(self, text: str) -> None:
+        pass
+
+    def close(self) -> List[str]:
+        self._flush()
+        return self.blocks
+
+def extract_blocks(html: str) -> List[str]:
+    """Whitespace-normalized text blocks of the page in document order, script and style excluded."""
+    if not html.strip():
+        return []
+    parser = etree.HTMLParser(target=_BlockTarget())
+    parser.feed(html)
+    return parser.close()
+
+def block_hash(block: str) -> str:
+    return hashlib.blake2b(block.lower().encode("utf-8"), digest_size=8).hexdigest()
+
+def count_tokens(text: str) -> int:
+    """Whitespace token count, a cheap proxy for LLM prompt tokens."""
+    return len(text.split())
+
+@dataclass(frozen=True)
+class ChannelTemplate:
+    block_hashes: frozenset[str]
+
+    @classmethod
+    def from_block_hashes(cls, block_hashes: List[str] | None) -> "ChannelTemplate":
+        return cls(frozenset(block_hashes or []))
+
+    @property
+    def template_id(self) -> str:
+        """Changes whenever the learned block set changes, so signatures of stripped text stay comparable."""
+        digest = hashlib.blake2b(digest_size=8)
+        for hash in sorted(self.block_hashes):
+            digest.update(hash.encode("ascii"))
+        return digest.hexdigest()
+
+    def differs_materially(self, other: "ChannelTemplate", min_overlap: float = 0.9) -> bool:
+        """Whether the block sets overlap less than min_overlap, a relearned template that does not keeps the stored one."""
+        union = self.block_hashes | other.block_hashes
+        if not union:
+            return False
+        return len(self.block_hashes & other.block_hashes) / len(union) < min_overlap
+
+def strip_template_blocks(blocks: List[str], template: Optional[ChannelTemplate]) -> List[str]:
+    if template is None or not template.block_hashes:
+        return blocks
+    return [block for block in blocks if block_hash(block) not in template.block_hashes]
+
+def strip_template(html: str, template: Optional[ChannelTemplate]) -> str:
+    """Visible text of the page without the channel's boilerplate blocks, one block per line."""
+    return '\n'.join(strip_template_blocks(extract_blocks(html), template))
+
+@dataclass
+class TemplateReport:
+    page_count: int
+    template_block_count: int
+    tokens_before: int
+    tokens_after: int
+
+    @property
+    def token_reduction(self) -> float:
+        if self.tokens_before == 0:
+            return 0.0
+        return 1.0 - self.tokens_after / self.tokens_before
+
+class TemplateLearner:
+    """
+    Learns a channel template: blocks that appear on at least min_page_ratio of the channel's pages.
+    """
+
+    def __init__(self, min_page_ratio: float = 0.5, min_pages: int = 5) -> None:
+        self.min_page_ratio = min_page_ratio
+        self.min_pages = min_pages
+        self._page_blocks: List[List[str]] = []
+        self._document_frequency: Counter[str] = Counter()
+
+    def add_page(self, html: str) -> None:
+        blocks = extract_blocks(html)
+        self._page_blocks.append(blocks)
+        self._document_frequency.update(set(block_hash(block) for block in blocks))
+
+    def build(self) -> Optional[ChannelTemplate]:
+        page_count = len(self._page_blocks)
+        if page_count < self.min_pages:
+            return None
+        min_frequency = max(2, self.min_page_ratio * page_count)
+        return ChannelTemplate(frozenset(
+            hash for hash, frequency in self._document_frequency.items() if frequency >= min_frequency
+        ))
+
+    def report(self, template: ChannelTemplate) -> TemplateReport:
+        tokens_before = 0
+        tokens_after = 0
+        for blocks in self._page_blocks:
+            tokens_before += sum(count_tokens(block) for block in blocks)
+            tokens_after += sum(count_tokens(block) for block in strip_template_blocks(blocks, template))
+        return TemplateReport(
+            page_count=len(self._page_blocks),
+            template_block_count=len(template.block_hashes),
+            tokens_before=tokens_before,
+            tokens_after=tokens_after,
+        )
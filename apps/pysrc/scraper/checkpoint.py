@@ -0,0 +1,168 @@
+import asyncio
+import base64
+import json
+import logging
+import time
+import zlib
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict
+import numpy as np
+import numpy.typing as npt
+from pyminiscraper.model import ScrapeUrlMetadata, ScraperUrl, ScraperUrlType
+
+logger = logging.getLogger("checkpoint")
+
+CHECKPOINT_VERSION = 1
+
+@dataclass
+class DomainCheckpoint:
+    concurrency: int
+    delay_seconds: float
+    average_latency_seconds: float | None
+
+@dataclass
+class CrawlCheckpoint:
+    """
+    Resumable state of one channel crawl: the urls still to scrape in pop order, including the
+    ones in flight when the checkpoint was taken, the url hash keys of the urls already handled,
+    the crawl's counters and the politeness each host converged to.
+    """
+    pending_urls: list[ScraperUrl] = field(default_factory=list)
+    visited_url_keys: npt.NDArray[np.int64] = field(default_factory=lambda: np.zeros(0, dtype=np.int64))
+    requested_urls_count: int = 0
+    success_urls_count: int = 0
+    error_urls_count: int = 0
+    skipped_urls_count: int = 0
+    domains: Dict[str, DomainCheckpoint] = field(default_factory=dict)
+    high_water_marks: Dict[str, str] = field(default_factory=dict)
+    # pending and visited urls left out to keep the checkpoint within its size bounds
+    dropped_urls_count: int = 0
+
+def _encode_datetime(value: datetime | None) -> str | None:
+    return value.isoformat() if value is not None else None
+
+def _decode_datetime(value: str | None) -> datetime | None:
+    return datetime.fromisoformat(value) if value is not None else None
+
+def _encode_url(scraper_url: ScraperUrl) -> Dict[str, Any]:
+    encoded: Dict[str, Any] = {"url": scraper_url.url, "type": scraper_url.type.value, "max_depth": scraper_url.max_depth}
+    if scraper_url.high_priority:
+        encoded["high_priority"] = True
+    metadata = scraper_url.metadata
+    if metadata is not None:
+        encoded["metadata"] = [metadata.title, metadata.description, _encode_datetime(metadata.published_at), metadata.image_url]
+    return encoded
+
+def _decode_url(encoded: Dict[str, Any]) -> ScraperUrl:
+    metadata = None
+    if "metadata" in encoded:
+        title, description, published_at, image_url = encoded["metadata"]
+        metadata = ScrapeUrlMetadata(title, description, _decode_datetime(published_at), image_url)
+    return ScraperUrl(encoded["url"], max_depth=encoded["max_depth"], type=ScraperUrlType(encoded["type"]),
+                      high_priority=encoded.get("high_priority", False), metadata=metadata)
+
+def encode_checkpoint(checkpoint: CrawlCheckpoint, max_pending_urls: int, max_visited_urls: int) -> bytes:
+    """
+    zlib compressed JSON, at most max_pending_urls pending urls, the next ones to pop, and
+    max_visited_urls visited url keys, 8 bytes each. Dropped pending urls are lost for the resumed
+    crawl unless rediscovered, dropped visited urls are scraped again.
+    """
+    pending_urls = checkpoint.pending_urls[:max_pending_urls]
+    visited_url_keys = checkpoint.visited_url_keys[-max_visited_urls:] if max_visited_urls else checkpoint.visited_url_keys[:0]
+    dropped_urls_count = checkpoint.dropped_urls_count \
+        + len(checkpoint.pending_urls) - len(pending_urls) \
+        + len(checkpoint.visited_url_keys) - len(visited_url_keys)
+    document = {
+        "version": CHECKPOINT_VERSION,
+        "pending_urls": [_encode_url(scraper_url) for scraper_url in pending_urls],
+        "visited_url_keys": base64.b64encode(visited_url_keys.astype("<i8").tobytes()).decode("ascii"),
+        "requested_urls_count": checkpoint.requested_urls_count,
+        "success_urls_count": checkpoint.success_urls_count,
+        "error_urls_count": checkpoint.error_urls_count,
+        "skipped_urls_count": checkpoint.skipped_urls_count,
+        "domains": {domain: vars(domain_checkpoint) for domain, domain_checkpoint in checkpoint.domains.items()},
+        "high_water_marks": checkpoint.high_water_marks,
+        "dropped_urls_count": dropped_urls_count,
+    }
+    return zlib.compress(json.dumps(document, separators=(",", ":")).encode("utf-8"))
+
+def decode_checkpoint(data: bytes) -> CrawlCheckpoint:
+    document = json.loads(zlib.decompress(data))
+    if document.get("version") != CHECKPOINT_VERSION:
+        raise ValueError(f"Unsupported checkpoint version {document.get('version')}")
+    return CrawlCheckpoint(
+        pending_urls=[_decode_url(encoded) for encoded in document["pending_urls"]],
+        visited_url_keys=np.frombuffer(base64.b64decode(document["visited_url_keys"]), dtype="<i8").astype(np.int64),
+        requested_urls_count=document["requested_urls_count"],
+        success_urls_count=document["success_urls_count"],
+        error_urls_count=document["error_urls_count"],
+        skipped_urls_count=document["skipped_urls_count"],
+        domains={domain: DomainCheckpoint(**domain_checkpoint) for domain, domain_checkpoint in document["domains"].items()},
+        high_water_marks=document["high_water_marks"],
+        dropped_urls_count=document["dropped_urls_count"],
+    )
+
+@dataclass
+class CheckpointerStats:
+    written_count: int = 0
+    failed_count: int = 0
+    max_bytes: int = 0
+    write_seconds: float = 0.0
+
+class CrawlCheckpointer:
+    """
+    Writes a crawl's checkpoint at most every interval_seconds and only after the crawl made
+    progress. take_checkpoint snapshots the crawl, write_checkpoint persists the encoded bytes;
+    close() stops the background task without writing, the caller deletes or keeps the last one.
+    """
+
+    def __init__(self,
+                 take_checkpoint: Callable[[], Awaitable[CrawlCheckpoint]],
+                 write_checkpoint: Callable[[bytes, CrawlCheckpoint], Awaitable[None]],
+                 interval_seconds: float = 60.0,
+                 max_pending_urls: int = 50_000,
+                 max_visited_urls: int = 200_000) -> None:
+        self._take_checkpoint = take_checkpoint
+        self._write_checkpoint = write_checkpoint
+        self.interval_seconds = interval_seconds
+        self.max_pending_urls = max_pending_urls
+        self.max_visited_urls = max_visited_urls
+        self.stats = CheckpointerStats()
+        self._last_progress: tuple[int, int] | None = None
+        self._task: asyncio.Task[None] | None = None
+        self._closed = asyncio.Event()
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        self._closed.set()
+        if self._task is not None:
+            await self._task
+            self._task = None
+
+    async def checkpoint(self) -> None:
+        started_at = time.perf_counter()
+        try:
+            checkpoint = await self._take_checkpoint()
+            progress = (checkpoint.requested_urls_count + checkpoint.skipped_urls_count, len(checkpoint.pending_urls))
+            if progress == self._last_progress:
+                return
+            data = encode_checkpoint(checkpoint, self.max_pending_urls, self.max_visited_urls)
+            await self._write_checkpoint(data, checkpoint)
+            self._last_progress = progress
+            self.stats.written_count += 1
+            self.stats.max_bytes = max(self.stats.max_bytes, len(data))
+        except Exception as e:
+            self.stats.failed_count += 1
+            logger.error(f"Failed to write crawl checkpoint: {e}")
+        self.stats.write_seconds += time.perf_counter() - started_at
+
+    async def _run(self) -> None:
+        while not self._closed.is_set():
+            try:
+                await asyncio.wait_for(self._closed.wait(), timeout=self.interval_seconds)
+            except asyncio.TimeoutError:
+                await self.checkpoint()
@@ -0,0 +1,524 @@
+import asyncio
+import logging
+import time
+import aiohttp
+import numpy as np
+import numpy.typing as npt
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Dict, Optional
+from typing import override
+from urllib.parse import urlparse
+from pyminiscraper.scraper import Scraper, ScraperError, ScraperLoopResult
+from pyminiscraper.config import ScraperConfig, ScraperCallback, ScraperCallbackError, ScraperContext
+from pyminiscraper.model import ScraperUrl, ScraperUrlType, ScrapeUrlMetadata, ScraperWebPage
+from pyminiscraper.url import normalized_url_hash
+from pyminiscraper.scrape_html_http import HttpHtmlScraperError, HttpHtmlScraperFactory
+from pyminiscraper.extract import PageMetadataExtractor
+from pyminiscraper.sitemap import Sitemap
+from pyminiscraper.feed import Feed
+from pyminiscraper.stats import DomainStats, ScraperStats, analyze_url_groups
+from pyminiscraper.context import ScraperContextImpl
+from pyminiscraper.domain_metadata import DomainMetadata
+from .url_classifier import UrlClassifier, UrlDecision
+from .revalidation import NotModifiedWebPage, RevalidationHeaders, RevalidationStats, get_header
+from .politeness import DomainThrottle, DomainThrottles, parse_retry_after
+from .frontier import RobotsCache
+from .incremental import FeedStreamParser, IncrementalFilter, SitemapStreamParser, high_water_marks_from_dict, high_water_marks_to_dict
+from .checkpoint import CrawlCheckpoint, DomainCheckpoint
+from .url_index import url_hash_key
+from ..summarizer.dateparser import extract_dates_from_urls
+
+logger = logging.getLogger("crawler")
+
+class HttpFetchError(HttpHtmlScraperError):
+    """Failed page request with the status the host answered, None when it never answered."""
+
+    def __init__(self, message: str, status: int | None = None, retry_after_seconds: float | None = None) -> None:
+        super().__init__(message)
+        self.status = status
+        self.retry_after_seconds = retry_after_seconds
+
+@dataclass
+class RzDomainStats(DomainStats):
+    # politeness settings the host's DomainThrottle converged to, shared by all channels of the process
+    concurrency: int | None = None
+    delay_seconds: float | None = None
+    timeout_seconds: float | None = None
+    average_latency_seconds: float | None = None
+    requests_count: int = 0
+    errors_count: int = 0
+    throttled_count: int = 0
+
+@dataclass
+class RzScraperStats(ScraperStats):
+    prioritized_urls_count: int = 0
+    # html urls never requested because their url cluster only yields index pages
+    fetches_saved_count: int = 0
+    # pages per ChangeDetection outcome, filled in by ScraperService
+    change_detection_counts: Dict[str, int] = field(default_factory=dict)
+    # conditional requests sent for stale cached pages and how many were answered with 304
+    revalidated_urls_count: int = 0
+    not_modified_urls_count: int = 0
+    bytes_saved: int = 0
+    seconds_saved: float = 0.0
+    # write-behind persistence of scraped pages, filled in by ScraperService
+    write_flush_count: int = 0
+    write_max_queue_depth: int = 0
+    write_average_flush_seconds: float = 0.0
+    # sitemap and feed entries left out by the incremental filter, unchanged since the last crawl
+    incremental_skipped_urls_count: int = 0
+    incremental_skipped_sitemaps_count: int = 0
+
+class RzScraperCallback(ScraperCallback):
+    """ScraperCallback with the hooks RzScraper needs to revalidate stale cached pages."""
+
+    async def load_revalidation_headers(self, normalized_url: str) -> Optional[RevalidationHeaders]:
+        return None
+
+    async def load_not_modified_web_page(self, normalized_url: str, headers: Dict[str, str]) -> Optional[NotModifiedWebPage]:
+        """Cached page after the origin answered 304, None when it is no longer cached."""
+        return None
+
+    async def on_crawl_finished(self) -> None:
+        """Called before the scraper's http session closes, requests queued by the callback must finish here."""
+        pass
+
+class RzScraper(Scraper):
+    """
+    pyminiscraper Scraper with radiozilla specific scheduling: discovered html urls are run
+    through the channel's UrlClassifier before they are queued, sitemap and feed entries
+    get their url dates extracted in batch, and stale cached pages are revalidated with
+    conditional requests instead of being downloaded again. Given a client_session and a
+    robots_cache it crawls as one channel of a shared CrawlFrontier crawl. Given an
+    incremental_filter, sitemaps and feeds are stream parsed and only entries new or changed
+    since the last crawl are queued.
+    """
+
+    def __init__(self, config: ScraperConfig, url_classifier: UrlClassifier | None = None, revalidate_stale_pages: bool = True,
+                 domain_throttles: DomainThrottles | None = None, client_session: aiohttp.ClientSession | None = None,
+                 robots_cache: RobotsCache | None = None, incremental_filter: IncrementalFilter | None = None) -> None:
+        super().__init__(config)
+        # pyminiscraper always opens a client, it stays unused and is closed with the scraper when one is shared
+        self.owned_client_session: aiohttp.ClientSession | None = None
+        if client_session is not None:
+            self.owned_client_session = self.client_session
+            self.client_session = client_session
+            self.http_html_scraper_factory = HttpHtmlScraperFactory(client_session)
+        self.robots_cache = robots_cache
+        self.incremental_filter = incremental_filter
+        # crawl progress for checkpoints: urls being scraped and url hash keys of the urls handled so far
+        self.in_flight_urls: Dict[str, ScraperUrl] = {}
+        self.visited_url_keys: list[int] = []
+        self.resumed_visited_url_keys: npt.NDArray[np.int64] = np.zeros(0, dtype=np.int64)
+        self.resumed_checkpoint: CrawlCheckpoint | None = None
+        self.domain_throttles = domain_throttles or DomainThrottles.instance()
+        self.throttled_domains: set[str] = set()
+        self.url_classifier = url_classifier
+        self.classified_urls: set[str] = set()
+        self.revalidate_stale_pages = revalidate_stale_pages
+        self.revalidation_stats = RevalidationStats()
+
+    def _is_classifiable(self, scraper_url: ScraperUrl, skip_path_filter: bool) -> bool:
+        # seeds, context queued urls and feed/sitemap entries were listed explicitly, never second-guess them
+        if self.url_classifier is None or skip_path_filter or scraper_url.type != ScraperUrlType.HTML or scraper_url.metadata is not None:
+            return False
+        normalized_url = scraper_url.normalized_url
+        if normalized_url in self.queued_urls or normalized_url in self.classified_urls:
+            return False
+        return self._is_domain_allowed(normalized_url) \
+            and not self.exclude_path_patterns.is_passing(normalized_url) \
+            and self.include_path_patterns.is_passing(normalized_url)
+
+    def _was_visited_before_resume(self, normalized_url: str) -> bool:
+        if not len(self.resumed_visited_url_keys):
+            return False
+        key = url_hash_key(normalized_url_hash(normalized_url))
+        position = int(np.searchsorted(self.resumed_visited_url_keys, key))
+        return position < len(self.resumed_visited_url_keys) and self.resumed_visited_url_keys[position] == key
+
+    @override
+    async def _queue_scraper_url(self, scraper_url: ScraperUrl, skip_path_filter: bool = False) -> None:
+        if scraper_url.normalized_url not in self.queued_urls and self._was_visited_before_resume(scraper_url.normalized_url):
+            return
+        if self.url_classifier is not None and self._is_classifiable(scraper_url, skip_path_filter):
+            self.classified_urls.add(scraper_url.normalized_url)
+            decision = self.url_classifier.decide(scraper_url.normalized_url)
+            if decision == UrlDecision.SKIP:
+                logger.info(f"skipping url before queueing - index cluster - {scraper_url.normalized_url}")
+                return
+            if decision == UrlDecision.PRIORITY:
+                scraper_url.high_priority = True
+        await super()._queue_scraper_url(scraper_url, skip_path_filter)
+
+    @override
+    async def _enqueue_sitemap_urls(self, sitemap: Sitemap) -> None:
+        # dates embedded in the urls are extracted for the whole sitemap in one pass
+        url_dates = extract_dates_from_urls([page_url.loc for page_url in sitemap.page_urls])
+        for page_url, url_date in zip(sitemap.page_urls, url_dates):
+            await self._queue_scraper_url(
+                ScraperUrl(page_url.loc,
+                           max_depth=self.config.max_depth,
+                           type=ScraperUrlType.HTML,
+                           metadata=ScrapeUrlMetadata(
+                                 None, None, url_date or page_url.lastmod, None
+                           )
+                )
+            )
+
+        for sitemap_url in sitemap.sitemap_urls:
+            await self._queue_scraper_url(
+                ScraperUrl(sitemap_url.loc, max_depth=self.config.max_depth, type=ScraperUrlType.SITEMAP)
+            )
+
+    @override
+    async def _enqueue_feed_urls(self, rss: Feed) -> None:
+        items = [item for item in rss.items if item.link]
+        url_dates = extract_dates_from_urls([item.link or "" for item in items])
+        for item, url_date in zip(items, url_dates):
+            metadata = ScrapeUrlMetadata(
+                item.title, item.description, item.pub_date or url_date,
+                None if item.description is None else PageMetadataExtractor(item.link or "", item.description).get_image_url()
+            )
+            await self._queue_scraper_url(ScraperUrl(item.link or "", max_depth=self.config.max_depth, type=ScraperUrlType.HTML, metadata=metadata))
+
+    def _can_revalidate(self) -> bool:
+        return self.revalidate_stale_pages and not self.config.use_headless_browser
+
+    async def _domain_throttle(self, url: ScraperUrl) -> DomainThrottle:
+        domain = urlparse(url.normalized_url).netloc
+        throttle = self.domain_throttles.get(domain)
+        if domain not in self.throttled_domains:
+            self.throttled_domains.add(domain)
+            # already downloaded by the scrape loop before it asked for the page
+            domain_metadata = await self._get_domain_metadata(url)
+            throttle.set_crawl_delay(domain_metadata.robots.crawl_delay(self.config.user_agent))
+        return throttle
+
+    async def _fetch_html(self, normalized_url: str, request_headers: Dict[str, str], timeout_seconds: float) -> tuple[ScraperWebPage | None, Dict[str, str]]:
+        """GET of an html page, returns (None, headers) when a conditional request is answered with 304."""
+        try:
+            async with self.client_session.get(normalized_url, headers=request_headers, timeout=aiohttp.ClientTimeout(total=timeout_seconds)) as http_response:
+                headers = {str(k): str(v) for k, v in dict(http_response.headers).items()}
+                if http_response.status == 304:
+                    return None, headers
+                if not http_response.status == 200:
+                    raise HttpFetchError(f"Error fetching {normalized_url}: {http_response.status}",
+                                         http_response.status, parse_retry_after(get_header(headers, "Retry-After")))
+                if not http_response.content_type.startswith('text/html'):
+                    raise HttpFetchError(f"Non html content {normalized_url}: {http_response.content_type}", http_response.status)
+                html_content = await http_response.text()
+                return ScraperWebPage(
+                    status_code=http_response.status,
+                    headers=headers,
+                    content=html_content.encode("utf-8") if html_content is not None else None,
+                    content_type="text/html",
+                    content_charset="utf-8",
+                    url=normalized_url,
+                    normalized_url=normalized_url,
+                    requested_at=datetime.now(),
+                ), headers
+        except HttpFetchError:
+            raise
+        except Exception as e:
+            raise HttpFetchError(f"Failed to fetch page: {normalized_url}") from e
+
+    async def _download_page(self, url: ScraperUrl, revalidation_headers: RevalidationHeaders | None = None) -> tuple[ScraperWebPage | None, Dict[str, str], float]:
+        """
+        Download throttled by the host's DomainThrottle, which replaces pyminiscraper's single
+        crawl-wide rate limiter for pages. Returns (page, response headers, seconds), page is None
+        when the host answered the conditional request with 304.
+        """
+        throttle = await self._domain_throttle(url)
+        await throttle.acquire()
+        started_at = time.perf_counter()
+        status: int | None = None
+        retry_after_seconds: float | None = None
+        try:
+            page: ScraperWebPage | None
+            if self.config.use_headless_browser and self.browser_html_scraper_factory:
+                page, headers = await self.browser_html_scraper_factory.new_scraper().scrape(url.normalized_url), {}
+            else:
+                request_headers = revalidation_headers.to_request_headers() if revalidation_headers else {}
+                page, headers = await self._fetch_html(url.normalized_url, request_headers, throttle.timeout_seconds)
+            status = 200 if page is not None else 304
+            self.back_to_back_errors = 0
+        except Exception as e:
+            if isinstance(e, HttpFetchError):
+                status, retry_after_seconds = e.status, e.retry_after_seconds
+            await self._on_download_error(url)
+            raise ScraperError(f"Failed to fetch page {self._url_context(url)}") from e
+        finally:
+            elapsed = time.perf_counter() - started_at
+            await throttle.release(elapsed, status, retry_after_seconds)
+        return page, headers, elapsed
+
+    @override
+    async def _load_or_download_page(self, context: ScraperContext, url: ScraperUrl) -> ScraperWebPage:
+        callback = self.config.callback
+        revalidation_headers = None
+        try:
+            page = await callback.load_web_page_from_cache(url.normalized_url)
+            if page is None and self._can_revalidate() and isinstance(callback, RzScraperCallback):
+                revalidation_headers = await callback.load_revalidation_headers(url.normalized_url)
+        except Exception as e:
+            raise ScraperCallbackError(f"Error loading page {self._url_context(url)}") from e
+        if page:
+            return page
+
+        downloaded_page, headers, elapsed = await self._download_page(url, revalidation_headers)
+        if revalidation_headers is not None:
+            self.revalidation_stats.revalidated_count += 1
+        if downloaded_page is not None:
+            self.revalidation_stats.download_count += 1
+            self.revalidation_stats.download_seconds += elapsed
+            return await self._save_downloaded_page(context, url, downloaded_page)
+
+        try:
+            not_modified_page = await callback.load_not_modified_web_page(url.normalized_url, headers) if isinstance(callback, RzScraperCallback) else None
+        except Exception as e:
+            raise ScraperCallbackError(f"Error loading not modified page {self._url_context(url)}") from e
+        if not_modified_page is None:
+            # the cached copy vanished after its validators were read
+            downloaded_page, _, _ = await self._download_page(url)
+            if downloaded_page is None:
+                raise ScraperError(f"Not modified response to an unconditional request {self._url_context(url)}")
+            return await self._save_downloaded_page(context, url, downloaded_page)
+        self.revalidation_stats.not_modified_count += 1
+        self.revalidation_stats.not_modified_seconds += elapsed
+        self.revalidation_stats.bytes_saved += not_modified_page.content_size
+        return not_modified_page.page
+
+    async def _on_download_error(self, url: ScraperUrl) -> None:
+        logger.warning(f"Failed to fetch page {self._url_context(url)}")
+        self.back_to_back_errors += 1
+        if self.back_to_back_errors >= self.config.max_back_to_back_errors:
+            logger.error(f"Terminating due to maximum back to back errors reached")
+            await self.stop()
+
+    async def _save_downloaded_page(self, context: ScraperContext, url: ScraperUrl, page: ScraperWebPage) -> ScraperWebPage:
+        page = await self._extract_metadata_and_save(context, url, page)
+        page.requested_at = datetime.now()
+        return page
+
+    async def _stream_xml(self, normalized_url: str, parser: SitemapStreamParser | FeedStreamParser) -> None:
+        async with self.client_session.get(normalized_url, timeout=aiohttp.ClientTimeout(total=self.config.request_timeout_seconds)) as http_response:
+            if http_response.status != 200:
+                raise HttpFetchError(f"Error fetching {normalized_url}: {http_response.status}", http_response.status)
+            async for chunk in http_response.content.iter_chunked(64 * 1024):
+                parser.feed(chunk)
+
+    @override
+    async def _download_sitemap(self, normalized_url: str) -> Sitemap:
+        if self.incremental_filter is None:
+            return await super()._download_sitemap(normalized_url)
+        parser = SitemapStreamParser(normalized_url, self.incremental_filter)
+        await self._stream_xml(normalized_url, parser)
+        sitemap = parser.close()
+        self.sitemaps[normalized_url] = sitemap
+        return sitemap
+
+    @override
+    async def _download_feed(self, normalized_url: str) -> Feed:
+        if self.incremental_filter is None:
+            return await super()._download_feed(normalized_url)
+        parser = FeedStreamParser(normalized_url, self.incremental_filter)
+        await self._stream_xml(normalized_url, parser)
+        feed = parser.close()
+        self.feeds[normalized_url] = feed
+        return feed
+
+    @override
+    async def _download_domain_metadata(self, domain_url: str) -> DomainMetadata:
+        if self.robots_cache is None:
+            return await super()._download_domain_metadata(domain_url)
+        robot = await self.robots_cache.get(domain_url, self.client_session)
+        self.request_rate_limiter.reset(robot.crawl_delay(self.config.user_agent) or self.config.crawl_delay_seconds)
+        # robots sitemaps are queued by every channel, the cache only saves the download
+        if self.config.follow_sitemap_links:
+            await self._queue_scraper_urls(list(robot.sitemap_urls), ScraperUrlType.SITEMAP)
+        return DomainMetadata(robots=robot, domain_url=domain_url)
+
+    @override
+    async def _close(self) -> None:
+        if isinstance(self.config.callback, RzScraperCallback):
+            await self.config.callback.on_crawl_finished()
+        if self.owned_client_session is None:
+            await super()._close()
+            return
+        # the shared client belongs to the crawl, it is closed by whoever created it
+        await self.owned_client_session.close()
+        if self.browser_html_scraper_factory:
+            await self.browser_html_scraper_factory.close()
+
+    def checkpoint(self) -> CrawlCheckpoint:
+        """Snapshot of the crawl for a resume, urls in flight are pending again."""
+        queued = [scraper_url for scraper_url in reversed(self.url_queue._deque) if not scraper_url.is_terminal()]
+        checkpoint = CrawlCheckpoint(
+            pending_urls=list(self.in_flight_urls.values()) + queued,
+            visited_url_keys=np.concatenate([self.resumed_visited_url_keys, np.array(self.visited_url_keys, dtype=np.int64)]),
+            requested_urls_count=self.requested_urls_count,
+            success_urls_count=self.success_urls_count,
+            error_urls_count=self.error_urls_count,
+            skipped_urls_count=self.skipped_urls_count,
+            domains={
+                domain: DomainCheckpoint(settings.concurrency, settings.delay_seconds, settings.average_latency_seconds)
+                # hosts restored from the last checkpoint but not requested since keep their settings
+                for domain in self.throttled_domains | set(self.resumed_checkpoint.domains if self.resumed_checkpoint else ())
+                for settings in [self.domain_throttles.get(domain).settings()]
+            },
+            high_water_marks=high_water_marks_to_dict(self.incremental_filter.high_water_marks) if self.incremental_filter else {},
+        )
+        if self.resumed_checkpoint is not None:
+            checkpoint.dropped_urls_count = self.resumed_checkpoint.dropped_urls_count
+        return checkpoint
+
+    def resume(self, checkpoint: CrawlCheckpoint) -> None:
+        """
+        Continues a checkpointed crawl, called before start(): pending urls are queued in their
+        old order, visited urls are never queued again, hosts keep their politeness settings.
+        The counters go on from the checkpoint's, max_requested_urls caps the whole crawl.
+        """
+        self.resumed_checkpoint = checkpoint
+        self.requested_urls_count = checkpoint.requested_urls_count
+        self.success_urls_count = checkpoint.success_urls_count
+        self.error_urls_count = checkpoint.error_urls_count
+        self.skipped_urls_count = checkpoint.skipped_urls_count
+        self.resumed_visited_url_keys = np.sort(checkpoint.visited_url_keys)
+        for domain, domain_checkpoint in checkpoint.domains.items():
+            self.domain_throttles.get(domain).restore(
+                domain_checkpoint.concurrency, domain_checkpoint.delay_seconds, domain_checkpoint.average_latency_seconds)
+        if self.incremental_filter is not None:
+            for source_url, modified_at in high_water_marks_from_dict(checkpoint.high_water_marks).items():
+                self.incremental_filter.advance(source_url, modified_at)
+
+    async def start(self) -> None:
+        """Queues the seeds, the first step of run() and of a shared CrawlFrontier crawl."""
+        if self.resumed_checkpoint is not None:
+            # in pop order, the queue pops from the right
+            for scraper_url in self.resumed_checkpoint.pending_urls:
+                if scraper_url.normalized_url not in self.queued_urls:
+                    self.queued_urls.add(scraper_url.normalized_url)
+                    await self.url_queue.appendleft(scraper_url)
+        for scraper_url in self.config.seed_urls:
+            await self._queue_scraper_url(scraper_url, skip_path_filter=True)
+        if self.is_finished():
+            logger.info("finished before starting - no urls to scrape")
+
+    async def scrape_url(self, scraper_url: ScraperUrl, looper_name: str) -> None:
+        """One iteration of pyminiscraper's scrape loop, without the loop's termination check."""
+        self.in_flight_urls[scraper_url.normalized_url] = scraper_url
+        try:
+            await self._scrape_url(scraper_url, looper_name)
+        finally:
+            del self.in_flight_urls[scraper_url.normalized_url]
+        # a url whose callback failed is not visited, a resumed crawl scrapes it again
+        self.visited_url_keys.append(url_hash_key(normalized_url_hash(scraper_url.normalized_url)))
+
+    async def _scrape_url(self, scraper_url: ScraperUrl, looper_name: str) -> None:
+        await self.config.log(f"scraping url - {self._looper_context(looper_name)} - {self._url_context(scraper_url)}")
+
+        domain_metadata = await self._get_domain_metadata(scraper_url)
+        if not domain_metadata.robots.can_fetch(self.config.user_agent, scraper_url.normalized_url):
+            logger.info(f"url not allowed for scraping - {self._looper_context(looper_name)} - {self._url_context(scraper_url)}")
+            self.skipped_urls_count += 1
+            return
+
+        self.requested_urls_count += 1
+        context = ScraperContextImpl(self.client_session)
+        try:
+            if scraper_url.type == ScraperUrlType.HTML:
+                page = await self._load_or_download_page(context=context, url=scraper_url)
+                await self._enqueue_context_urls(context)
+                if self._should_do_default_queuing(context):
+                    await self._enqueue_web_page_urls(scraper_url, page)
+            elif scraper_url.type == ScraperUrlType.SITEMAP:
+                sitemap = await self._download_sitemap(scraper_url.normalized_url)
+                try:
+                    await self.config.callback.on_sitemap(context, sitemap)
+                except Exception as e:
+                    raise ScraperCallbackError(f"Error storing sitemap {self._url_context(scraper_url)}") from e
+                await self._enqueue_context_urls(context)
+                if self._should_do_default_queuing(context):
+                    await self._enqueue_sitemap_urls(sitemap)
+            elif scraper_url.type == ScraperUrlType.FEED:
+                feed = await self._download_feed(scraper_url.normalized_url)
+                try:
+                    await self.config.callback.on_feed(context, feed)
+                except Exception as e:
+                    raise ScraperCallbackError(f"Error storing feed {self._url_context(scraper_url)}") from e
+                await self._enqueue_context_urls(context)
+                if self._should_do_default_queuing(context):
+                    await self._enqueue_feed_urls(feed)
+            self.success_urls_count += 1
+        except ScraperCallbackError as e:
+            logger.error(f"callback error while retriving url - {self._looper_context(looper_name)} - {self._url_context(scraper_url)} {e}")
+            if self.incremental_filter is not None:
+                self.incremental_filter.fail(scraper_url.normalized_url)
+            raise e
+        except Exception as e:
+            await self.config.log(f"exception while retriving url - {self._looper_context(looper_name)} - {self._url_context(scraper_url)}")
+            self.error_urls_count += 1
+            if self.incremental_filter is not None:
+                self.incremental_filter.fail(scraper_url.normalized_url)
+
+    def is_finished(self) -> bool:
+        return self._is_crawler_empty() or self._was_max_requests_achieved()
+
+    def is_drained(self) -> bool:
+        """Every queued url was handled, the crawl was neither stopped nor cut off at max_requested_urls."""
+        return self._is_crawler_empty()
+
+    @override
+    async def _scrape_loop(self, looper_name: str) -> ScraperLoopResult:
+        while True:
+            scraper_url = await self.url_queue.popright()
+            if scraper_url.is_terminal() or self._was_max_requests_achieved():
+                logger.info(f"terminating - {self._looper_context(looper_name)} URLs")
+                break
+            await self.scrape_url(scraper_url, looper_name)
+            await self._terminate_all_loops_if_needed(looper_name)
+        return ScraperLoopResult(0)
+
+    async def finish(self) -> RzScraperStats:
+        """Closes the scraper and collects its stats, the last step of run() and of a CrawlFrontier crawl."""
+        domain_stats = analyze_url_groups(list(self.queued_urls), min_pages_per_sub_path=5)
+        await self._close()
+        # a resumed crawl reports the whole crawl, its counters went on from the checkpoint's
+        return RzScraperStats(
+            queued_urls_count=len(self.queued_urls) + len(self.resumed_visited_url_keys),
+            requested_urls_count=self.requested_urls_count,
+            success_urls_count=self.success_urls_count,
+            error_urls_count=self.error_urls_count,
+            skipped_urls_count=self.skipped_urls_count,
+            domain_stats=self._domain_stats(domain_stats),
+            prioritized_urls_count=self.url_classifier.prioritized_count if self.url_classifier else 0,
+            fetches_saved_count=self.url_classifier.skipped_count if self.url_classifier else 0,
+            revalidated_urls_count=self.revalidation_stats.revalidated_count,
+            not_modified_urls_count=self.revalidation_stats.not_modified_count,
+            bytes_saved=self.revalidation_stats.bytes_saved,
+            seconds_saved=self.revalidation_stats.seconds_saved,
+            incremental_skipped_urls_count=self.incremental_filter.stats.skipped_urls_count if self.incremental_filter else 0,
+            incremental_skipped_sitemaps_count=self.incremental_filter.stats.skipped_sitemaps_count if self.incremental_filter else 0,
+        )
+
+    def _domain_stats(self, url_groups: Dict[str, DomainStats]) -> Dict[str, DomainStats]:
+        domain_stats: Dict[str, DomainStats] = {}
+        for domain in sorted(set(url_groups) | self.throttled_domains):
+            frequent_subpaths = url_groups[domain].frequent_subpaths if domain in url_groups else {}
+            if domain not in self.throttled_domains:
+                domain_stats[domain] = RzDomainStats(domain, frequent_subpaths)
+                continue
+            settings = self.domain_throttles.get(domain).settings()
+            domain_stats[domain] = RzDomainStats(domain, frequent_subpaths, **vars(settings))
+            logger.info(f"{domain}: concurrency {settings.concurrency}, delay {settings.delay_seconds:.2f} s, "
+                        f"timeout {settings.timeout_seconds:.0f} s, {settings.requests_count} requests, "
+                        f"{settings.errors_count} errors, {settings.throttled_count} throttled")
+        return domain_stats
+
+    @override
+    async def run(self) -> RzScraperStats:
+        await self.start()
+        if not self.is_finished():
+            await asyncio.gather(*(self._scrape_loop(f"Scraper-{i}") for i in range(self.config.max_parallel_requests)))
+        return await self.finish()
@@ -0,0 +1,76 @@
+import logging
+from collections import OrderedDict
+import numpy as np
+from sqlalchemy.ext.asyncio import AsyncSession
+from ..db.service import WebPageService, WebPageMinHashBandService
+from .lsh import MinHashLshIndex
+from .minhash import MinHasher
+from .minhash_registry import MinHashRegistry
+
+logger = logging.getLogger("duplicates")
+
+class WebPageDuplicateIndex:
+    """
+    LSH index over the "article" signatures of the web pages of every channel. The signatures are
+    computed on the extracted article, without the chrome of any site, so a syndicated copy is found
+    on whichever channel published it first. Band hashes are persisted in web_page_min_hash_bands
+    under one corpus-wide index_id and candidates are looked up in the database per query, the
+    corpus is never loaded; signatures of the pages added by this index are kept until their rows
+    are written, at most max_pending of them.
+    """
+
+    def __init__(self, max_pending: int = 4096) -> None:
+        self._lsh = MinHashLshIndex(MinHashRegistry.get("default"))
+        self._max_pending = max_pending
+        self._pending_signatures: OrderedDict[str, np.ndarray] = OrderedDict()
+
+    @property
+    def index_id(self) -> str:
+        return f"article:{self._lsh.index_id}"
+
+    @staticmethod
+    def is_indexed(min_hashes: dict[str, str] | None) -> bool:
+        """Rows carrying an article signature, even an empty one, had their bands written with it."""
+        return "article" in (min_hashes or {})
+
+    def _decode_signature(self, min_hashes: dict[str, str] | None) -> np.ndarray | None:
+        if not min_hashes:
+            return None
+        return self._lsh.min_hasher.decode_signature(min_hashes.get("article"))
+
+    async def find_similar(self, session: AsyncSession, min_hashes: dict[str, str], threshold: float = 0.8, exclude: str | None = None) -> list[tuple[str, float]]:
+        """Indexed pages of any channel at least threshold similar to the given signatures, most similar first."""
+        signature = self._decode_signature(min_hashes)
+        if signature is None:
+            return []
+        candidates = await WebPageMinHashBandService(session).find_candidates(self.index_id, self._lsh.compute_band_hashes(signature).tolist())
+        if exclude is not None:
+            candidates.discard(exclude)
+        if not candidates:
+            return []
+
+        missing = [key for key in candidates if key not in self._pending_signatures]
+        stored_min_hashes = await WebPageService(session).find_min_hashes(missing) if missing else {}
+        matches = []
+        for key in candidates:
+            candidate_signature = self._pending_signatures.get(key)
+            if candidate_signature is None:
+                candidate_signature = self._decode_signature(stored_min_hashes.get(key))
+            if candidate_signature is None:
+                continue
+            similarity = MinHasher.estimate_signature_similarity(signature, candidate_signature)
+            if similarity >= threshold:
+                matches.append((key, similarity))
+        matches.sort(key=lambda match: match[1], reverse=True)
+        return matches
+
+    async def add(self, session: AsyncSession, normalized_url_hash: str, min_hashes: dict[str, str]) -> None:
+        """Replaces the bands of the page, a page without an article signature has none."""
+        signature = self._decode_signature(min_hashes)
+        band_hashes = self._lsh.compute_band_hashes(signature).tolist() if signature is not None else []
+        await WebPageMinHashBandService(session).replace(self.index_id, normalized_url_hash, band_hashes)
+        if signature is not None:
+            self._pending_signatures[normalized_url_hash] = signature
+            self._pending_signatures.move_to_end(normalized_url_hash)
+            while len(self._pending_signatures) > self._max_pending:
+                self._pending_signatures.popitem(last=False)
@@ -0,0 +1,201 @@
+import asyncio
+import logging
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Protocol
+import aiohttp
+from pyminiscraper.deque import AsyncDeque
+from pyminiscraper.model import ScraperUrl
+from pyminiscraper.robots import Robot
+
+logger = logging.getLogger("frontier")
+
+def create_client_session(max_connections: int,
+                          max_host_connections: int,
+                          request_timeout_seconds: float = 30,
+                          user_agent: str = 'pyminiscraper',
+                          referer: str = "https://www.google.com") -> aiohttp.ClientSession:
+    """
+    One pooled keep-alive client for every channel of a shared crawl, with the headers
+    pyminiscraper's ScraperConfig defaults to for its per-scraper clients.
+    """
+    return aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(
+            ssl=False,
+            limit=max_connections,
+            limit_per_host=max_host_connections,
+            ttl_dns_cache=300,
+            keepalive_timeout=30,
+        ),
+        headers={
+            'User-Agent': user_agent,
+            "Referer": referer,
+        },
+        timeout=aiohttp.ClientTimeout(total=request_timeout_seconds))
+
+class RobotsCache:
+    """robots.txt per host for every channel of a shared crawl, each host's file is downloaded once."""
+
+    def __init__(self) -> None:
+        self._robots: Dict[str, asyncio.Task[Robot]] = {}
+
+    async def get(self, domain_url: str, client_session: aiohttp.ClientSession) -> Robot:
+        robot_task = self._robots.get(domain_url)
+        if robot_task is None:
+            robot_task = asyncio.create_task(self._download(domain_url, client_session))
+            self._robots[domain_url] = robot_task
+        return await robot_task
+
+    async def _download(self, domain_url: str, client_session: aiohttp.ClientSession) -> Robot:
+        robots_url = f"{domain_url}/robots.txt"
+        try:
+            logger.info(f"downloading robots.txt {robots_url}")
+            return await Robot.download_and_parse(robots_url, client_session)
+        except Exception as e:
+            logger.error(f"Error fetching robots.txt {robots_url}: {e}")
+            return Robot()
+
+class FrontierQueue(AsyncDeque[ScraperUrl]):
+    """A channel's url queue inside the shared frontier, wakes the frontier's workers on every append."""
+
+    def __init__(self, on_append: Callable[[], None]) -> None:
+        super().__init__()
+        self._on_append = on_append
+
+    def __len__(self) -> int:
+        return len(self._deque)
+
+    async def appendright(self, item: ScraperUrl) -> None:
+        await super().appendright(item)
+        self._on_append()
+
+    async def appendleft(self, item: ScraperUrl) -> None:
+        await super().appendleft(item)
+        self._on_append()
+
+    def pop_nowait(self) -> ScraperUrl:
+        return self._deque.pop()
+
+class FrontierScraper(Protocol):
+    url_queue: Any
+
+    async def start(self) -> None: ...
+
+    async def scrape_url(self, scraper_url: ScraperUrl, looper_name: str) -> None: ...
+
+    def is_finished(self) -> bool: ...
+
+    async def finish(self) -> Any: ...
+
+@dataclass
+class FrontierChannelStats:
+    scheduled_urls_count: int = 0
+    max_in_flight: int = 0
+
+@dataclass
+class _FrontierChannel:
+    name: str
+    scraper: FrontierScraper
+    in_flight: int = 0
+    stopped: bool = False
+    finished: bool = False
+    result: Any = None
+    stats: FrontierChannelStats = field(default_factory=FrontierChannelStats)
+
+class CrawlFrontier:
+    """
+    Crawls many channels with one pool of workers. Every channel keeps its own scraper, with its
+    filters, classifier and store, but the scrapers' queues are drained by shared workers that
+    take the next url round robin from the channels with pending urls, so a channel with a huge
+    sitemap cannot starve the others; max_channel_workers caps the workers one channel occupies.
+    run() returns each channel's finish() result, or the exception that stopped the channel.
+    """
+
+    def __init__(self, max_workers: int = 16, max_channel_workers: int = 4) -> None:
+        self.max_workers = max_workers
+        self.max_channel_workers = max_channel_workers
+        self._channels: list[_FrontierChannel] = []
+        self._next_channel_index = 0
+        self._changed = asyncio.Event()
+
+    def add(self, name: str, scraper: FrontierScraper) -> None:
+        """Adds a channel before run(), its scraper's queue is replaced by a frontier queue."""
+        scraper.url_queue = FrontierQueue(self._changed.set)
+        self._channels.append(_FrontierChannel(name, scraper))
+
+    @property
+    def channel_stats(self) -> Dict[str, FrontierChannelStats]:
+        return {channel.name: channel.stats for channel in self._channels}
+
+    async def run(self) -> Dict[str, Any]:
+        for channel in self._channels:
+            await channel.scraper.start()
+        await asyncio.gather(*(self._work(f"Frontier-{i}") for i in range(self.max_workers)))
+        return {channel.name: channel.result for channel in self._channels}
+
+    async def stop(self) -> None:
+        for channel in self._channels:
+            channel.stopped = True
+        self._changed.set()
+
+    def _queue(self, channel: _FrontierChannel) -> FrontierQueue:
+        return channel.scraper.url_queue
+
+    def _next(self) -> tuple[_FrontierChannel, ScraperUrl] | None:
+        for offset in range(len(self._channels)):
+            channel = self._channels[(self._next_channel_index + offset) % len(self._channels)]
+            if channel.stopped or channel.in_flight >= self.max_channel_workers or not len(self._queue(channel)):
+                continue
+            if channel.scraper.is_finished():
+                # e.g. max_requested_urls was reached while the channel still has requests in flight
+                channel.stopped = True
+                continue
+            self._next_channel_index = (self._next_channel_index + offset + 1) % len(self._channels)
+            channel.in_flight += 1
+            return channel, self._queue(channel).pop_nowait()
+        return None
+
+    async def _work(self, worker_name: str) -> None:
+        while True:
+            scheduled = self._next()
+            if scheduled is None:
+                # cleared before anything is awaited, an append during the sweep is never missed
+                self._changed.clear()
+                for channel in self._channels:
+                    await self._finish_if_done(channel)
+                if all(channel.finished for channel in self._channels):
+                    return
+                await self._changed.wait()
+                continue
+
+            channel, scraper_url = scheduled
+            if scraper_url.is_terminal():
+                # pyminiscraper stops a scraper by queueing terminal urls
+                channel.stopped = True
+            else:
+                channel.stats.scheduled_urls_count += 1
+                channel.stats.max_in_flight = max(channel.stats.max_in_flight, channel.in_flight)
+                try:
+                    await channel.scraper.scrape_url(scraper_url, worker_name)
+                except Exception as e:
+                    logger.error(f"Stopping channel {channel.name} - {e}")
+                    channel.stopped = True
+                    channel.result = e
+            channel.in_flight -= 1
+            await self._finish_if_done(channel)
+            self._changed.set()
+
+    async def _finish_if_done(self, channel: _FrontierChannel) -> None:
+        if channel.finished or channel.in_flight:
+            return
+        # with nothing in flight no url can be queued anymore, an empty queue is a finished channel
+        if not channel.stopped and len(self._queue(channel)) and not channel.scraper.is_finished():
+            return
+        channel.stopped = True
+        channel.finished = True
+        if channel.result is None:
+            try:
+                channel.result = await channel.scraper.finish()
+            except Exception as e:
+                logger.error(f"Failed to finish channel {channel.name} - {e}")
+                channel.result = e
+        self._changed.set()
@@ -0,0 +1,265 @@
+import logging
+import xml.etree.ElementTree as ET
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from datetime import datetime
+from email.utils import parsedate_to_datetime
+from typing import Dict
+from pyminiscraper.feed import Feed, Item
+from pyminiscraper.sitemap import ChangeFrequency, PageUrl, Sitemap, SitemapUrl
+from pyminiscraper.url import normalize_url, normalized_url_hash
+from .url_index import UrlIndex
+
+logger = logging.getLogger("incremental")
+
+def parse_modified_at(value: str | None) -> datetime | None:
+    """Sitemap lastmod (W3C datetime) or feed pubDate (RFC 822) as a naive local time, like WebPage.requested_at."""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        modified_at = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        try:
+            modified_at = parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+    if modified_at.tzinfo is not None:
+        modified_at = modified_at.astimezone().replace(tzinfo=None)
+    return modified_at
+
+def high_water_marks_from_dict(high_water_marks: Dict[str, str] | None) -> Dict[str, datetime]:
+    return {source_url: datetime.fromisoformat(modified_at) for source_url, modified_at in (high_water_marks or {}).items()}
+
+def high_water_marks_to_dict(high_water_marks: Dict[str, datetime]) -> Dict[str, str]:
+    return {source_url: modified_at.isoformat() for source_url, modified_at in high_water_marks.items()}
+
+@dataclass
+class IncrementalStats:
+    entries_count: int = 0
+    skipped_urls_count: int = 0
+    skipped_sitemaps_count: int = 0
+    parsed_bytes: int = 0
+
+class IncrementalFilter:
+    """
+    Decides which sitemap and feed entries of a channel are worth queueing. A page is queued when
+    it is new or its lastmod/pubDate is newer than the stored requested_at; a child sitemap of an
+    index is walked when its lastmod is newer than its high-water mark, the newest date the last
+    finished crawl saw in it. Entries without dates are always queued, cache expiry decides for
+    them as before. A source with a page or child sitemap that failed to be fetched or stored
+    keeps its previous mark, so the next crawl lists the failed entries again.
+    """
+
+    def __init__(self, url_index: UrlIndex, high_water_marks: Dict[str, datetime] | None = None) -> None:
+        self._url_index = url_index
+        self._high_water_marks = dict(high_water_marks or {})
+        # advanced only for sources parsed to the end
+        self._advanced_marks = dict(self._high_water_marks)
+        # lastmod the sitemap index gave each child sitemap queued for this crawl
+        self._listed_at: Dict[str, datetime] = {}
+        # the source each queued page or child sitemap was listed in
+        self._sources: Dict[str, str] = {}
+        self._failed_sources: set[str] = set()
+        self.stats = IncrementalStats()
+
+    @property
+    def high_water_marks(self) -> Dict[str, datetime]:
+        """The marks to save with the channel after a finished crawl, failed sources keep their previous one."""
+        high_water_marks = dict(self._advanced_marks)
+        for source_url in self._failed_sources:
+            previous_mark = self._high_water_marks.get(source_url)
+            if previous_mark is None:
+                high_water_marks.pop(source_url, None)
+            else:
+                high_water_marks[source_url] = previous_mark
+        return high_water_marks
+
+    def _listed(self, normalized_url: str, source_url: str | None) -> None:
+        if source_url is not None:
+            self._sources[normalized_url] = source_url
+
+    def keep_page(self, url: str, modified_at: datetime | None, source_url: str | None = None) -> bool:
+        self.stats.entries_count += 1
+        normalized_url = normalize_url(url)
+        if modified_at is None:
+            self._listed(normalized_url, source_url)
+            return True
+        entry = self._url_index.lookup(normalized_url_hash(normalized_url))
+        # unknown pages are queued, the channel's path filters and classifier drop them for free
+        if entry is None or entry.requested_at is None or modified_at > entry.requested_at:
+            self._listed(normalized_url, source_url)
+            return True
+        self.stats.skipped_urls_count += 1
+        return False
+
+    def keep_sitemap(self, url: str, modified_at: datetime | None, source_url: str | None = None) -> bool:
+        self.stats.entries_count += 1
+        normalized_url = normalize_url(url)
+        high_water_mark = self._high_water_marks.get(normalized_url)
+        if modified_at is None or high_water_mark is None or modified_at > high_water_mark:
+            if modified_at is not None:
+                self._listed_at[normalized_url] = modified_at
+            self._listed(normalized_url, source_url)
+            return True
+        self.stats.skipped_sitemaps_count += 1
+        return False
+
+    def fail(self, normalized_url: str) -> None:
+        """A queued page or child sitemap failed to be fetched or stored, its sources up to the index keep their marks."""
+        source_url = self._sources.get(normalized_url)
+        while source_url is not None and source_url not in self._failed_sources:
+            self._failed_sources.add(source_url)
+            source_url = self._sources.get(source_url)
+
+    def advance(self, source_url: str, modified_at: datetime | None) -> None:
+        """
+        Called once a source is parsed to the end. A child sitemap's mark is the lastmod its index
+        listed, compared against the index's next lastmod; other sources keep their newest entry.
+        """
+        modified_at = self._listed_at.pop(source_url, None) or modified_at
+        if modified_at is None:
+            return
+        high_water_mark = self._advanced_marks.get(source_url)
+        if high_water_mark is None or modified_at > high_water_mark:
+            self._advanced_marks[source_url] = modified_at
+
+def _local_name(tag: str) -> str:
+    return tag.rsplit("}", 1)[-1]
+
+def _child_texts(element: ET.Element) -> Dict[str, str]:
+    texts: Dict[str, str] = {}
+    for child in element:
+        name = _local_name(child.tag)
+        if name not in texts and child.text and child.text.strip():
+            texts[name] = child.text.strip()
+    return texts
+
+class _XmlStreamParser(ABC):
+    """
+    Pull parser fed with response chunks; every finished entry element is handed to _on_entry and
+    dropped from the tree, memory stays bounded by one entry whatever the document size.
+    """
+
+    entry_names: tuple[str, ...] = ()
+    root_names: tuple[str, ...] = ()
+
+    def __init__(self, source_url: str, incremental_filter: IncrementalFilter | None = None) -> None:
+        self.source_url = source_url
+        self.incremental_filter = incremental_filter
+        self.max_modified_at: datetime | None = None
+        self._parser = ET.XMLPullParser(events=("start", "end"))
+        self._stack: list[ET.Element] = []
+        self._root_name: str | None = None
+
+    def feed(self, chunk: bytes) -> None:
+        if self.incremental_filter is not None:
+            self.incremental_filter.stats.parsed_bytes += len(chunk)
+        self._parser.feed(chunk)
+        self._read_events()
+
+    def _read_events(self) -> None:
+        for event, element in self._parser.read_events():
+            if event == "start":
+                if self._root_name is None:
+                    self._root_name = _local_name(element.tag)
+                    if self._root_name not in self.root_names:
+                        raise ValueError(f"Unsupported XML format {self._root_name}")
+                self._stack.append(element)
+                continue
+            self._stack.pop()
+            if _local_name(element.tag) in self.entry_names and self._stack:
+                self._on_entry(element)
+                self._stack[-1].remove(element)
+
+    def _close(self) -> None:
+        self._parser.close()
+        self._read_events()
+        if self._root_name is None:
+            raise ValueError(f"Empty document {self.source_url}")
+        if self.incremental_filter is not None:
+            self.incremental_filter.advance(self.source_url, self.max_modified_at)
+
+    def _observe(self, modified_at: datetime | None) -> None:
+        if modified_at is not None and (self.max_modified_at is None or modified_at > self.max_modified_at):
+            self.max_modified_at = modified_at
+
+    @abstractmethod
+    def _on_entry(self, element: ET.Element) -> None:
+        pass
+
+class SitemapStreamParser(_XmlStreamParser):
+    """Streaming replacement of pyminiscraper's Sitemap.parse that keeps only the entries the filter wants."""
+
+    entry_names = ("url", "sitemap")
+    root_names = ("urlset", "sitemapindex")
+
+    def __init__(self, source_url: str, incremental_filter: IncrementalFilter | None = None) -> None:
+        super().__init__(source_url, incremental_filter)
+        self.sitemap = Sitemap()
+
+    def close(self) -> Sitemap:
+        self._close()
+        return self.sitemap
+
+    def _on_entry(self, element: ET.Element) -> None:
+        texts = _child_texts(element)
+        loc = texts.get("loc")
+        if loc is None:
+            return
+        lastmod = parse_modified_at(texts.get("lastmod"))
+        self._observe(lastmod)
+        if _local_name(element.tag) == "sitemap":
+            if self.incremental_filter is None or self.incremental_filter.keep_sitemap(loc, lastmod, self.source_url):
+                self.sitemap.sitemap_urls.append(SitemapUrl(loc, lastmod))
+            return
+        if self.incremental_filter is not None and not self.incremental_filter.keep_page(loc, lastmod, self.source_url):
+            return
+        try:
+            changefreq = ChangeFrequency.from_str(texts["changefreq"]) if "changefreq" in texts else None
+        except ValueError:
+            changefreq = None
+        try:
+            priority = float(texts["priority"]) if "priority" in texts else None
+        except ValueError:
+            priority = None
+        self.sitemap.page_urls.append(PageUrl(loc, lastmod, changefreq, priority))
+
+class FeedStreamParser(_XmlStreamParser):
+    """Streaming RSS and Atom parser; an entry's Atom updated date, not only its published date, marks it changed."""
+
+    entry_names = ("item", "entry")
+    root_names = ("rss", "RDF", "feed")
+
+    def __init__(self, source_url: str, incremental_filter: IncrementalFilter | None = None) -> None:
+        super().__init__(source_url, incremental_filter)
+        self.feed_items: list[Item] = []
+
+    def close(self) -> Feed:
+        self._close()
+        return Feed(items=self.feed_items)
+
+    def _link(self, element: ET.Element, texts: Dict[str, str]) -> str | None:
+        if "link" in texts:
+            return texts["link"]
+        for child in element:
+            if _local_name(child.tag) == "link" and child.get("href") and child.get("rel", "alternate") == "alternate":
+                return child.get("href")
+        return None
+
+    def _on_entry(self, element: ET.Element) -> None:
+        texts = _child_texts(element)
+        link = self._link(element, texts)
+        if link is None:
+            return
+        published_at = parse_modified_at(texts.get("pubDate") or texts.get("published") or texts.get("date"))
+        modified_at = parse_modified_at(texts.get("updated")) or published_at
+        self._observe(modified_at)
+        if self.incremental_filter is not None and not self.incremental_filter.keep_page(link, modified_at, self.source_url):
+            return
+        self.feed_items.append(Item(
+            title=texts.get("title"),
+            link=link,
+            description=texts.get("description") or texts.get("summary") or texts.get("content"),
+            pub_date=published_at or modified_at,
+        ))
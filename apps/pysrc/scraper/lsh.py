@@ -0,0 +1,106 @@
+from typing import Dict, List, Set, Tuple
+import numpy as np
+import numpy.typing as npt
+from .minhash import MinHasher
+
+_BAND_PRIME = np.uint64(0x100000001B3)
+_MIX_1 = np.uint64(0xBF58476D1CE4E5B9)
+_MIX_2 = np.uint64(0x94D049BB133111EB)
+
+class MinHashLshIndex:
+    """
+    Locality-sensitive hashing over MinHash signatures: each signature is cut into bands of rows,
+    pages sharing any band hash become candidates, candidates are verified against their signatures.
+    """
+
+    def __init__(self, min_hasher: MinHasher, bands: int = 32, rows: int = 8) -> None:
+        if bands * rows > min_hasher.num_permutations:
+            raise ValueError(f"{bands} bands of {rows} rows exceed {min_hasher.num_permutations} permutations")
+        self.min_hasher = min_hasher
+        self.bands = bands
+        self.rows = rows
+        self._buckets: List[Dict[int, Set[str]]] = [dict() for _ in range(bands)]
+        self._band_hashes: Dict[str, npt.NDArray[np.int64]] = {}
+        self._signatures: Dict[str, npt.NDArray[np.int64]] = {}
+
+    @property
+    def index_id(self) -> str:
+        """Identifies the band layout; band hashes from different layouts are never mixed."""
+        return f"{self.min_hasher.hasher_id}:{self.bands}x{self.rows}"
+
+    def compute_band_hashes(self, signature: npt.NDArray[np.int64]) -> npt.NDArray[np.int64]:
+        """One signed 64-bit hash per band, stable across processes."""
+        rows = signature[:self.bands * self.rows].astype(np.uint64).reshape(self.bands, self.rows)
+        hashes = np.zeros(self.bands, dtype=np.uint64)
+        with np.errstate(over="ignore"):
+            for row in range(self.rows):
+                hashes = hashes * _BAND_PRIME + rows[:, row]
+            hashes ^= hashes >> np.uint64(30)
+            hashes *= _MIX_1
+            hashes ^= hashes >> np.uint64(27)
+            hashes *= _MIX_2
+            hashes ^= hashes >> np.uint64(31)
+        return hashes.view(np.int64)
+
+    def __len__(self) -> int:
+        return len(self._band_hashes)
+
+    def __contains__(self, key: str) -> bool:
+        return key in self._band_hashes
+
+    def add_band_hashes(self, key: str, band_hashes: npt.NDArray[np.int64]) -> None:
+        self.remove(key)
+        for band, band_hash in enumerate(band_hashes.tolist()):
+            self._buckets[band].setdefault(band_hash, set()).add(key)
+        self._band_hashes[key] = band_hashes
+
+    def add(self, key: str, signature: npt.NDArray[np.int64]) -> npt.NDArray[np.int64]:
+        band_hashes = self.compute_band_hashes(signature)
+        self.add_band_hashes(key, band_hashes)
+        self._signatures[key] = signature
+        return band_hashes
+
+    def set_signature(self, key: str, signature: npt.NDArray[np.int64]) -> None:
+        self._signatures[key] = signature
+
+    def get_signature(self, key: str) -> npt.NDArray[np.int64] | None:
+        return self._signatures.get(key)
+
+    def remove(self, key: str) -> None:
+        band_hashes = self._band_hashes.pop(key, None)
+        self._signatures.pop(key, None)
+        if band_hashes is None:
+            return
+        for band, band_hash in enumerate(band_hashes.tolist()):
+            bucket = self._buckets[band].get(band_hash)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del self._buckets[band][band_hash]
+
+    def candidates(self, signature: npt.NDArray[np.int64]) -> Set[str]:
+        result: Set[str] = set()
+        for band, band_hash in enumerate(self.compute_band_hashes(signature).tolist()):
+            bucket = self._buckets[band].get(band_hash)
+            if bucket:
+                result.update(bucket)
+        return result
+
+    def query(self, signature: npt.NDArray[np.int64], threshold: float = 0.8) -> List[Tuple[str, float]]:
+        """
+        Pages whose signature similarity is at least threshold, most similar first.
+        Candidates without a known signature are skipped, see missing_signatures().
+        """
+        matches = []
+        for key in self.candidates(signature):
+            candidate_signature = self._signatures.get(key)
+            if candidate_signature is None:
+                continue
+            similarity = MinHasher.estimate_signature_similarity(signature, candidate_signature)
+            if similarity >= threshold:
+                matches.append((key, similarity))
+        matches.sort(key=lambda match: match[1], reverse=True)
+        return matches
+
+    def missing_signatures(self, signature: npt.NDArray[np.int64]) -> List[str]:
+        return [key for key in self.candidates(signature) if key not in self._signatures]
@@ -1,23 +1,87 @@
 from typing import Set, List, Optional
+import base64
 import hashlib
 from dataclasses import dataclass
+from enum import Enum
 import numpy as np
 import numpy.typing as npt
 from .text import textify_html, HTMLDocument
 
+# Mersenne prime 2^61 - 1 used as the modulus of the universal hash family
+MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+MAX_HASH = np.iinfo(np.int64).max
+
+# 64-bit FNV prime and splitmix64 finalizer constants for shingle hashing
+_SHINGLE_PRIME = np.uint64(0x100000001B3)
+_MIX_1 = np.uint64(0xBF58476D1CE4E5B9)
+_MIX_2 = np.uint64(0x94D049BB133111EB)
+
+_LOW_32 = np.uint64(0xFFFFFFFF)
+_LOW_29 = np.uint64((1 << 29) - 1)
+
+# Bump when shingling, hashing or encoding changes so stale stored signatures are never compared
+MINHASH_FORMAT_VERSION = 1
+
+class MinHashEngine(str, Enum):
+    UNIVERSAL = "universal"
+    SHA1 = "sha1"
+
+def _mod_mersenne(value: npt.NDArray[np.uint64]) -> npt.NDArray[np.uint64]:
+    """Reduce values below 2^64 modulo 2^61 - 1."""
+    value = (value & MERSENNE_PRIME) + (value >> np.uint64(61))
+    return np.where(value >= MERSENNE_PRIME, value - MERSENNE_PRIME, value)
+
+def _mul_mod_mersenne(a: npt.NDArray[np.uint64], x: npt.NDArray[np.uint64]) -> npt.NDArray[np.uint64]:
+    """Exact (a * x) mod 2^61 - 1 for a, x < 2^61 without leaving uint64."""
+    a_hi, a_lo = a >> np.uint64(32), a & _LOW_32
+    x_hi, x_lo = x >> np.uint64(32), x & _LOW_32
+    # 2^64 = 8 (mod p)
+    high = (a_hi * x_hi) << np.uint64(3)
+    # mid * 2^32 = mid_hi * 2^61 + mid_lo * 2^32 = mid_hi + mid_lo * 2^32 (mod p)
+    mid = a_hi * x_lo + a_lo * x_hi
+    mid = (mid >> np.uint64(29)) + ((mid & _LOW_29) << np.uint64(32))
+    low = _mod_mersenne(a_lo * x_lo)
+    return _mod_mersenne(_mod_mersenne(high + mid) + low)
+
 class MinHasher:
-    def __init__(self, num_permutations: int = 256):
+    def __init__(self, num_permutations: int = 256, engine: MinHashEngine = MinHashEngine.UNIVERSAL, chunk_size: int = 1024, seed: int | None = None):
         self.num_permutations = num_permutations
-        # Generate random hash functions
-        self.hash_seeds = np.random.randint(0, 2**32, size=num_permutations)
-       
+        self.engine = engine
+        self.chunk_size = chunk_size
+        self.seed = seed
+        # Generate random hash functions, deterministic when seeded so signatures are comparable across processes
+        random_state = np.random if seed is None else np.random.RandomState(seed)
+        self.hash_seeds = random_state.randint(0, 2**32, size=num_permutations)
+        # Universal hash coefficients are derived from the seeds so both engines share one source of randomness
+        rng = np.random.default_rng(self.hash_seeds.astype(np.uint64))
+        self.hash_a = rng.integers(1, int(MERSENNE_PRIME), size=num_permutations, dtype=np.uint64)
+        self.hash_b = rng.integers(0, int(MERSENNE_PRIME), size=num_permutations, dtype=np.uint64)
+
     def _get_shingles(self, text: str, k: int = 3) -> Set[str]:
         return set(text[i:i+k] for i in range(len(text) - k + 1))
-    
+
+    def _get_shingle_hashes(self, text: str, k: int = 3) -> npt.NDArray[np.uint64]:
+        """Hash every k-shingle of the text to a unique uint64, one vectorized pass over the code points."""
+        if len(text) < k:
+            return np.empty(0, dtype=np.uint64)
+        code_points = np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+        count = len(code_points) - k + 1
+        hashes = np.zeros(count, dtype=np.uint64)
+        with np.errstate(over="ignore"):
+            for offset in range(k):
+                hashes = hashes * _SHINGLE_PRIME + code_points[offset:offset + count]
+            hashes ^= hashes >> np.uint64(30)
+            hashes *= _MIX_1
+            hashes ^= hashes >> np.uint64(27)
+            hashes *= _MIX_2
+            hashes ^= hashes >> np.uint64(31)
+        return np.unique(hashes)
+
     def _min_hash(self, shingles: Set[str]) -> npt.NDArray[np.int64]:
+        """Legacy SHA-1 signature, kept so signatures stored by older versions can be reproduced."""
         max_int64 = np.iinfo(np.int64).max
         signature = np.full(self.num_permutations, max_int64, dtype=np.int64)
-        
+
         for shingle in shingles:
             hash_vals = np.frombuffer(
                 np.array([
@@ -26,21 +90,88 @@ class MinHasher:
                 ], dtype=np.bytes_),
                 dtype=np.int64
             )
-            
+
             signature = np.minimum(signature, hash_vals)
-        
+
         return signature
-    
+
+    def _universal_min_hash(self, shingle_hashes: npt.NDArray[np.uint64], offsets: List[int]) -> npt.NDArray[np.int64]:
+        """
+        Signatures for several documents whose shingle hashes are concatenated in one array.
+        offsets[i]:offsets[i+1] delimits document i. Returns a (documents, permutations) matrix.
+        """
+        num_documents = len(offsets) - 1
+        signatures = np.full((num_documents, self.num_permutations), MAX_HASH, dtype=np.int64)
+        if len(shingle_hashes) == 0:
+            return signatures
+
+        x = _mod_mersenne(shingle_hashes)[:, np.newaxis]
+        a = self.hash_a[np.newaxis, :]
+        b = self.hash_b[np.newaxis, :]
+        document_ids = np.repeat(np.arange(num_documents), np.diff(offsets))
+        for start in range(0, len(x), self.chunk_size):
+            end = start + self.chunk_size
+            permuted = _mod_mersenne(_mul_mod_mersenne(a, x[start:end]) + b).astype(np.int64)
+            chunk_document_ids = document_ids[start:end]
+            # documents are contiguous, so each one is a single segment of the chunk
+            segment_starts = np.concatenate(([0], np.flatnonzero(np.diff(chunk_document_ids)) + 1))
+            segment_documents = chunk_document_ids[segment_starts]
+            signatures[segment_documents] = np.minimum(
+                signatures[segment_documents],
+                np.minimum.reduceat(permuted, segment_starts, axis=0))
+        return signatures
+
     def compute_signature(self, html: str) -> HTMLDocument:
-        processed_text = textify_html(html)
-        shingles = self._get_shingles(processed_text)
-        signature = self._min_hash(shingles)
-        return HTMLDocument(html, signature)
-    
+        return self.compute_signatures([html])[0]
+
+    def compute_signatures(self, htmls: List[str]) -> List[HTMLDocument]:
+        """Compute signatures for a batch of documents, sharing one permutation pass across the batch."""
+        signatures = self.compute_text_signatures([textify_html(html) for html in htmls])
+        return [HTMLDocument(html, signature) for html, signature in zip(htmls, signatures)]
+
+    def compute_text_signatures(self, texts: List[str]) -> List[npt.NDArray[np.int64]]:
+        """Signatures of already textified documents, see textify_html."""
+        if self.engine == MinHashEngine.SHA1:
+            return [self._min_hash(self._get_shingles(text)) for text in texts]
+
+        shingle_hashes = [self._get_shingle_hashes(text) for text in texts]
+        offsets = [0]
+        for hashes in shingle_hashes:
+            offsets.append(offsets[-1] + len(hashes))
+        signatures = self._universal_min_hash(np.concatenate(shingle_hashes) if shingle_hashes else np.empty(0, dtype=np.uint64), offsets)
+        return list(signatures)
+
+    @property
+    def hasher_id(self) -> str:
+        """Identifies the hash family; only signatures with equal ids are comparable."""
+        if self.seed is None:
+            raise ValueError("Signatures of an unseeded MinHasher are not portable")
+        return f"v{MINHASH_FORMAT_VERSION}:{self.engine.value}:{self.num_permutations}:{self.seed}"
+
+    def encode_signature(self, signature: npt.NDArray[np.int64]) -> str:
+        encoded = base64.b64encode(signature.astype("<i8").tobytes()).decode("ascii")
+        return f"{self.hasher_id}:{encoded}"
+
+    def decode_signature(self, encoded: str | None) -> npt.NDArray[np.int64] | None:
+        """Returns None when the signature is missing or was produced by a different hasher or version."""
+        if not encoded:
+            return None
+        hasher_id, _, payload = encoded.rpartition(":")
+        if hasher_id != self.hasher_id:
+            return None
+        signature = np.frombuffer(base64.b64decode(payload), dtype="<i8").astype(np.int64)
+        if len(signature) != self.num_permutations:
+            return None
+        return signature
+
     @staticmethod
     def estimate_similarity(doc1: HTMLDocument, doc2: HTMLDocument) -> float:
         if doc1.minhash_signature is None or doc2.minhash_signature is None:
             raise ValueError("Documents must have computed signatures")
-            
-        return np.mean(doc1.minhash_signature == doc2.minhash_signature)
-    
\ No newline at end of file
+
+        return MinHasher.estimate_signature_similarity(doc1.minhash_signature, doc2.minhash_signature)
+
+    @staticmethod
+    def estimate_signature_similarity(signature1: npt.NDArray[np.int64], signature2: npt.NDArray[np.int64]) -> float:
+        return float(np.mean(signature1 == signature2))
+
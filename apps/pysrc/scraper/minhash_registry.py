@@ -1,10 +1,22 @@
+from typing import Dict
+from .minhash import MinHasher
+
 class MinHashRegistry:
     _hashers: Dict[str, MinHasher] = {}
 
     @staticmethod
     def _init_registry():
         MinHashRegistry._hashers = {
-            "default": MinHasher(),
-            "url": MinHasher(num_permutations=32)
+            # fixed seeds keep stored signatures comparable across processes and nodes
+            "default": MinHasher(seed=1),
+            "url": MinHasher(num_permutations=32, seed=2)
         }
-    
\ No newline at end of file
+
+    @staticmethod
+    def get(name: str = "default") -> MinHasher:
+        if not MinHashRegistry._hashers:
+            MinHashRegistry._init_registry()
+        hasher = MinHashRegistry._hashers.get(name)
+        if hasher is None:
+            raise ValueError(f"Unknown min hasher: {name}")
+        return hasher
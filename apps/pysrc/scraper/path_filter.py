@@ -0,0 +1,40 @@
+import re
+import numpy as np
+import numpy.typing as npt
+from urllib.parse import urlparse
+from pyminiscraper.robots import robots_txt_pattern_compile
+
+def url_paths(normalized_urls: list[str]) -> list[str]:
+    """urlparse(url).path of every url, "/" for an empty path, one path per url."""
+    # urlparse drops newlines, the paths can be matched joined by them
+    return [urlparse(normalized_url).path or "/" for normalized_url in normalized_urls]
+
+class PathPatterns:
+    """
+    pyminiscraper's PathFilter for many urls at once: the robots patterns are compiled into one
+    alternation matched over the newline joined paths in one pass, instead of every pattern
+    against every url in Python. With no patterns every url gets default_value.
+    """
+
+    def __init__(self, path_filters: list[str], default_value: bool = True) -> None:
+        self.default_value = default_value
+        self._pattern: re.Pattern | None = None
+        if path_filters:
+            alternation = "|".join(f"(?:{robots_txt_pattern_compile(path_filter).pattern})" for path_filter in path_filters)
+            self._pattern = re.compile(f"^(?:{alternation})$", re.MULTILINE)
+
+    def is_passing(self, paths: list[str]) -> npt.NDArray[np.bool_]:
+        if self._pattern is None:
+            return np.full(len(paths), self.default_value, dtype=np.bool_)
+        passing = np.zeros(len(paths), dtype=np.bool_)
+        if not paths:
+            return passing
+        line_starts = np.cumsum([0] + [len(path) + 1 for path in paths[:-1]])
+        match_starts = np.fromiter((match.start() for match in self._pattern.finditer("\n".join(paths))), dtype=np.int64)
+        passing[np.searchsorted(line_starts, match_starts)] = True
+        return passing
+
+def filtered_out(normalized_urls: list[str], include_path_patterns: list[str], exclude_path_patterns: list[str]) -> npt.NDArray[np.bool_]:
+    """Urls a channel with these patterns would not crawl anymore, as the scraper's filters decide."""
+    paths = url_paths(normalized_urls)
+    return ~PathPatterns(include_path_patterns, True).is_passing(paths) | PathPatterns(exclude_path_patterns, False).is_passing(paths)
@@ -0,0 +1,213 @@
+import asyncio
+import logging
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Dict
+
+from pysrc.config.rzconfig import RzConfig
+
+logger = logging.getLogger("politeness")
+
+# statuses a host uses to ask crawlers to slow down
+THROTTLE_STATUSES = (429, 503)
+
+def parse_retry_after(value: str | None, now: datetime | None = None) -> float | None:
+    """Seconds to wait from a Retry-After header, given either as seconds or as an HTTP date."""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if retry_at.tzinfo is None:
+        retry_at = retry_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (retry_at - (now or datetime.now(timezone.utc))).total_seconds())
+
+@dataclass
+class DomainThrottleSettings:
+    concurrency: int
+    delay_seconds: float
+    timeout_seconds: float
+    average_latency_seconds: float | None
+    requests_count: int
+    errors_count: int
+    throttled_count: int
+
+class DomainThrottle:
+    """
+    Politeness for one host, tuned from its responses: concurrency grows by one after a run
+    of fast successes and the delay between request starts shrinks, both back off on errors
+    and harder on 429/503. Retry-After pauses the host, the robots crawl-delay is a floor
+    the delay never goes under. The request timeout follows the observed latency.
+    """
+
+    def __init__(self,
+                 domain: str,
+                 max_concurrency: int = 8,
+                 initial_concurrency: int = 2,
+                 initial_delay_seconds: float = 1.0,
+                 min_delay_seconds: float = 0.1,
+                 max_delay_seconds: float = 60.0,
+                 min_timeout_seconds: float = 5.0,
+                 max_timeout_seconds: float = 30.0) -> None:
+        self.domain = domain
+        self.max_concurrency = max_concurrency
+        self.concurrency = min(initial_concurrency, max_concurrency)
+        self.delay_seconds = initial_delay_seconds
+        self.min_delay_seconds = min_delay_seconds
+        self.max_delay_seconds = max_delay_seconds
+        self.min_timeout_seconds = min_timeout_seconds
+        self.max_timeout_seconds = max_timeout_seconds
+        self.average_latency_seconds: float | None = None
+        self.min_latency_seconds: float | None = None
+        self.requests_count = 0
+        self.errors_count = 0
+        self.throttled_count = 0
+        self._successes_since_change = 0
+        self._active = 0
+        self._next_request_at = 0.0
+        self._blocked_until = 0.0
+        self._condition = asyncio.Condition()
+
+    @property
+    def timeout_seconds(self) -> float:
+        if self.average_latency_seconds is None:
+            return self.max_timeout_seconds
+        return min(self.max_timeout_seconds, max(self.min_timeout_seconds, self.average_latency_seconds * 10))
+
+    def set_crawl_delay(self, crawl_delay_seconds: float | None) -> None:
+        """Robots crawl-delay, the adaptive delay never drops below it."""
+        if crawl_delay_seconds:
+            self.min_delay_seconds = max(self.min_delay_seconds, float(crawl_delay_seconds))
+            self.delay_seconds = max(self.delay_seconds, self.min_delay_seconds)
+
+    def restore(self, concurrency: int, delay_seconds: float, average_latency_seconds: float | None) -> None:
+        """Resumes from the settings a checkpointed crawl converged to, within this throttle's bounds."""
+        self.concurrency = max(1, min(self.max_concurrency, concurrency))
+        self.delay_seconds = min(self.max_delay_seconds, max(self.min_delay_seconds, delay_seconds))
+        if average_latency_seconds is not None:
+            self.average_latency_seconds = average_latency_seconds
+
+    def settings(self) -> DomainThrottleSettings:
+        return DomainThrottleSettings(
+            concurrency=self.concurrency,
+            delay_seconds=self.delay_seconds,
+            timeout_seconds=self.timeout_seconds,
+            average_latency_seconds=self.average_latency_seconds,
+            requests_count=self.requests_count,
+            errors_count=self.errors_count,
+            throttled_count=self.throttled_count,
+        )
+
+    async def acquire(self) -> None:
+        """Waits for a free slot and for the host's delay; every acquire must be followed by release."""
+        loop = asyncio.get_running_loop()
+        async with self._condition:
+            await self._condition.wait_for(lambda: self._active < self.concurrency)
+            self._active += 1
+            start_at = max(loop.time(), self._next_request_at, self._blocked_until)
+            self._next_request_at = start_at + self.delay_seconds
+        try:
+            # a 429 seen by another request while this one waited pauses it too
+            while (wait_seconds := max(start_at, self._blocked_until) - loop.time()) > 0:
+                await asyncio.sleep(wait_seconds)
+        except asyncio.CancelledError:
+            await self._free_slot()
+            raise
+
+    async def release(self, latency_seconds: float, status: int | None, retry_after_seconds: float | None = None) -> None:
+        """Records the outcome of the request, status None for timeouts and connection errors."""
+        self.on_response(latency_seconds, status, retry_after_seconds, asyncio.get_running_loop().time())
+        await self._free_slot()
+
+    async def _free_slot(self) -> None:
+        async with self._condition:
+            self._active -= 1
+            self._condition.notify_all()
+
+    def on_response(self, latency_seconds: float, status: int | None, retry_after_seconds: float | None, now: float) -> None:
+        self.requests_count += 1
+        if status in THROTTLE_STATUSES:
+            self.throttled_count += 1
+            self._back_off(2.0)
+            if retry_after_seconds is not None:
+                self._blocked_until = max(self._blocked_until, now + min(retry_after_seconds, self.max_delay_seconds * 10))
+                logger.info(f"{self.domain} asked to retry after {retry_after_seconds:.0f} s")
+            return
+        if status is None or status >= 500:
+            self.errors_count += 1
+            self._back_off(1.5)
+            return
+
+        # the host answered, 4xx are the page's problem and not a sign of load
+        if self.average_latency_seconds is None:
+            self.average_latency_seconds = latency_seconds
+        else:
+            self.average_latency_seconds = 0.8 * self.average_latency_seconds + 0.2 * latency_seconds
+        self.min_latency_seconds = latency_seconds if self.min_latency_seconds is None else min(self.min_latency_seconds, latency_seconds)
+
+        if self.average_latency_seconds > 3 * self.min_latency_seconds and self.average_latency_seconds > 0.5:
+            # responses slow down as we push, the host is saturating
+            if self.concurrency > 1:
+                self.concurrency -= 1
+            self._successes_since_change = 0
+            return
+
+        self._successes_since_change += 1
+        if self._successes_since_change >= 2 * self.concurrency:
+            self.concurrency = min(self.max_concurrency, self.concurrency + 1)
+            self.delay_seconds = max(self.min_delay_seconds, self.delay_seconds * 0.8)
+            self._successes_since_change = 0
+
+    def _back_off(self, delay_factor: float) -> None:
+        self.concurrency = max(1, self.concurrency // 2)
+        self.delay_seconds = min(self.max_delay_seconds, max(self.min_delay_seconds, self.delay_seconds * delay_factor, 0.5))
+        self._successes_since_change = 0
+
+class DomainThrottles:
+    """
+    Process-wide DomainThrottle per host, shared by every scraper of the process so channels
+    crawling the same host stay within one host-wide concurrency cap.
+    """
+
+    __instance: "DomainThrottles | None" = None
+
+    def __init__(self, max_host_concurrency: int = 8, initial_delay_seconds: float = 1.0,
+                 min_delay_seconds: float = 0.1, max_delay_seconds: float = 60.0, max_timeout_seconds: float = 30.0) -> None:
+        self.max_host_concurrency = max_host_concurrency
+        self.initial_delay_seconds = initial_delay_seconds
+        self.min_delay_seconds = min_delay_seconds
+        self.max_delay_seconds = max_delay_seconds
+        self.max_timeout_seconds = max_timeout_seconds
+        self._throttles: Dict[str, DomainThrottle] = {}
+
+    @classmethod
+    def instance(cls) -> "DomainThrottles":
+        if cls.__instance is None:
+            config = RzConfig.instance()
+            cls.__instance = DomainThrottles(
+                max_host_concurrency=config.scraper_max_host_concurrency,
+                initial_delay_seconds=config.scraper_crawl_delay_seconds,
+                min_delay_seconds=config.scraper_min_crawl_delay_seconds,
+                max_delay_seconds=config.scraper_max_crawl_delay_seconds,
+                max_timeout_seconds=config.scraper_request_timeout_seconds,
+            )
+        return cls.__instance
+
+    def get(self, domain: str) -> DomainThrottle:
+        throttle = self._throttles.get(domain)
+        if throttle is None:
+            throttle = DomainThrottle(
+                domain,
+                max_concurrency=self.max_host_concurrency,
+                initial_delay_seconds=self.initial_delay_seconds,
+                min_delay_seconds=self.min_delay_seconds,
+                max_delay_seconds=self.max_delay_seconds,
+                max_timeout_seconds=self.max_timeout_seconds,
+            )
+            self._throttles[domain] = throttle
+        return throttle
@@ -0,0 +1,88 @@
+import hashlib
+from dataclasses import dataclass
+from .article import extract_article
+from .boilerplate import ChannelTemplate, strip_template
+from .minhash import MinHasher
+from .minhash_registry import MinHashRegistry
+from .text import textify_html, textify_text
+
+# CPU-bound page processing executed in the scraper process pool.
+# Functions take and return plain bytes/str/dicts so they pickle cheaply across processes.
+
+def decode_content(content: bytes | None) -> str:
+    return (content or b"").decode("utf-8")
+
+def page_signature_text(content: bytes | None, template: ChannelTemplate | None = None) -> str:
+    """Normalized text that signatures are computed from, with the channel boilerplate removed when known."""
+    html = decode_content(content)
+    if template is None:
+        return textify_html(html)
+    return textify_text(strip_template(html, template))
+
+def content_hash(content: bytes | None) -> str:
+    """Exact hash of the raw page bytes, cheap enough to compute outside the pool."""
+    return hashlib.blake2b(content or b"", digest_size=16).hexdigest()
+
+def text_hash(text: str) -> str:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+def compute_min_hashes(content: bytes | None, template: ChannelTemplate | None = None) -> dict[str, str]:
+    return {
+        **compute_text_min_hashes(page_signature_text(content, template), template),
+        **compute_article_min_hashes(extract_article(decode_content(content))),
+    }
+
+def compute_text_min_hashes(text: str, template: ChannelTemplate | None = None) -> dict[str, str]:
+    min_hasher = MinHashRegistry.get("default")
+    signature = min_hasher.compute_text_signatures([text])[0]
+    min_hashes = {"default": min_hasher.encode_signature(signature)}
+    if template is not None:
+        # signatures of stripped and unstripped text must never be compared with each other
+        min_hashes["template"] = template.template_id
+    return min_hashes
+
+def compute_article_min_hashes(article_text: str | None) -> dict[str, str]:
+    """
+    The "article" signature the corpus-wide duplicate index bands on: computed on the extracted
+    article, without the chrome of any site or template, so copies on other channels match. Empty
+    for pages without an article, their chrome alone would make them near-duplicates of each other.
+    """
+    if not article_text:
+        return {"article": ""}
+    min_hasher = MinHashRegistry.get("default")
+    signature = min_hasher.compute_text_signatures([textify_text(article_text)])[0]
+    return {"article": min_hasher.encode_signature(signature)}
+
+def compute_page_article_min_hashes(content: bytes | None) -> dict[str, str]:
+    return compute_article_min_hashes(extract_article(decode_content(content)))
+
+def compute_similarity(existing_content: bytes | None, new_content: bytes | None, template: ChannelTemplate | None = None) -> float:
+    existing_signature, new_signature = MinHashRegistry.get("default").compute_text_signatures([
+        page_signature_text(existing_content, template),
+        page_signature_text(new_content, template),
+    ])
+    return MinHasher.estimate_signature_similarity(existing_signature, new_signature)
+
+
+@dataclass
+class ProcessedPage:
+    text_hash: str
+    # None when the text hash matched and the page needs no further processing
+    min_hashes: dict[str, str] | None = None
+    article_text: str | None = None
+
+def process_page(content: bytes | None, template: ChannelTemplate | None = None, known_text_hash: str | None = None) -> ProcessedPage:
+    """
+    Everything the store derives from a freshly scraped page, in one round trip to the pool.
+    Stops after hashing the normalized text when it equals known_text_hash.
+    """
+    text = page_signature_text(content, template)
+    hash = text_hash(text)
+    if hash == known_text_hash:
+        return ProcessedPage(text_hash=hash)
+    article_text = extract_article(decode_content(content))
+    return ProcessedPage(
+        text_hash=hash,
+        min_hashes={**compute_text_min_hashes(text, template), **compute_article_min_hashes(article_text)},
+        article_text=article_text,
+    )
@@ -0,0 +1,47 @@
+from dataclasses import dataclass
+from typing import Dict
+from pyminiscraper.model import ScraperWebPage
+
+@dataclass
+class RevalidationHeaders:
+    etag: str | None
+    last_modified: str | None
+
+    def to_request_headers(self) -> Dict[str, str]:
+        headers = {}
+        if self.etag:
+            headers["If-None-Match"] = self.etag
+        if self.last_modified:
+            headers["If-Modified-Since"] = self.last_modified
+        return headers
+
+@dataclass
+class NotModifiedWebPage:
+    """The cached page a 304 confirmed, without its raw body; content_size is what the origin did not send again."""
+    page: ScraperWebPage
+    content_size: int
+
+def get_header(headers: Dict[str, str] | None, name: str) -> str | None:
+    """Case-insensitive header lookup, stored headers keep the origin's spelling."""
+    name = name.lower()
+    for key, value in (headers or {}).items():
+        if key.lower() == name:
+            return value
+    return None
+
+@dataclass
+class RevalidationStats:
+    revalidated_count: int = 0
+    not_modified_count: int = 0
+    bytes_saved: int = 0
+    download_count: int = 0
+    download_seconds: float = 0.0
+    not_modified_seconds: float = 0.0
+
+    @property
+    def seconds_saved(self) -> float:
+        """Not modified responses priced at the average full download of this crawl."""
+        if self.download_count == 0:
+            return 0.0
+        average_download_seconds = self.download_seconds / self.download_count
+        return max(0.0, average_download_seconds * self.not_modified_count - self.not_modified_seconds)
@@ -1,18 +1,67 @@
 
-from typing import Awaitable, Callable
-from pysrc.db.web_page import WebPage, WebPageChannel, WebPageContent, WebPageSeed, web_page_seed_from_dict
+from typing import Any, Awaitable, Callable, Dict
+from datetime import datetime, timedelta
+import aiohttp
+from pysrc.db.web_page import WebPage, WebPageChannel, WebPageChannelCrawlState, WebPageChannelCrawlCheckpoint, WebPageContent, WebPageSeed, web_page_seed_from_dict
 import logging
-from pyminiscraper.scraper import Scraper
 from pyminiscraper.model import ScraperUrl
 from pyminiscraper.config import ScraperConfig
-from pyminiscraper.stats import ScraperStats
 
 from pysrc.scraper.store import ServiceScraperStore
+from pysrc.scraper.boilerplate import ChannelTemplate
+from pysrc.db.database import Database
+from pysrc.db.service import WebPageChannelLeaseService, WebPageChannelCrawlCheckpointService, WebPageChannelCrawlStateService, WebPageChannelDictionaryService, WebPageChannelTemplateService, WebPageService
+from pysrc.scraper.crawler import RzScraper, RzScraperStats
+from pysrc.scraper.checkpoint import CrawlCheckpoint, CrawlCheckpointer, decode_checkpoint
+from pysrc.scraper.sharding import ChannelLease
+from pysrc.scraper.frontier import CrawlFrontier, RobotsCache, create_client_session
+from pysrc.scraper.url_classifier import UrlClassifier, is_article_page
+from pysrc.scraper.url_index import UrlIndex
+from pysrc.scraper.incremental import IncrementalFilter, high_water_marks_from_dict, high_water_marks_to_dict
 from pysrc.scraper.text import extract_date_from_url
 from pysrc.scraper.utils import convert_seed_type
+from pysrc.config.rzconfig import RzConfig
 
 logger = logging.getLogger("scraperservice")
 
+class PostgresChannelLeases:
+    """ChannelLeases of one replica of the sharded run run_id, in web_page_channel_leases."""
+
+    def __init__(self, run_id: str, holder: str, lease_seconds: float = 90.0, max_attempts: int = 3) -> None:
+        self.run_id = run_id
+        self.holder = holder
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+
+    async def create_run(self, channel_normalized_url_hashes: list[str]) -> None:
+        async for session in Database.get_session():
+            await WebPageChannelLeaseService(session).create_run(self.run_id, channel_normalized_url_hashes)
+
+    async def claim(self) -> ChannelLease | None:
+        async for session in Database.get_session():
+            claimed = await WebPageChannelLeaseService(session).claim(self.run_id, self.holder, self.lease_seconds, self.max_attempts)
+            if claimed is not None:
+                return ChannelLease(*claimed)
+        return None
+
+    async def renew(self, lease: ChannelLease) -> bool:
+        async for session in Database.get_session():
+            return await WebPageChannelLeaseService(session).renew(self.run_id, lease.channel_normalized_url_hash, self.holder, self.lease_seconds)
+        return False
+
+    async def finish(self, lease: ChannelLease) -> None:
+        async for session in Database.get_session():
+            await WebPageChannelLeaseService(session).finish(self.run_id, lease.channel_normalized_url_hash, self.holder)
+
+    async def release(self, lease: ChannelLease) -> None:
+        async for session in Database.get_session():
+            await WebPageChannelLeaseService(session).release(self.run_id, lease.channel_normalized_url_hash, self.holder)
+
+    async def count_unfinished(self) -> int:
+        async for session in Database.get_session():
+            return await WebPageChannelLeaseService(session).count_unfinished(self.run_id, self.max_attempts)
+        return 0
+
 class ScraperService:
     def __init__(self):
         self.__scraper = None
@@ -26,7 +75,124 @@ class ScraperService:
                             scraper_follow_sitemap_links: bool,
                             scraper_follow_feed_links: bool,
                             scraper_follow_web_page_links: bool,
-                            on_web_page_callback: Callable[[WebPage, WebPageContent], Awaitable[None]]|None = None) -> ScraperStats :
+                            on_web_page_callback: Callable[[WebPage, WebPageContent], Awaitable[None]]|None = None,
+                            resume: bool = False) -> RzScraperStats :
+        scraper, store = await self._create_channel_crawl(
+            channel_normalized_url_hash=channel_normalized_url_hash,
+            channel_normalized_url=channel_normalized_url,
+            scraper_seeds=scraper_seeds,
+            include_path_patterns=include_path_patterns,
+            exclude_path_patterns=exclude_path_patterns,
+            scraper_follow_sitemap_links=scraper_follow_sitemap_links,
+            scraper_follow_feed_links=scraper_follow_feed_links,
+            scraper_follow_web_page_links=scraper_follow_web_page_links,
+            on_web_page_callback=on_web_page_callback,
+            resume=resume,
+        )
+        checkpointer = self._create_checkpointer(channel_normalized_url_hash, scraper, store)
+        self.__scraper = scraper
+        checkpointer.start()
+        stats = None
+        try:
+            stats = await scraper.run()
+        finally:
+            await checkpointer.close()
+            # pages still buffered by the store are written even when the crawl fails
+            await store.close()
+            await self._close_checkpoints(channel_normalized_url_hash, channel_normalized_url, scraper, checkpointer, stats is None)
+        return await self._finish_channel_crawl(channel_normalized_url_hash, channel_normalized_url, scraper, stats, store)
+
+    async def scrape_channels(self,
+                              channels: list[WebPageChannel],
+                              on_web_page_callback: Callable[[WebPage, WebPageContent], Awaitable[None]]|None = None,
+                              resume: bool = False) -> Dict[str, RzScraperStats]:
+        """
+        Crawls the channels together through one CrawlFrontier: one pooled keep-alive client and one
+        robots.txt cache for all of them, workers shared round robin across the channels. Every
+        channel keeps its own filters, url classifier and store. Returns the stats per channel url,
+        channels whose crawl failed are logged and left out.
+        """
+        config = RzConfig.instance()
+        logger.info(f"Scraping {len(channels)} channels through a shared frontier")
+        frontier = CrawlFrontier(max_workers=config.scraper_shared_crawl_workers,
+                                 max_channel_workers=config.scraper_shared_crawl_channel_workers)
+        robots_cache = RobotsCache()
+        client_session = create_client_session(config.scraper_shared_crawl_workers, config.scraper_max_host_concurrency,
+                                               request_timeout_seconds=config.scraper_request_timeout_seconds)
+        stores: Dict[str, ServiceScraperStore] = {}
+        scrapers: Dict[str, tuple[str, RzScraper]] = {}
+        checkpointers: Dict[str, CrawlCheckpointer] = {}
+        results: Dict[str, Any] = {}
+        self.__scraper = frontier
+        try:
+            for channel in channels:
+                scraper, store = await self._create_channel_crawl(
+                    channel_normalized_url_hash=channel.normalized_url_hash,
+                    channel_normalized_url=channel.normalized_url,
+                    scraper_seeds=web_page_seed_from_dict(channel.scraper_seeds),
+                    include_path_patterns=channel.include_path_patterns or [],
+                    exclude_path_patterns=channel.exclude_path_patterns or [],
+                    scraper_follow_sitemap_links=channel.scraper_follow_sitemap_links,
+                    scraper_follow_feed_links=channel.scraper_follow_feed_links,
+                    scraper_follow_web_page_links=channel.scraper_follow_web_page_links,
+                    on_web_page_callback=on_web_page_callback,
+                    client_session=client_session,
+                    robots_cache=robots_cache,
+                    resume=resume,
+                )
+                stores[channel.normalized_url] = store
+                scrapers[channel.normalized_url] = (channel.normalized_url_hash, scraper)
+                checkpointers[channel.normalized_url] = self._create_checkpointer(channel.normalized_url_hash, scraper, store)
+                frontier.add(channel.normalized_url, scraper)
+            for checkpointer in checkpointers.values():
+                checkpointer.start()
+            results = await frontier.run()
+        finally:
+            # one channel failing to close must not leave the others' pages, checkpoints or leases behind
+            for checkpointer in checkpointers.values():
+                await checkpointer.close()
+            for channel_normalized_url, store in stores.items():
+                try:
+                    await store.close()
+                except Exception as e:
+                    logger.error(f"Failed to write the buffered pages of channel {channel_normalized_url}: {e}")
+                    results[channel_normalized_url] = e
+            await client_session.close()
+            for channel_normalized_url, (channel_normalized_url_hash, scraper) in scrapers.items():
+                await self._close_checkpoints(channel_normalized_url_hash, channel_normalized_url, scraper,
+                                              checkpointers[channel_normalized_url],
+                                              not isinstance(results.get(channel_normalized_url), RzScraperStats))
+
+        channel_stats: Dict[str, RzScraperStats] = {}
+        for channel_normalized_url, result in results.items():
+            if isinstance(result, BaseException):
+                logger.error(f"Failed scraping channel {channel_normalized_url}: {result}")
+                continue
+            channel_normalized_url_hash, scraper = scrapers[channel_normalized_url]
+            try:
+                channel_stats[channel_normalized_url] = await self._finish_channel_crawl(
+                    channel_normalized_url_hash, channel_normalized_url, scraper, result, stores[channel_normalized_url])
+            except Exception as e:
+                logger.error(f"Failed to finish channel {channel_normalized_url}: {e}")
+                continue
+            frontier_stats = frontier.channel_stats[channel_normalized_url]
+            logger.info(f"Channel {channel_normalized_url} scheduled {frontier_stats.scheduled_urls_count} urls, "
+                        f"at most {frontier_stats.max_in_flight} in flight")
+        return channel_stats
+
+    async def _create_channel_crawl(self, *,
+                                    channel_normalized_url_hash: str,
+                                    channel_normalized_url: str,
+                                    scraper_seeds: list[WebPageSeed],
+                                    include_path_patterns: list[str],
+                                    exclude_path_patterns: list[str],
+                                    scraper_follow_sitemap_links: bool,
+                                    scraper_follow_feed_links: bool,
+                                    scraper_follow_web_page_links: bool,
+                                    on_web_page_callback: Callable[[WebPage, WebPageContent], Awaitable[None]]|None,
+                                    client_session: aiohttp.ClientSession | None = None,
+                                    robots_cache: RobotsCache | None = None,
+                                    resume: bool = False) -> tuple[RzScraper, ServiceScraperStore]:
         logger.info(f"Scraping channel {channel_normalized_url}")
         seed_urls = [ScraperUrl(
                 url=seed.url, 
@@ -34,9 +200,23 @@ class ScraperService:
                 max_depth=2
             ) for seed in scraper_seeds]
         
+        template = None
+        async for session in Database.get_session():
+            channel_template = await WebPageChannelTemplateService(session).find_by_channel(channel_normalized_url_hash)
+            if channel_template is not None:
+                template = ChannelTemplate.from_block_hashes(channel_template.block_hashes)
+            dictionary = await WebPageChannelDictionaryService(session).find_current_dictionary(channel_normalized_url_hash)
+            url_classifier = UrlClassifier.from_pages(await WebPageService(session).find_url_training_pages_by_channel(channel_normalized_url_hash))
+            url_index = UrlIndex(await WebPageService(session).find_url_index_by_channel(channel_normalized_url_hash))
+            crawl_state = await WebPageChannelCrawlStateService(session).find_by_channel(channel_normalized_url_hash)
+            crawl_checkpoint = await WebPageChannelCrawlCheckpointService(session).find_by_channel(channel_normalized_url_hash) if resume else None
+        logger.info(f"Loaded {len(url_index)} known urls ({url_index.nbytes / 1000:.0f} KB) for channel {channel_normalized_url}")
+
         async def on_web_page(web_page: WebPage, web_page_content: WebPageContent):
-            web_page.channel_normalized_url_hash = channel_normalized_url_hash
             url_date = extract_date_from_url(web_page.url)
+            # labelled from the extracted date, a fresh article is still an article; stored for the next crawls' training
+            web_page.is_article = is_article_page(web_page_content.metadata_title, web_page_content.metadata_published_at or url_date)
+            url_classifier.observe(web_page.normalized_url, web_page.is_article)
             if web_page_content.metadata_published_at and abs((web_page_content.metadata_published_at - web_page.requested_at).total_seconds()) < 60 * 60 * 24:
                     web_page_content.metadata_published_at = None
             if url_date:
@@ -45,26 +225,139 @@ class ScraperService:
             if on_web_page_callback:
                 await on_web_page_callback(web_page, web_page_content)
                 
-        scraper = Scraper(
+        config = RzConfig.instance()
+        incremental_filter = None
+        if config.scraper_incremental:
+            incremental_filter = IncrementalFilter(url_index, high_water_marks_from_dict(crawl_state.high_water_marks if crawl_state else None))
+        store = ServiceScraperStore(on_web_page=on_web_page, template=template, url_index=url_index, dictionary=dictionary,
+                                    channel_normalized_url_hash=channel_normalized_url_hash, incremental_filter=incremental_filter)
+        scraper = RzScraper(
             ScraperConfig(
                 seed_urls=seed_urls,
                 include_path_patterns= include_path_patterns or [],
                 exclude_path_patterns=exclude_path_patterns or [],
-                max_parallel_requests=5,
+                # workers only, per host concurrency, delay and timeout are tuned by the DomainThrottles
+                max_parallel_requests=config.scraper_max_host_concurrency,
                 use_headless_browser=False,
-                request_timeout_seconds=30,
-                crawl_delay_seconds=1,
+                request_timeout_seconds=int(config.scraper_request_timeout_seconds),
+                crawl_delay_seconds=config.scraper_crawl_delay_seconds,  # type: ignore[arg-type]  # annotated int, fractions work
                 follow_sitemap_links=scraper_follow_sitemap_links,
                 follow_feed_links=scraper_follow_feed_links,
                 follow_web_page_links=scraper_follow_web_page_links,            
-                callback=ServiceScraperStore(on_web_page=on_web_page),
+                callback=store,
             ),
+            url_classifier=url_classifier,
+            client_session=client_session,
+            robots_cache=robots_cache,
+            incremental_filter=incremental_filter,
         )
-        self.__scraper = scraper
-        stats = await scraper.run()   
-        logger.info(f"Finished scraping channel {channel_normalized_url}")
+        if crawl_checkpoint is not None:
+            self._resume_channel_crawl(channel_normalized_url, scraper, crawl_checkpoint)
+        return scraper, store
+
+    def _resume_channel_crawl(self, channel_normalized_url: str, scraper: RzScraper, crawl_checkpoint: WebPageChannelCrawlCheckpoint) -> None:
+        config = RzConfig.instance()
+        age = datetime.now() - crawl_checkpoint.checkpointed_at
+        if age > timedelta(hours=config.scraper_checkpoint_max_age_hours):
+            # the pages it lists as visited have expired from the cache window, a fresh crawl is cheaper
+            logger.info(f"Ignoring checkpoint of channel {channel_normalized_url} from {crawl_checkpoint.checkpointed_at}")
+            return
+        try:
+            checkpoint = decode_checkpoint(crawl_checkpoint.checkpoint)
+        except Exception as e:
+            logger.error(f"Ignoring unreadable checkpoint of channel {channel_normalized_url}: {e}")
+            return
+        scraper.resume(checkpoint)
+        logger.info(f"Resuming channel {channel_normalized_url} from {crawl_checkpoint.checkpointed_at}: "
+                    f"{len(checkpoint.pending_urls)} pending urls, {len(checkpoint.visited_url_keys)} visited, "
+                    f"{checkpoint.requested_urls_count} requested, {checkpoint.dropped_urls_count} dropped to bound the checkpoint")
+
+    def _create_checkpointer(self, channel_normalized_url_hash: str, scraper: RzScraper, store: ServiceScraperStore) -> CrawlCheckpointer:
+        config = RzConfig.instance()
+
+        async def take_checkpoint() -> CrawlCheckpoint:
+            checkpoint = scraper.checkpoint()
+            # the pages of the urls it marks visited are written before the checkpoint is
+            await store.writer.flush()
+            return checkpoint
+
+        async def write_checkpoint(data: bytes, checkpoint: CrawlCheckpoint) -> None:
+            async for session in Database.get_session():
+                await WebPageChannelCrawlCheckpointService(session).upsert(WebPageChannelCrawlCheckpoint(
+                    channel_normalized_url_hash=channel_normalized_url_hash,
+                    checkpoint=data,
+                    pending_urls_count=min(len(checkpoint.pending_urls), config.scraper_checkpoint_max_pending_urls),
+                    visited_urls_count=min(len(checkpoint.visited_url_keys), config.scraper_checkpoint_max_visited_urls),
+                    checkpointed_at=datetime.now(),
+                ))
+
+        return CrawlCheckpointer(
+            take_checkpoint,
+            write_checkpoint,
+            interval_seconds=config.scraper_checkpoint_seconds,
+            max_pending_urls=config.scraper_checkpoint_max_pending_urls,
+            max_visited_urls=config.scraper_checkpoint_max_visited_urls,
+        )
+
+    async def _close_checkpoints(self, channel_normalized_url_hash: str, channel_normalized_url: str, scraper: RzScraper,
+                                 checkpointer: CrawlCheckpointer, failed: bool) -> None:
+        """A drained crawl deletes its checkpoint, a failed or stopped one writes a last one for --resume."""
+        try:
+            if not failed and scraper.is_drained():
+                async for session in Database.get_session():
+                    await WebPageChannelCrawlCheckpointService(session).delete(channel_normalized_url_hash)
+            else:
+                await checkpointer.checkpoint()
+        except Exception as e:
+            logger.error(f"Failed to close checkpoints of channel {channel_normalized_url}: {e}")
+        checkpointer_stats = checkpointer.stats
+        if checkpointer_stats.written_count or checkpointer_stats.failed_count:
+            logger.info(f"Checkpointed channel {channel_normalized_url} {checkpointer_stats.written_count} times in "
+                        f"{checkpointer_stats.write_seconds:.2f} s, max {checkpointer_stats.max_bytes / 1000:.0f} KB, "
+                        f"{checkpointer_stats.failed_count} failed")
+
+    async def _save_high_water_marks(self, channel_normalized_url_hash: str, channel_normalized_url: str, incremental_filter: IncrementalFilter) -> None:
+        """Saved after a drained crawl only, a failed or cut off crawl is repeated from the previous marks."""
+        async for session in Database.get_session():
+            await WebPageChannelCrawlStateService(session).upsert(WebPageChannelCrawlState(
+                channel_normalized_url_hash=channel_normalized_url_hash,
+                high_water_marks=high_water_marks_to_dict(incremental_filter.high_water_marks),
+                crawled_at=datetime.now(),
+            ))
+        incremental_stats = incremental_filter.stats
+        logger.info(f"Incremental crawl of channel {channel_normalized_url}: {incremental_stats.entries_count} sitemap and feed entries "
+                    f"in {incremental_stats.parsed_bytes / 1_000_000:.1f} MB, skipped {incremental_stats.skipped_urls_count} unchanged urls "
+                    f"and {incremental_stats.skipped_sitemaps_count} unchanged sitemaps, {len(incremental_filter.high_water_marks)} high-water marks")
+
+    async def _finish_channel_crawl(self, channel_normalized_url_hash: str, channel_normalized_url: str, scraper: RzScraper,
+                                    stats: RzScraperStats, store: ServiceScraperStore) -> RzScraperStats:
+        if scraper.incremental_filter is not None and scraper.is_drained():
+            await self._save_high_water_marks(channel_normalized_url_hash, channel_normalized_url, scraper.incremental_filter)
+        image_stats = store.image_stats
+        if image_stats.thumbnailed_count:
+            logger.info(f"Thumbnailed {image_stats.thumbnailed_count} images of channel {channel_normalized_url}: "
+                        f"average decode {image_stats.decode_seconds / image_stats.thumbnailed_count * 1000:.1f} ms, "
+                        f"max decoded {image_stats.max_decoded_bytes / 1000:.0f} KB, "
+                        f"{image_stats.skipped_count} skipped, {image_stats.failed_count} failed")
+        write_stats = store.writer.stats
+        stats.write_flush_count = write_stats.flush_count
+        stats.write_max_queue_depth = write_stats.max_queue_depth
+        stats.write_average_flush_seconds = write_stats.average_flush_seconds
+        logger.info(f"Wrote {write_stats.flushed_count} pages of channel {channel_normalized_url} in {write_stats.flush_count} flushes: "
+                    f"average {write_stats.average_flush_seconds:.2f} s, max {write_stats.max_flush_seconds:.2f} s, "
+                    f"max queue depth {write_stats.max_queue_depth}, {write_stats.failed_count} failed")
+        stats.change_detection_counts = {detection.value: count for detection, count in store.change_detection_counts.items()}
+        compared_count = sum(stats.change_detection_counts.values())
+        if compared_count:
+            logger.info(f"Change detection for channel {channel_normalized_url}: " + ", ".join(
+                f"{detection} {count / compared_count:.0%}" for detection, count in sorted(stats.change_detection_counts.items())))
+        logger.info(f"Finished scraping channel {channel_normalized_url}: requested {stats.requested_urls_count} urls, "
+                    f"prioritized {stats.prioritized_urls_count}, saved {stats.fetches_saved_count} fetches, "
+                    f"{stats.not_modified_urls_count} of {stats.revalidated_urls_count} revalidated pages not modified "
+                    f"saving {stats.bytes_saved / 1_000_000:.1f} MB and {stats.seconds_saved:.1f} s, "
+                    f"{store.url_index_skipped_lookups} cache lookups answered by the url index, "
+                    f"{stats.incremental_skipped_urls_count} unchanged sitemap and feed urls not queued")
         return stats
-        
 
     async def stop(self)-> None:
         logger.info("Stopping scraper service")
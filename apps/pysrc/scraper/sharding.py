@@ -0,0 +1,104 @@
+import asyncio
+import logging
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Protocol
+
+logger = logging.getLogger("sharding")
+
+@dataclass
+class ChannelLease:
+    channel_normalized_url_hash: str
+    attempt: int
+
+class ChannelLeases(Protocol):
+    """The lease table of one sharded run, as seen by one replica."""
+
+    async def claim(self) -> ChannelLease | None: ...
+
+    async def renew(self, lease: ChannelLease) -> bool: ...
+
+    async def finish(self, lease: ChannelLease) -> None: ...
+
+    async def release(self, lease: ChannelLease) -> None: ...
+
+    async def count_unfinished(self) -> int: ...
+
+@dataclass
+class ShardStats:
+    claimed_count: int = 0
+    finished_count: int = 0
+    failed_count: int = 0
+    lost_count: int = 0
+
+class ChannelShardWorker:
+    """
+    One replica of a sharded scraper run. It crawls up to max_channels leased channels at a time
+    and heartbeats each lease every heartbeat_seconds; a channel whose lease is lost, because a
+    stalled replica was declared dead and the channel claimed again, is cancelled here. A replica
+    with nothing left to claim waits while other replicas still hold leases, so the channels of a
+    replica that dies are picked up once its leases expire.
+    """
+
+    def __init__(self,
+                 leases: ChannelLeases,
+                 crawl_channel: Callable[[str], Awaitable[None]],
+                 max_channels: int = 5,
+                 heartbeat_seconds: float = 20.0,
+                 poll_seconds: float = 10.0) -> None:
+        self.leases = leases
+        self.crawl_channel = crawl_channel
+        self.max_channels = max_channels
+        self.heartbeat_seconds = heartbeat_seconds
+        self.poll_seconds = poll_seconds
+        self.stats = ShardStats()
+
+    async def run(self) -> ShardStats:
+        await asyncio.gather(*(self._work() for _ in range(self.max_channels)))
+        return self.stats
+
+    async def _work(self) -> None:
+        while True:
+            lease = await self.leases.claim()
+            if lease is None:
+                if not await self.leases.count_unfinished():
+                    return
+                await asyncio.sleep(self.poll_seconds)
+                continue
+            self.stats.claimed_count += 1
+            await self._crawl(lease)
+
+    async def _crawl(self, lease: ChannelLease) -> None:
+        logger.info(f"Leased channel {lease.channel_normalized_url_hash}, attempt {lease.attempt}")
+        crawl_task = asyncio.create_task(self.crawl_channel(lease.channel_normalized_url_hash))
+        heartbeat_task = asyncio.create_task(self._heartbeat(lease, crawl_task))
+        try:
+            await crawl_task
+        except asyncio.CancelledError:
+            current_task = asyncio.current_task()
+            if current_task is not None and current_task.cancelling():
+                raise
+            self.stats.lost_count += 1
+            logger.warning(f"Lost the lease of channel {lease.channel_normalized_url_hash}, another replica crawls it")
+            return
+        except Exception as e:
+            self.stats.failed_count += 1
+            logger.error(f"Failed crawling channel {lease.channel_normalized_url_hash}: {e}")
+            await self.leases.release(lease)
+            return
+        finally:
+            heartbeat_task.cancel()
+        self.stats.finished_count += 1
+        await self.leases.finish(lease)
+
+    async def _heartbeat(self, lease: ChannelLease, crawl_task: asyncio.Task[None]) -> None:
+        while True:
+            await asyncio.sleep(self.heartbeat_seconds)
+            try:
+                renewed = await self.leases.renew(lease)
+            except Exception as e:
+                # a missed heartbeat is harmless while the lease has time left
+                logger.error(f"Failed renewing the lease of channel {lease.channel_normalized_url_hash}: {e}")
+                continue
+            if not renewed:
+                crawl_task.cancel()
+                return
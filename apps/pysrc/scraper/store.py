@@ -1,9 +1,9 @@
-from httpx import request
-from apps.pysrc.db.user import AudioContent, AudioContentState
-from pysrc.scraper.image import thumbnailed_image_height, thumbnailed_image_width
+from ..db.user import AudioContent, AudioContentState
+from pysrc.scraper.image import ImageStageStats, thumbnailed_image_height, thumbnailed_image_width, make_thumbnail
 from ..db.web_page import WebImageContent, WebPage, WebPageContent, WebImage
+from ..db.content_format import ContentDictionary
 from pyminiscraper.model import ScraperWebPage, ScraperUrl
-from pyminiscraper.config import ScraperCallback, ScraperContext
+from pyminiscraper.config import ScraperContext
 from pyminiscraper.url import normalize_url, normalized_url_hash
 import logging
 from typing import Awaitable, Optional, override
@@ -13,14 +13,33 @@ from ..db.service import AudioContentService, WebPageService, WebImageService
 from ..db.database import Database
 from datetime import datetime, timezone
 from .minhash import MinHasher
-import asyncio
-import concurrent.futures
-from PIL import Image, ImageOps
-import io
+from .minhash_registry import MinHashRegistry
+from .duplicates import WebPageDuplicateIndex
+from .processing import process_page, compute_similarity, compute_page_article_min_hashes, content_hash
+from .boilerplate import ChannelTemplate
+from ..utils.process_pool import ProcessPool
+from .crawler import RzScraperCallback
+from .revalidation import NotModifiedWebPage, RevalidationHeaders, get_header
+from .url_index import UrlIndex
+from .incremental import IncrementalFilter
+from ..utils.batch_writer import BatchWriter
+from ..utils.parallel import ParallelTaskManager
+from ..config.rzconfig import RzConfig
+from dataclasses import dataclass
 from datetime import datetime
+from collections import Counter
+from enum import Enum
 
 logger = logging.getLogger("scraper_store")
 
+class ChangeDetection(str, Enum):
+    """Outcome of comparing a scraped page against the stored one, cheapest tier first."""
+    NEW = "new"
+    SAME_CONTENT = "same_content"
+    SAME_TEXT = "same_text"
+    SIMILAR = "similar"
+    CHANGED = "changed"
+
 def drop_time_zone(dt: datetime|None) -> datetime|None:
     """Convert datetime to UTC and drop timezone information."""
     if dt is None:
@@ -29,19 +48,112 @@ def drop_time_zone(dt: datetime|None) -> datetime|None:
         dt = dt.astimezone(timezone.utc)
     return dt.replace(tzinfo=None)
 
-def compute_similarity(existing_web_page: WebPage, existing_web_page_content: WebPageContent, new_web_page: WebPage, new_web_page_content: WebPageContent)-> float:
-    min_hasher = MinHasher(num_permutations=256)
-    existing_signature = min_hasher.compute_signature((existing_web_page_content.content or b"").decode("utf-8"))
-    new_signature = min_hasher.compute_signature((new_web_page_content.content or b"").decode("utf-8"))
-    return MinHasher.estimate_similarity(existing_signature, new_signature)
+def compare_min_hashes(existing_min_hashes: dict[str, str] | None, new_min_hashes: dict[str, str]) -> float | None:
+    """Similarity of two stored signature sets, None when the existing one is missing or incompatible."""
+    if (existing_min_hashes or {}).get("template") != new_min_hashes.get("template"):
+        return None
+    min_hasher = MinHashRegistry.get("default")
+    existing_signature = min_hasher.decode_signature((existing_min_hashes or {}).get("default"))
+    new_signature = min_hasher.decode_signature(new_min_hashes.get("default"))
+    if existing_signature is None or new_signature is None:
+        return None
+    return MinHasher.estimate_signature_similarity(existing_signature, new_signature)
+
+
+@dataclass
+class PendingWebPage:
+    """A scraped page waiting in the write-behind buffer, with the audio content to create for it."""
+    web_page: WebPage
+    web_page_content: WebPageContent
+    audio_content: AudioContent | None = None
+
+def new_audio_content(web_page: WebPage, web_page_content: WebPageContent, uploaded_at: datetime | None) -> AudioContent:
+    return AudioContent(
+        web_page_normalized_url_hash = web_page.normalized_url_hash,
+        state = AudioContentState.IMPORTED_NEED_SUMMARIZING,
+        title = web_page_content.metadata_title,
+        description = web_page_content.metadata_description,
+        image_url = web_page_content.metadata_image_url,
+        published_at = web_page_content.metadata_published_at,
+        raw_text = web_page_content.article_text or web_page_content.visible_text,
+        summarized_text = "",
+        summarized_text_audio_url = "",
+        uploaded_at = uploaded_at,
+    )
 
-executor = concurrent.futures.ThreadPoolExecutor(max_workers=8)
+# the fields of a cached page the scraper reads, it queues the page's links
+LINK_FIELD_NAMES = ("outgoing_urls", "sitemap_urls", "feed_urls")
+
+def to_scraper_web_page(web_page: WebPage, web_page_content: WebPageContent, with_content: bool = True) -> ScraperWebPage:
+    return ScraperWebPage(
+        status_code = web_page.status_code,
+        url = web_page.url,
+        normalized_url = web_page.normalized_url,
+        headers = web_page_content.headers,
+        content = web_page_content.content if with_content else None,
+        content_type = web_page_content.content_type,
+        content_charset = web_page_content.content_charset,
+        requested_at= web_page.requested_at,
+
+        metadata_title = web_page_content.metadata_title,
+        metadata_description = web_page_content.metadata_description,
+        metadata_image_url = web_page_content.metadata_image_url,
+        metadata_published_at = web_page_content.metadata_published_at,
+
+        canonical_url = web_page_content.canonical_url,
+        outgoing_urls = web_page_content.outgoing_urls,
+        visible_text = web_page_content.visible_text,
+        sitemap_urls = web_page_content.sitemap_urls,
+        feed_urls = web_page_content.feed_urls,
+        robots_content = web_page_content.robots_content,
+        text_chunks = web_page_content.text_chunks
+    )
+
+def cached_scraper_web_page(normalized_url: str, requested_at: datetime | None) -> ScraperWebPage:
+    """
+    A fresh page the url index knows, without its content: the stored page is not processed again
+    and its links were queued when it was fetched, the sitemaps and feeds list the newer pages.
+    """
+    return ScraperWebPage(
+        status_code = 200,
+        url = normalized_url,
+        normalized_url = normalized_url,
+        headers = None,
+        content = None,
+        requested_at = requested_at,
+    )
        
-class ServiceScraperStore(ScraperCallback):
+class ServiceScraperStore(RzScraperCallback):
 
-    def __init__(self, on_web_page: Callable[[WebPage, WebPageContent], Awaitable[None]]|None = None, rerequest_after_hours: int=24*30) -> None:  
+    def __init__(self, on_web_page: Callable[[WebPage, WebPageContent], Awaitable[None]]|None = None, rerequest_after_hours: int=24*30, template: ChannelTemplate|None = None, url_index: UrlIndex|None = None, dictionary: ContentDictionary|None = None, channel_normalized_url_hash: str|None = None, incremental_filter: IncrementalFilter|None = None) -> None:  
         self.rerequest_after_hours = rerequest_after_hours
+        # stored on every page written or refetched, the per channel queries filter on it
+        self._channel_normalized_url_hash = channel_normalized_url_hash
         self._on_web_page = on_web_page        
+        self._template = template
+        # near-duplicates among the pages of every channel
+        self._duplicate_index = WebPageDuplicateIndex()
+        # the channel's zstd dictionary for the raw bodies
+        self._dictionary = dictionary
+        # known pages of the channel, urls missing from it are never looked up in the database
+        self._url_index = url_index
+        self.url_index_skipped_lookups = 0
+        # pages that fail to be written keep the high-water mark of the sitemap or feed listing them
+        self._incremental_filter = incremental_filter
+        config = RzConfig.instance()
+        self._upload_concurrency = config.scraper_write_upload_concurrency
+        # page rows, contents and audio contents are written behind the crawl in batches
+        self.writer = BatchWriter[PendingWebPage](
+            self._write_web_pages,
+            max_batch_size=config.scraper_write_batch_size,
+            max_delay_seconds=config.scraper_write_flush_seconds,
+        )
+        # metadata images are thumbnailed off the crawl path, each url once per crawl
+        self._thumbnail_format = config.scraper_thumbnail_format
+        self._image_tasks = ParallelTaskManager[None](config.scraper_image_workers)
+        self._requested_image_urls: set[str] = set()
+        self.image_stats = ImageStageStats()
+        self.change_detection_counts: Counter[ChangeDetection] = Counter()
 
 
     @override
@@ -54,11 +166,14 @@ class ServiceScraperStore(ScraperCallback):
                 url = response.url,
                 normalized_url = response.normalized_url,
                 normalized_url_hash = response.normalized_url_hash,
+                channel_normalized_url_hash = self._channel_normalized_url_hash,
                 requested_at = drop_time_zone(response.requested_at),
                 metadata_title = response.metadata_title,
                 metadata_description = response.metadata_description,
                 metadata_image_url = response.metadata_image_url,
                 metadata_published_at = drop_time_zone(response.metadata_published_at),                
+                etag = get_header(response.headers, "ETag"),
+                last_modified = get_header(response.headers, "Last-Modified"),
             )
 
             new_web_page_content = WebPageContent(
@@ -88,58 +203,138 @@ class ServiceScraperStore(ScraperCallback):
 
             if self._on_web_page:
                 await self._on_web_page(new_web_page, new_web_page_content)
+
+            # tier 1: byte-identical content needs no parsing at all
+            new_web_page.content_hash = content_hash(new_web_page_content.content)
+            if existing_web_page is not None and existing_web_page.content_hash == new_web_page.content_hash:
+                self.change_detection_counts[ChangeDetection.SAME_CONTENT] += 1
+                await self._update_fetch_state(session, new_web_page)
+                await self._index_unchanged_web_page(session, existing_web_page, new_web_page_content.content)
+                return
+
+            # tier 2: identical normalized text, e.g. only timestamps, nonces or scripts changed
+            processed_page = await ProcessPool.instance().run(
+                process_page, new_web_page_content.content, self._template, existing_web_page.text_hash if existing_web_page else None)
+            new_web_page.text_hash = processed_page.text_hash
+            if processed_page.min_hashes is None:
+                self.change_detection_counts[ChangeDetection.SAME_TEXT] += 1
+                await self._update_fetch_state(session, new_web_page)
+                await self._index_unchanged_web_page(session, existing_web_page, new_web_page_content.content)
+                return
+            new_web_page.min_hashes = processed_page.min_hashes
+            new_web_page_content.article_text = processed_page.article_text
             
             if existing_web_page is None:
-                await WebPageService(session).upsert(new_web_page, new_web_page_content)
-                audio_content = await AudioContentService(session).find_by_url(response.normalized_url)
-                if audio_content is not None:
-                    audio_content.state = AudioContentState.IMPORTED_NEED_SUMMARIZING,
-                    audio_content.web_page_normalized_url_hash = new_web_page.normalized_url_hash,
-                    audio_content.web_channel_id = new_web_page.web_channel_id
-                    audio_content.title = new_web_page_content.metadata_title
-                    audio_content.description = new_web_page_content.metadata_description
-                    audio_content.image_url = new_web_page_content.metadata_image_url
-                    audio_content.published_at = new_web_page_content.metadata_published_at
-                    audio_content.raw_text = new_web_page_content.visible_text
-                    audio_content.summarized_text = ""
-                    audio_content.summarized_text_audio_url = ""
-                    audio_content.summarized_text_audio_duration_seconds = 0
-                    audio_content.uploaded_at = response.requested_at                                        
-                else:
-                    audio_content = AudioContent(
-                        web_page_normalized_url_hash = new_web_page.normalized_url_hash,
-                        state = AudioContentState.IMPORTED_NEED_SUMMARIZING,
-                        web_channel_id = new_web_page.web_channel_id,
-                        title = new_web_page_content.metadata_title,
-                        description = new_web_page_content.metadata_description,
-                        image_url = new_web_page_content.metadata_image_url,
-                        published_at = new_web_page_content.metadata_published_at,
-                        raw_text = new_web_page_content.visible_text,
-                        summarized_text = "",
-                        summarized_text_audio_url = "",
-                        summarized_text_audio_duration_seconds = 0,
-                        uploaded_at = response.requested_at,
-                    )
-                await AudioContentService(session).upsert(audio_content)
+                self.change_detection_counts[ChangeDetection.NEW] += 1
+                duplicates = await self._duplicate_index.find_similar(session, new_web_page.min_hashes, exclude=new_web_page.normalized_url_hash)
+                self._index_web_page(new_web_page)
+                await self._duplicate_index.add(session, new_web_page.normalized_url_hash, new_web_page.min_hashes)
+                if duplicates:
+                    duplicate_hash, duplicate_similarity = duplicates[0]
+                    logger.info(f"Skipping audio content for {response.normalized_url}: near-duplicate of {duplicate_hash} (similarity {duplicate_similarity:.2f})")
+                    await self.writer.put(PendingWebPage(new_web_page, new_web_page_content))
+                    return
+                await self.writer.put(PendingWebPage(
+                    new_web_page, new_web_page_content, new_audio_content(new_web_page, new_web_page_content, response.requested_at)))
                 if response.metadata_image_url:
-                    await self.request_and_store_image(session, context, response.metadata_image_url)                
+                    self.queue_image(context, response.metadata_image_url)
                 return
             
-            existing_web_page_content = await WebPageService(session).get_content(existing_web_page) 
-            if existing_web_page_content is not None:   
-                similarity = await asyncio.get_event_loop().run_in_executor(executor, compute_similarity, existing_web_page, existing_web_page_content, new_web_page, new_web_page_content)
+            # tier 3: MinHash similarity
+            similarity = compare_min_hashes(existing_web_page.min_hashes, new_web_page.min_hashes)
+            # signatures the stored row lacks, written when the page turns out similar
+            missing_min_hashes = None if WebPageDuplicateIndex.is_indexed(existing_web_page.min_hashes) else \
+                {**(existing_web_page.min_hashes or {}), "article": new_web_page.min_hashes["article"]}
+            if similarity is None:
+                # rows written before signatures were persisted fall back to re-hashing the stored content once
+                existing_web_page_content = await WebPageService(session).get_content(existing_web_page)
+                if existing_web_page_content is None:
+                    # nothing to compare with, the page is stored again as changed
+                    similarity = 0.0
+                else:
+                    similarity = await ProcessPool.instance().run(compute_similarity, existing_web_page_content.content, new_web_page_content.content, self._template)
+                    missing_min_hashes = new_web_page.min_hashes
+
+            if similarity >= 0.8:
+                self.change_detection_counts[ChangeDetection.SIMILAR] += 1
+                await self._update_fetch_state(session, new_web_page)
+                if missing_min_hashes is not None:
+                    await self._refresh_min_hashes(session, existing_web_page, missing_min_hashes)
+            else:
+                self.change_detection_counts[ChangeDetection.CHANGED] += 1
+                # the page's audio content is updated from the new content and summarized again
+                await self.writer.put(PendingWebPage(
+                    new_web_page, new_web_page_content, new_audio_content(new_web_page, new_web_page_content, response.requested_at)))
+                self._index_web_page(new_web_page)
+                await self._duplicate_index.add(session, new_web_page.normalized_url_hash, new_web_page.min_hashes)
+                if response.metadata_image_url:
+                    self.queue_image(context, response.metadata_image_url)
                 
-                if similarity < 0.8:
-                    await WebPageService(session).upsert(new_web_page, new_web_page_content)                
-                    await WebPageJobService(session).upsert(WebPageJob(
-                        normalized_url = response.normalized_url,
-                        state = WebPageJobState.SCRAPED_NEED_SUMMARIZING,                
-                    ))
-                    if response.metadata_image_url:
-                        await self.request_and_store_image(session, context, response.metadata_image_url)
+    async def _index_unchanged_web_page(self, session: AsyncSession, existing_web_page: WebPage, content: bytes | None) -> None:
+        # pages stored before article signatures enter the duplicate index on their next fetch
+        if WebPageDuplicateIndex.is_indexed(existing_web_page.min_hashes):
+            return
+        article_min_hashes = await ProcessPool.instance().run(compute_page_article_min_hashes, content)
+        await self._refresh_min_hashes(session, existing_web_page, {**(existing_web_page.min_hashes or {}), **article_min_hashes})
+
+    async def _refresh_min_hashes(self, session: AsyncSession, existing_web_page: WebPage, min_hashes: dict[str, str]) -> None:
+        await WebPageService(session).update_min_hashes(existing_web_page, min_hashes)
+        await self._duplicate_index.add(session, existing_web_page.normalized_url_hash, min_hashes)
+
+    async def _update_fetch_state(self, session: AsyncSession, new_web_page: WebPage) -> None:
+        # the stored content is still current, restart its cache window and keep the latest validators
+        await WebPageService(session).update_fetch_state(new_web_page, new_web_page.requested_at, new_web_page.etag, new_web_page.last_modified)
+        self._index_web_page(new_web_page)
+
+    async def _write_web_pages(self, pending_web_pages: list[PendingWebPage]) -> None:
+        # a page scraped twice before a flush is written once, with its latest content
+        latest = {pending.web_page.normalized_url_hash: pending for pending in pending_web_pages}
+        written_hashes: set[str] = set()
+        try:
+            async for session in Database.get_session():
+                written_web_pages = await WebPageService(session).upsert_many(
+                    [(pending.web_page, pending.web_page_content) for pending in latest.values()],
+                    max_concurrent_uploads=self._upload_concurrency,
+                    dictionary=self._dictionary)
+                written_hashes = {web_page.normalized_url_hash for web_page in written_web_pages}
+                await AudioContentService(session).upsert_many([
+                    pending.audio_content for pending in latest.values()
+                    if pending.audio_content is not None and pending.web_page.normalized_url_hash in written_hashes
+                ])
+        finally:
+            if self._incremental_filter is not None:
+                for normalized_url_hash, pending in latest.items():
+                    if normalized_url_hash not in written_hashes:
+                        self._incremental_filter.fail(pending.web_page.normalized_url)
+
+    @override
+    async def on_crawl_finished(self) -> None:
+        # image requests need the scraper's http session, which closes right after
+        await self._image_tasks.wait_all()
+
+    async def close(self) -> None:
+        """Flushes the pages still buffered, must be awaited once the crawl is over."""
+        await self._image_tasks.wait_all()
+        await self.writer.close()
+
+    def _index_web_page(self, web_page: WebPage) -> None:
+        if self._url_index is not None:
+            self._url_index.record(web_page.normalized_url_hash, web_page.requested_at, bool(web_page.etag or web_page.last_modified))
                 
-    async def request_and_store_image(self, session: AsyncSession, context: ScraperContext, url: str) -> None:
+    def queue_image(self, context: ScraperContext, url: str) -> None:
+        normalized_image_url = normalize_url(url)
+        if normalized_image_url in self._requested_image_urls:
+            self.image_stats.skipped_count += 1
+            return
+        self._requested_image_urls.add(normalized_image_url)
+        self._image_tasks.submit_function(self.request_and_store_image, context, url)
+
+    async def request_and_store_image(self, context: ScraperContext, url: str) -> None:
         try:            
+            async for session in Database.get_session():
+                if await WebImageService(session).find_by_url(normalize_url(url)) is not None:
+                    self.image_stats.skipped_count += 1
+                    return
             async with context.do_request(url) as http_response:
                 if not http_response.status == 200:
                     logger.error(f"Error fetching image: {url}: {http_response.status}")
@@ -150,19 +345,19 @@ class ServiceScraperStore(ScraperCallback):
                     logger.error(f"Error fetching image: {url}: No content")
                     raise Exception(f"Error fetching image: {url}: No content")
                 
-                img_file = Image.open(io.BytesIO(img_bytes))
-                img = img_file.convert("RGBA")            
-                thumbnail = ImageOps.fit(img, (thumbnailed_image_width, thumbnailed_image_height), Image.Resampling.LANCZOS)            
-                output_io = io.BytesIO()
-                thumbnail.save(output_io, format="PNG")
+                thumbnail = await ProcessPool.instance().run(make_thumbnail, img_bytes, self._thumbnail_format)
+                self.image_stats.add(thumbnail)
+                logger.info(f"Thumbnailed image {url}: {thumbnail.source_width}x{thumbnail.source_height} decoded at "
+                            f"{thumbnail.decoded_width}x{thumbnail.decoded_height} in {thumbnail.decode_seconds * 1000:.1f} ms, "
+                            f"{thumbnail.decoded_bytes / 1000:.0f} KB")
                 now = drop_time_zone(datetime.now(timezone.utc))
 
                 new_web_image = WebImage(
                     url=url,                        
                     width=thumbnailed_image_width,
                     height=thumbnailed_image_height,
-                    source_width = img.size[0],
-                    source_height = img.size[1],
+                    source_width = thumbnail.source_width,
+                    source_height = thumbnail.source_height,
                     requested_at = now,
                 )
 
@@ -170,24 +365,32 @@ class ServiceScraperStore(ScraperCallback):
                     url=url,
                     normalized_url = normalize_url(url),
                     normalized_url_hash = normalized_url_hash(url),
-                    content = output_io.getvalue(),
-                    content_type = "image/png",
+                    content = thumbnail.content,
+                    content_type = thumbnail.content_type,
                     width=thumbnailed_image_width,
                     height=thumbnailed_image_height,
-                    source_width = img.size[0],
-                    source_height = img.size[1],
+                    source_width = thumbnail.source_width,
+                    source_height = thumbnail.source_height,
                     requested_at = now,
                 )
                 
-                await WebImageService(session).upsert(
-                    new_web_image, new_web_image_content)
+                async for session in Database.get_session():
+                    await WebImageService(session).upsert(
+                        new_web_image, new_web_image_content)
                 
         except Exception as e: 
+            self.image_stats.failed_count += 1
             logger.info(f"Failed to store image: {url}")        
         
 
     @override
     async def load_web_page_from_cache(self, normalized_url: str) -> Optional[ScraperWebPage]:        
+        if self._url_index is not None:
+            entry = self._url_index.lookup(normalized_url_hash(normalized_url))
+            self.url_index_skipped_lookups += 1
+            if entry is None or entry.is_stale(self.rerequest_after_hours * 60 * 60):
+                return None
+            return cached_scraper_web_page(normalized_url, entry.requested_at)
         async for session in Database.get_session():
             web_page = await WebPageService(session).find_by_url(normalized_url)            
             if web_page is not None:
@@ -201,27 +404,40 @@ class ServiceScraperStore(ScraperCallback):
             if web_page_content is None:
                 return None
             
-            return ScraperWebPage(
-                status_code = web_page.status_code,
-                url = web_page.url,
-                normalized_url = web_page.normalized_url,
-                headers = web_page_content.headers,
-                content = web_page_content.content,
-                content_type = web_page_content.content_type,
-                content_charset = web_page_content.content_charset,
-                requested_at= web_page.requested_at,
-
-                metadata_title = web_page_content.metadata_title,
-                metadata_description = web_page_content.metadata_description,
-                metadata_image_url = web_page_content.metadata_image_url,
-                metadata_published_at = web_page_content.metadata_published_at,
-
-                canonical_url = web_page_content.canonical_url,
-                outgoing_urls = web_page_content.outgoing_urls,
-                visible_text = web_page_content.visible_text,
-                sitemap_urls = web_page_content.sitemap_urls,
-                feed_urls = web_page_content.feed_urls,
-                robots_content = web_page_content.robots_content,
-                text_chunks = web_page_content.text_chunks
-            )
+            return to_scraper_web_page(web_page, web_page_content)
+        return None
+
+    @override
+    async def load_revalidation_headers(self, normalized_url: str) -> Optional[RevalidationHeaders]:
+        if self._url_index is not None:
+            entry = self._url_index.lookup(normalized_url_hash(normalized_url))
+            if entry is None or not entry.has_validators:
+                self.url_index_skipped_lookups += 1
+                return None
+        async for session in Database.get_session():
+            web_page = await WebPageService(session).find_by_url(normalized_url)
+            if web_page is None or not (web_page.etag or web_page.last_modified):
+                return None
+            return RevalidationHeaders(etag=web_page.etag, last_modified=web_page.last_modified)
+        return None
+
+    @override
+    async def load_not_modified_web_page(self, normalized_url: str, headers: dict[str, str]) -> Optional[NotModifiedWebPage]:
+        async for session in Database.get_session():
+            web_page_service = WebPageService(session)
+            web_page = await web_page_service.find_by_url(normalized_url)
+            if web_page is None:
+                return None
+            # the stored row, hashes and signatures stay current, the raw body and texts are not loaded
+            web_page_content = await web_page_service.get_content(web_page, LINK_FIELD_NAMES)
+            if web_page_content is None:
+                return None
+            # a 304 may carry updated validators
+            web_page.channel_normalized_url_hash = self._channel_normalized_url_hash or web_page.channel_normalized_url_hash
+            web_page.requested_at = datetime.now()
+            web_page.etag = get_header(headers, "ETag") or web_page.etag
+            web_page.last_modified = get_header(headers, "Last-Modified") or web_page.last_modified
+            await web_page_service.update_fetch_state(web_page, web_page.requested_at, web_page.etag, web_page.last_modified)
+            self._index_web_page(web_page)
+            return NotModifiedWebPage(to_scraper_web_page(web_page, web_page_content, with_content=False), web_page_content.content_size)
         return None
@@ -1,12 +1,27 @@
-from typing import Set, List, Optional
+from typing import Callable, Dict, Set, List, Optional
 import re
 from dataclasses import dataclass
+from enum import Enum
 from bs4 import BeautifulSoup
+from lxml import etree
 import numpy as np
 import numpy.typing as npt
-from datetime import datetime
+from ..summarizer.dateparser import extract_date_from_url  # re-exported for existing callers
 
 TEXTIFY_PATTERN = re.compile(r'[^\w]')
+TEXTIFY_SKIPPED_TAGS = frozenset(["script", "style"])
+
+class TextifyBackend(str, Enum):
+    """
+    BS4 is the reference, stored text hashes and signatures were computed with it. LXML streams
+    libxml2's tokenizer and is faster, but libxml2 parses some markup differently: it keeps the
+    content of <template>, drops CDATA sections, reads the content of raw text elements such as
+    <xmp>, <plaintext>, <textarea> and <title> as markup, decodes legacy entities without a
+    semicolon by prefix (&notit; is "¬it;") and drops the rest of a page after an unterminated
+    comment. Pages with such markup get other text hashes with LXML.
+    """
+    BS4 = "bs4"
+    LXML = "lxml"
 
 @dataclass
 class HTMLDocument:
@@ -14,7 +29,7 @@ class HTMLDocument:
     content: str
     minhash_signature: Optional[npt.NDArray[np.int64]] = None
     
-def textify_html(html: str) -> str:
+def _textify_html_bs4(html: str) -> str:
     soup = BeautifulSoup(html, 'html.parser')
     for script in soup(["script", "style"]):
         script.decompose()
@@ -24,33 +39,49 @@ def textify_html(html: str) -> str:
     text = re.sub(TEXTIFY_PATTERN, '', text.lower())
     return text    
 
-def extract_date_from_url(url: str) -> datetime | None:
-    try:
-        # Look for year between 2020-2027
-        for year in range(2020, 2028):
-            year_str = str(year)
-            if year_str in url:
-                pos = url.find(year_str) + 4
-                nums = ""
-                # Move right and collect up to 4 numbers
-                while len(nums) < 4 and pos < len(url):                    
-                    if url[pos].isalpha():
-                        return None
-                    if url[pos].isdigit():
-                        nums += url[pos]
-                    pos += 1
-                    
-                if len(nums) == 4:
-                    month = int(nums[:2])
-                    day = int(nums[2:])
-                    if 1 <= month <= 12 and 1 <= day <= 31:
-                        parsed_date = datetime(year, month, day)
-                        if parsed_date > datetime.now():
-                            return None
-                        return parsed_date
-        return None
-    except (ValueError, IndexError):
-        return None
-    
-    
-    
\ No newline at end of file
+class _VisibleTextTarget:
+    """lxml parser target collecting text outside script/style as the tokenizer emits it, without building a tree."""
+
+    def __init__(self) -> None:
+        self.chunks: List[str] = []
+        self.skipped_depth = 0
+
+    def start(self, tag: str, attrib: Dict[str, str]) -> None:
+        if tag in TEXTIFY_SKIPPED_TAGS:
+            self.skipped_depth += 1
+
+    def end(self, tag: str) -> None:
+        if tag in TEXTIFY_SKIPPED_TAGS and self.skipped_depth > 0:
+            self.skipped_depth -= 1
+
+    def data(self, data: str) -> None:
+        if not self.skipped_depth:
+            self.chunks.append(data)
+
+    def comment(self, text: str) -> None:
+        pass
+
+    def close(self) -> str:
+        return ''.join(self.chunks)
+
+def _textify_html_lxml(html: str) -> str:
+    if not html.strip():
+        return ""
+    parser = etree.HTMLParser(target=_VisibleTextTarget())
+    parser.feed(html)
+    text = parser.close()
+    # whitespace is dropped by the pattern as well, so there is no need to normalize it first
+    return re.sub(TEXTIFY_PATTERN, '', text.lower())
+
+TEXTIFIERS: Dict[TextifyBackend, Callable[[str], str]] = {
+    TextifyBackend.BS4: _textify_html_bs4,
+    TextifyBackend.LXML: _textify_html_lxml,
+}
+
+def textify_html(html: str, backend: TextifyBackend = TextifyBackend.BS4) -> str:
+    """Lowercased word characters of the visible text, script and style content excluded."""
+    return TEXTIFIERS[backend](html)
+
+def textify_text(text: str) -> str:
+    """Applies the textify_html normalization to already extracted text."""
+    return re.sub(TEXTIFY_PATTERN, '', text.lower())
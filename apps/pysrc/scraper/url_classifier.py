@@ -0,0 +1,109 @@
+from typing import Dict, List, Tuple
+import re
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime
+from enum import Enum
+from urllib.parse import urlparse, parse_qsl
+
+_NUMBER = re.compile(r"^\d+$")
+_IDENTIFIER = re.compile(r"^(?=.*\d)[0-9a-f-]{8,}$", re.IGNORECASE)
+_SLUG = re.compile(r"[-_.]")
+
+def _segment_shape(segment: str) -> str:
+    if _NUMBER.match(segment):
+        return "{n}"
+    if _IDENTIFIER.match(segment):
+        return "{id}"
+    if _SLUG.search(segment) or any(char.isdigit() for char in segment):
+        return "{slug}"
+    return "{w}"
+
+def url_shape(url: str) -> str:
+    """
+    Path shape of the url, e.g. https://a.com/tag/python?page=2 -> a.com/tag/{w}?page.
+    A plain-word first segment is kept literally since sites route sections by it.
+    """
+    parsed = urlparse(url)
+    segments = [segment for segment in parsed.path.split("/") if segment]
+    shape = []
+    for index, segment in enumerate(segments):
+        segment_shape = _segment_shape(segment)
+        shape.append(segment if index == 0 and segment_shape == "{w}" else segment_shape)
+    query_keys = sorted(set(key for key, _ in parse_qsl(parsed.query, keep_blank_values=True)))
+    return parsed.netloc + "/" + "/".join(shape) + ("?" + "&".join(query_keys) if query_keys else "")
+
+def is_article_page(metadata_title: str | None, metadata_published_at: datetime | None) -> bool:
+    """Articles carry a title and a publication date, index pages (tags, authors, pagination) do not."""
+    return bool(metadata_title) and metadata_published_at is not None
+
+class UrlDecision(Enum):
+    PRIORITY = "priority"
+    FETCH = "fetch"
+    SKIP = "skip"
+
+@dataclass
+class UrlClusterStats:
+    page_count: int = 0
+    article_count: int = 0
+
+    @property
+    def article_ratio(self) -> float:
+        return self.article_count / self.page_count if self.page_count else 0.0
+
+class UrlClassifier:
+    """
+    Per-channel classifier deciding whether a url is worth requesting before it is fetched.
+    Urls are clustered by path shape; clusters that produced articles are prioritized, clusters
+    that only ever produced index pages are skipped except for every explore_every-th url,
+    which keeps links discoverable and the statistics fresh.
+    """
+
+    def __init__(self, min_pages: int = 10, min_article_ratio: float = 0.5, max_index_article_ratio: float = 0.05, explore_every: int = 20) -> None:
+        self.min_pages = min_pages
+        self.min_article_ratio = min_article_ratio
+        self.max_index_article_ratio = max_index_article_ratio
+        self.explore_every = explore_every
+        self.clusters: Dict[str, UrlClusterStats] = defaultdict(UrlClusterStats)
+        self._skip_candidates: Dict[str, int] = defaultdict(int)
+        self.prioritized_count = 0
+        self.skipped_count = 0
+        self.explored_count = 0
+
+    @classmethod
+    def from_pages(cls, pages: List[Tuple[str, bool]], **kwargs) -> "UrlClassifier":
+        """Classifier trained on (url, is_article) pairs of previously scraped pages."""
+        classifier = cls(**kwargs)
+        for url, is_article in pages:
+            classifier.observe(url, is_article)
+        return classifier
+
+    def observe(self, url: str, is_article: bool) -> None:
+        cluster = self.clusters[url_shape(url)]
+        cluster.page_count += 1
+        if is_article:
+            cluster.article_count += 1
+
+    def classify(self, url: str) -> UrlDecision:
+        cluster = self.clusters.get(url_shape(url))
+        if cluster is None or cluster.page_count < self.min_pages:
+            return UrlDecision.FETCH
+        if cluster.article_ratio >= self.min_article_ratio:
+            return UrlDecision.PRIORITY
+        if cluster.article_ratio <= self.max_index_article_ratio:
+            return UrlDecision.SKIP
+        return UrlDecision.FETCH
+
+    def decide(self, url: str) -> UrlDecision:
+        """classify() plus exploration and bookkeeping, call once per discovered url."""
+        decision = self.classify(url)
+        if decision == UrlDecision.SKIP:
+            shape = url_shape(url)
+            self._skip_candidates[shape] += 1
+            if self._skip_candidates[shape] % self.explore_every == 1 or self.explore_every <= 1:
+                self.explored_count += 1
+                return UrlDecision.FETCH
+            self.skipped_count += 1
+        elif decision == UrlDecision.PRIORITY:
+            self.prioritized_count += 1
+        return decision
@@ -0,0 +1,73 @@
+import base64
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, Iterable, Tuple
+import numpy as np
+import numpy.typing as npt
+
+# requested_at of pages that were never requested, such pages never go stale
+_NEVER_REQUESTED = np.iinfo(np.int64).min
+
+def url_hash_key(normalized_url_hash: str) -> int:
+    """First 64 bits of a normalized url hash (url safe base64 of a sha256) as a signed integer."""
+    digest = base64.urlsafe_b64decode(normalized_url_hash[:12])
+    return int.from_bytes(digest[:8], "little", signed=True)
+
+def _to_epoch(requested_at: datetime | None) -> int:
+    return _NEVER_REQUESTED if requested_at is None else int(requested_at.timestamp())
+
+@dataclass
+class UrlIndexEntry:
+    requested_at: datetime | None
+    has_validators: bool
+
+    def is_stale(self, max_age_seconds: float, now: datetime | None = None) -> bool:
+        if self.requested_at is None:
+            return False
+        return ((now or datetime.now()) - self.requested_at).total_seconds() > max_age_seconds
+
+class UrlIndex:
+    """
+    Known pages of a channel, loaded with one query at crawl start so the scraper's cache
+    decisions need no database round trip. Pages are keyed by the first 64 bits of their
+    normalized url hash in sorted arrays, 17 bytes per page; pages stored during the crawl
+    go to a small overlay. A fresh entry answers the cache lookup by itself; a key collision, one
+    in 2^64 per pair of urls, leaves the colliding page unscraped until the entry goes stale.
+    """
+
+    def __init__(self, pages: Iterable[Tuple[str, datetime | None, bool]] = ()) -> None:
+        keys, requested_at, has_validators = [], [], []
+        for normalized_url_hash, page_requested_at, page_has_validators in pages:
+            keys.append(url_hash_key(normalized_url_hash))
+            requested_at.append(_to_epoch(page_requested_at))
+            has_validators.append(page_has_validators)
+        order = np.argsort(np.array(keys, dtype=np.int64), kind="stable")
+        self._keys: npt.NDArray[np.int64] = np.array(keys, dtype=np.int64)[order]
+        self._requested_at: npt.NDArray[np.int64] = np.array(requested_at, dtype=np.int64)[order]
+        self._has_validators: npt.NDArray[np.bool_] = np.array(has_validators, dtype=np.bool_)[order]
+        self._recent: Dict[int, UrlIndexEntry] = {}
+
+    def __len__(self) -> int:
+        return len(self._keys) + len(self._recent)
+
+    @property
+    def nbytes(self) -> int:
+        return self._keys.nbytes + self._requested_at.nbytes + self._has_validators.nbytes
+
+    def lookup(self, normalized_url_hash: str) -> UrlIndexEntry | None:
+        key = url_hash_key(normalized_url_hash)
+        entry = self._recent.get(key)
+        if entry is not None:
+            return entry
+        position = int(np.searchsorted(self._keys, key))
+        if position == len(self._keys) or self._keys[position] != key:
+            return None
+        requested_at = int(self._requested_at[position])
+        return UrlIndexEntry(
+            requested_at=None if requested_at == _NEVER_REQUESTED else datetime.fromtimestamp(requested_at),
+            has_validators=bool(self._has_validators[position]),
+        )
+
+    def record(self, normalized_url_hash: str, requested_at: datetime | None, has_validators: bool) -> None:
+        """Keeps the index current for pages stored or refreshed during the crawl."""
+        self._recent[url_hash_key(normalized_url_hash)] = UrlIndexEntry(requested_at, has_validators)
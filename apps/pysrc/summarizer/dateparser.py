@@ -0,0 +1,110 @@
+from bisect import bisect_right
+from datetime import datetime
+from functools import lru_cache
+from typing import List, Sequence
+import re
+
+MIN_YEAR = 1990
+
+_YEAR = r"(?:19|20)\d{2}"
+_MONTH_NAME = (r"(?:jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|june?|july?|aug(?:ust)?"
+               r"|sep(?:t(?:ember)?)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?)(?![a-z])")
+_SEPARATOR = r"[-/_.]"
+_SEPARATORS = frozenset("-/_.")
+
+MONTH_NUMBERS = {
+    "jan": 1, "feb": 2, "mar": 3, "apr": 4, "may": 5, "jun": 6,
+    "jul": 7, "aug": 8, "sep": 9, "oct": 10, "nov": 11, "dec": 12,
+}
+
+# Every supported layout contains a four digit year, so urls are scanned for years only
+# and the layouts are matched around each year. Patterns expect lowercased input.
+# No lookbehind here, it would run at every position; years inside numbers are rejected in _date_at_year.
+YEAR_PATTERN = re.compile(_YEAR)
+
+# 2024/03/05, 2024-03-05, 20240305, 202403-05 and 2024/mar/05, matched at the year
+AFTER_YEAR_PATTERN = re.compile(
+    rf"(?P<year>{_YEAR})(?:"
+    rf"{_SEPARATOR}?(?P<month>0[1-9]|1[0-2]){_SEPARATOR}?(?P<day>0[1-9]|[12]\d|3[01])(?!\d)"
+    rf"|{_SEPARATOR}(?P<month_name>{_MONTH_NAME}){_SEPARATOR}(?P<day_of_month>\d{{1,2}})(?!\d))"
+)
+
+# 05-march-2024 and march-5th-2024, matched against the text ending at the year
+BEFORE_YEAR_PATTERN = re.compile(
+    rf"(?:(?<!\d)(?P<day>\d{{1,2}}){_SEPARATOR}(?P<month_name>{_MONTH_NAME})"
+    rf"|(?<![a-z])(?P<month_name_first>{_MONTH_NAME}){_SEPARATOR}(?P<day_of_month>\d{{1,2}})(?:st|nd|rd|th)?){_SEPARATOR}$"
+)
+_BEFORE_YEAR_WINDOW = len("september-30th-")
+
+@lru_cache(maxsize=4096)
+def _parse_date(year: str, month: str, day: str) -> datetime | None:
+    try:
+        month_number = int(month) if month.isdigit() else MONTH_NUMBERS[month[:3]]
+        return datetime(int(year), month_number, int(day))
+    except (ValueError, KeyError):
+        return None
+
+def _to_date(year: str, month: str, day: str, now: datetime) -> datetime | None:
+    parsed_date = _parse_date(year, month, day)
+    if parsed_date is None or parsed_date.year < MIN_YEAR or parsed_date > now:
+        return None
+    return parsed_date
+
+def _date_at_year(text: str, start: int, now: datetime) -> datetime | None:
+    """Date around the year starting at text[start], text is lowercased."""
+    if start > 0 and text[start - 1].isdigit():
+        return None
+    year = text[start:start + 4]
+    match = AFTER_YEAR_PATTERN.match(text, start)
+    if match is not None:
+        if match.group("month"):
+            parsed_date = _to_date(year, match.group("month"), match.group("day"), now)
+        else:
+            parsed_date = _to_date(year, match.group("month_name"), match.group("day_of_month"), now)
+        if parsed_date is not None:
+            return parsed_date
+    # month name layouts precede the year with a separator
+    if start < 2 or text[start - 1] not in _SEPARATORS:
+        return None
+    match = BEFORE_YEAR_PATTERN.search(text, max(0, start - _BEFORE_YEAR_WINDOW), start)
+    if match is None:
+        return None
+    if match.group("month_name"):
+        return _to_date(year, match.group("month_name"), match.group("day"), now)
+    return _to_date(year, match.group("month_name_first"), match.group("day_of_month"), now)
+
+def extract_date_from_url(url: str, now: datetime | None = None) -> datetime | None:
+    """First valid, non-future date embedded in the url, e.g. /2024/03/05/, -20240305, /05-march-2024/."""
+    now = now or datetime.now()
+    url = url.lower()
+    for match in YEAR_PATTERN.finditer(url):
+        parsed_date = _date_at_year(url, match.start(), now)
+        if parsed_date is not None:
+            return parsed_date
+    return None
+
+def extract_dates_from_urls(urls: Sequence[str], now: datetime | None = None) -> List[datetime | None]:
+    """
+    extract_date_from_url over a whole sitemap or feed url list: the urls are joined and scanned
+    with a single regex pass, matches are mapped back to their url by offset.
+    """
+    now = now or datetime.now()
+    # lowercased per url, lowercasing may change the length of non-ascii urls
+    lowered_urls = [url.lower() for url in urls]
+    text = "\n".join(lowered_urls)
+    if text.count("\n") != max(len(urls) - 1, 0):
+        # a url with an embedded newline would shift the offsets
+        return [extract_date_from_url(url, now) for url in urls]
+
+    url_starts = []
+    offset = 0
+    for url in lowered_urls:
+        url_starts.append(offset)
+        offset += len(url) + 1
+
+    dates: List[datetime | None] = [None] * len(urls)
+    for match in YEAR_PATTERN.finditer(text):
+        index = bisect_right(url_starts, match.start()) - 1
+        if dates[index] is None:
+            dates[index] = _date_at_year(text, match.start(), now)
+    return dates
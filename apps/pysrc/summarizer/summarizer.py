@@ -8,7 +8,8 @@ from ..db.database import Database
 from pyminiscraper.url import normalized_url_hash, normalize_url
 from .ollama import OllamaClient
 from .prompts import SummaryConfig, SummaryLength, SummaryTone, SummaryFocus, SummaryPrompt, DateDeductionPrompt
-from ..db.service import WebPageService, WebPageSummaryService, WebPageJobService
+from ..db.service import WebPageService, WebPageSummaryService, WebPageJobService, WebPageChannelTemplateService
+from ..scraper.boilerplate import ChannelTemplate, strip_template
 from ..utils.parallel import ParallelTaskManager
 from dateutil.parser import parse
 from datetime import datetime
@@ -71,7 +72,7 @@ class SummarizerService:
                 self.logger.error(f"Failed to find web page for normalized url: {normalized_url}")
                 return
             
-            web_page_content = await web_page_service.get_content(web_page)
+            web_page_content = await web_page_service.get_content(web_page, ("visible_text", "article_text"))
             if web_page_content is None:
                 self.logger.error(f"Failed to find web page content for normalized url: {normalized_url}")
                 return
@@ -85,13 +86,25 @@ class SummarizerService:
                 return
             
 
+            # navigation, footers and other page chrome only cost prompt tokens
+            text = web_page_content.article_text or web_page_content.visible_text
+            # the scraper stores the hash of the channel row it crawled the page for
+            channel_template = None
+            if web_page.channel_normalized_url_hash is not None:
+                channel_template = await WebPageChannelTemplateService(session).find_by_channel(web_page.channel_normalized_url_hash)
+            if web_page_content.article_text is None and channel_template is not None:
+                # the raw html is downloaded only for pages without an article body
+                html = await web_page_content.load_content()
+                if html:
+                    text = strip_template(html.decode("utf-8"), ChannelTemplate.from_block_hashes(channel_template.block_hashes)) or text
+
             self.logger.info(f"Summarizing web page: {web_page.url}")
             
-            summary = await self.summarize_text_v2(web_page_content.visible_text)
+            summary = await self.summarize_text_v2(text)
 
             published_at = None            
             date_deduction_prompt = DateDeductionPrompt(
-                web_page_content.visible_text,
+                text,
             )
             published_at_text = await OllamaClient(model=self.ollama_model).generate(date_deduction_prompt.get_prompt())
             try:
@@ -0,0 +1,103 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Generic, List, TypeVar
+
+T = TypeVar('T')
+
+logger = logging.getLogger("batch_writer")
+
+@dataclass
+class BatchWriterStats:
+    queued_count: int = 0
+    flushed_count: int = 0
+    failed_count: int = 0
+    flush_count: int = 0
+    flush_seconds: float = 0.0
+    max_flush_seconds: float = 0.0
+    max_queue_depth: int = 0
+
+    @property
+    def average_flush_seconds(self) -> float:
+        return self.flush_seconds / self.flush_count if self.flush_count else 0.0
+
+class BatchWriter(Generic[T]):
+    """
+    Write-behind buffer: put() queues an item and returns, a background task hands the queue
+    to flush_batch in batches of max_batch_size, as soon as a batch fills up and at least
+    every max_delay_seconds. Producers wait only when max_queue_size items are queued.
+    close() flushes everything still queued; callers must close the writer when they are done.
+    """
+
+    def __init__(self,
+                 flush_batch: Callable[[List[T]], Awaitable[None]],
+                 max_batch_size: int = 50,
+                 max_delay_seconds: float = 5.0,
+                 max_queue_size: int | None = None) -> None:
+        self._flush_batch = flush_batch
+        self.max_batch_size = max_batch_size
+        self.max_delay_seconds = max_delay_seconds
+        self.max_queue_size = max_queue_size or max_batch_size * 4
+        self.stats = BatchWriterStats()
+        self._queue: List[T] = []
+        self._flush_lock = asyncio.Lock()
+        self._wakeup = asyncio.Event()
+        self._task: asyncio.Task[None] | None = None
+        self._closed = False
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._queue)
+
+    async def put(self, item: T) -> None:
+        if self._closed:
+            raise RuntimeError("BatchWriter is closed")
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+        self._queue.append(item)
+        self.stats.queued_count += 1
+        self.stats.max_queue_depth = max(self.stats.max_queue_depth, len(self._queue))
+        if len(self._queue) >= self.max_queue_size:
+            # the background flushes fell behind, the producer pays for the next one
+            await self.flush()
+        elif len(self._queue) >= self.max_batch_size:
+            self._wakeup.set()
+
+    async def flush(self) -> None:
+        async with self._flush_lock:
+            while self._queue:
+                batch = self._queue[:self.max_batch_size]
+                del self._queue[:self.max_batch_size]
+                await self._write(batch)
+
+    async def close(self) -> None:
+        self._closed = True
+        if self._task is not None:
+            # never cancelled, a cancelled flush would lose the batch it already dequeued
+            self._wakeup.set()
+            await self._task
+            self._task = None
+        await self.flush()
+
+    async def _run(self) -> None:
+        while not self._closed:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.max_delay_seconds)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            await self.flush()
+
+    async def _write(self, batch: List[T]) -> None:
+        started_at = time.perf_counter()
+        try:
+            await self._flush_batch(batch)
+            self.stats.flushed_count += len(batch)
+        except Exception as e:
+            self.stats.failed_count += len(batch)
+            logger.error(f"Failed to flush batch of {len(batch)} items: {e}")
+        elapsed = time.perf_counter() - started_at
+        self.stats.flush_count += 1
+        self.stats.flush_seconds += elapsed
+        self.stats.max_flush_seconds = max(self.stats.max_flush_seconds, elapsed)
@@ -0,0 +1,63 @@
+import asyncio
+import concurrent.futures
+import logging
+import os
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, TypeVar
+
+from pysrc.config.rzconfig import RzConfig
+
+T = TypeVar('T')
+
+logger = logging.getLogger("process_pool")
+
+class ProcessPool:
+    """
+    Runs CPU-bound work in worker processes so it neither holds the GIL nor stalls the event loop.
+    Workers are recycled after max_tasks_per_child tasks; max_workers=0 runs everything in-process.
+    Arguments and results cross the process boundary pickled, so pass bytes rather than rich objects.
+    """
+
+    __instance: "ProcessPool | None" = None
+
+    def __init__(self, max_workers: int | None = None, max_tasks_per_child: int | None = 256) -> None:
+        self.max_workers = (os.cpu_count() or 1) if max_workers is None else max_workers
+        self.max_tasks_per_child = max_tasks_per_child
+        self._executor: concurrent.futures.ProcessPoolExecutor | None = None
+
+    @classmethod
+    def instance(cls) -> "ProcessPool":
+        if cls.__instance is None:
+            config = RzConfig.instance()
+            cls.__instance = ProcessPool(config.process_pool_workers, config.process_pool_max_tasks_per_child)
+        return cls.__instance
+
+    @property
+    def in_process(self) -> bool:
+        return self.max_workers == 0
+
+    def _get_executor(self) -> concurrent.futures.ProcessPoolExecutor:
+        if self._executor is None:
+            logger.info(f"Starting process pool with {self.max_workers} workers")
+            self._executor = concurrent.futures.ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                max_tasks_per_child=self.max_tasks_per_child,
+            )
+        return self._executor
+
+    async def run(self, func: Callable[..., T], *args: Any) -> T:
+        if self.in_process:
+            return func(*args)
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(self._get_executor(), func, *args)
+        except BrokenProcessPool:
+            # a worker died (OOM kill, segfault in a native parser); start a fresh pool and retry once
+            logger.error(f"Process pool broken while running {func.__name__}, restarting")
+            self.shutdown(wait=False)
+            return await loop.run_in_executor(self._get_executor(), func, *args)
+
+    def shutdown(self, wait: bool = True) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait, cancel_futures=not wait)
+            self._executor = None
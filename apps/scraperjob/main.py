@@ -1,32 +1,74 @@
 import asyncclick as click
 import asyncio
 from pysrc.db.database import Database
-from pysrc.db.service import WebPageChannelService, WebPageService
-from pysrc.db.web_page import WebPageChannel, WebPageContent, WebPageSeedType, WebPageSeed, web_page_seed_to_dict, web_page_seed_from_dict, WebPage
+from pysrc.db.service import AudioContentService, WebPageChannelService, WebPageService, WebPageChannelTemplateService, WebPageChannelDictionaryService
+from pysrc.db.web_page import WebPageChannel, WebPageContent, WebPageSeedType, WebPageSeed, web_page_seed_to_dict, web_page_seed_from_dict, WebPage, WebPageChannelTemplate, WebPageChannelDictionary
 from pysrc.observe.log import Logging
-from pysrc.scraper.service import ScraperService
+from pysrc.scraper.service import PostgresChannelLeases, ScraperService
+from pysrc.scraper.sharding import ChannelShardWorker
+from pysrc.config.rzconfig import RzConfig
+from pysrc.dfs.dfs import DFSClient
+from pysrc.scraper.crawler import RzScraperStats
 from pysrc.utils.parallel import ParallelTaskManager
 from pysrc.scraper.utils import convert_seed_type
 from pysrc.config.jobs import Jobs
-from datetime import datetime
+from datetime import datetime, timedelta
+import os
+import numpy as np
+import socket
+import time
 from pysrc.scraper.text import extract_date_from_url
 from sqlalchemy import Null
-from pyminiscraper.filter import PathFilter
+from pysrc.scraper.path_filter import filtered_out
 import logging
 from pysrc.db.default_data import create_channels
+from pysrc.utils.process_pool import ProcessPool
+from pysrc.scraper.boilerplate import ChannelTemplate, TemplateLearner
+from pysrc.db.content_format import compressed_size, train_dictionary
+import zstandard
 
 logger = logging.getLogger("scraperjob")
 
 @click.command()
 @click.option("-channel", "--channel-url", help="Process only this specific channel URL")
-async def main(channel_url: str|None = None):
+@click.option("--shared-crawl", is_flag=True, help="Crawl all enabled channels through one shared frontier and http client")
+@click.option("--resume", is_flag=True, help="Continue the crawls an evicted or timed out run checkpointed instead of starting from the seeds")
+@click.option("--shard-run", envvar="SCRAPER_SHARD_RUN", help="Join the sharded run with this id, replicas of one run claim channels through leases")
+async def main(channel_url: str|None = None, shared_crawl: bool = False, resume: bool = False, shard_run: str|None = None):
     await Jobs.initialize()    
+    if shard_run:
+        try:
+            await scrape_channels_sharded(shard_run, channel_url, resume)
+        finally:
+            ProcessPool.instance().shutdown()
+        log_dfs_cache_stats()
+        await Jobs.shutdown()
+        return
     await clean_channels(channel_url)    
-    await scrape_channels(channel_url)
+    try:
+        if shared_crawl:
+            await scrape_channels_shared(channel_url, resume)
+        else:
+            await scrape_channels(channel_url, resume)
+    finally:
+        ProcessPool.instance().shutdown()
     await clean_channels(channel_url)
+    await learn_channel_templates(channel_url)
+    await train_channel_dictionaries(channel_url)
+    log_dfs_cache_stats()
+    await Jobs.shutdown()
+    
+def log_dfs_cache_stats()->None:
+    cache_stats = DFSClient(RzConfig.instance()).cache_stats
+    if cache_stats is None:
+        return
+    requests_count = cache_stats.hits + cache_stats.misses
+    logger.info(f"DFS cache: {cache_stats.hits} hits of {requests_count} reads, {cache_stats.hit_bytes / 1_000_000:.1f} MB "
+                f"served from disk, {cache_stats.miss_bytes / 1_000_000:.1f} MB downloaded, {cache_stats.written_bytes / 1_000_000:.1f} MB "
+                f"written, {cache_stats.evicted_count} files evicted")
     
-async def scrape_channel(channel: WebPageChannel)->None:
-    await ScraperService().scrape_channel(
+async def scrape_channel(channel: WebPageChannel, resume: bool = False)->RzScraperStats:
+    return await ScraperService().scrape_channel(
         channel_normalized_url_hash=channel.normalized_url_hash,
         channel_normalized_url=channel.normalized_url,
         scraper_seeds=web_page_seed_from_dict(channel.scraper_seeds),
@@ -35,42 +77,94 @@ async def scrape_channel(channel: WebPageChannel)->None:
         scraper_follow_sitemap_links=channel.scraper_follow_sitemap_links,
         scraper_follow_feed_links=channel.scraper_follow_feed_links,
         scraper_follow_web_page_links=channel.scraper_follow_web_page_links,
+        resume=resume,
     )
     
     
-async def scrape_channels(channel_url: str|None = None)->None:
+def log_crawl_throughput(mode: str, stats: list[RzScraperStats], elapsed: float)->None:
+    requested_urls_count = sum(channel_stats.requested_urls_count for channel_stats in stats)
+    success_urls_count = sum(channel_stats.success_urls_count for channel_stats in stats)
+    logger.info(f"Scraped {len(stats)} channels in {mode} mode: {requested_urls_count} urls requested, {success_urls_count} succeeded "
+                f"in {elapsed:.1f} s, {requested_urls_count / elapsed if elapsed else 0:.2f} urls/s")
+    
+async def scrape_channels(channel_url: str|None = None, resume: bool = False)->None:
+    started_at = time.perf_counter()
     async for session in Database.get_session():
         web_page_channel_service = WebPageChannelService(session)
-        task_manager = ParallelTaskManager[None](max_concurrent_tasks=5)
+        task_manager = ParallelTaskManager[RzScraperStats](max_concurrent_tasks=5)
                  
         if channel_url:
             channel = await web_page_channel_service.find_by_url(channel_url)
             if channel:
-                task_manager.submit_task(scrape_channel(channel))
+                task_manager.submit_task(scrape_channel(channel, resume))
             else:
                 logger.warning(f"Channel with URL {channel_url} not found")
         else:
             for channel in await web_page_channel_service.find_all():
-                task_manager.submit_task(scrape_channel(channel))            
+                task_manager.submit_task(scrape_channel(channel, resume))            
                 
-        await task_manager.wait_all()
+        log_crawl_throughput("per-channel", await task_manager.wait_all(), time.perf_counter() - started_at)
 
-async def clean_channel_web_pages(channel: WebPageChannel)->None:
+async def scrape_channels_shared(channel_url: str|None = None, resume: bool = False)->None:
+    started_at = time.perf_counter()
+    channels: list[WebPageChannel] = []
     async for session in Database.get_session():
-        web_page_job_service = WebPageJobService(session)
-        web_page_service = WebPageService(session)
-        include_path_filter = PathFilter(channel.include_path_patterns if channel.include_path_patterns else [], True)
-        exclude_path_filter = PathFilter(channel.exclude_path_patterns if channel.exclude_path_patterns else [], False)
-        web_page_normalized_urls = await web_page_service.find_normalized_urls_by_channel(channel.normalized_url_hash)
-        for web_page_normalized_url in web_page_normalized_urls:
-            job = await web_page_job_service.find_by_url(web_page_normalized_url)
-            if not job:
-                continue
+        web_page_channel_service = WebPageChannelService(session)
+        if channel_url:
+            channel = await web_page_channel_service.find_by_url(channel_url)
+            if channel:
+                channels.append(channel)
+            else:
+                logger.warning(f"Channel with URL {channel_url} not found")
+        else:
+            channels = [channel for channel in await web_page_channel_service.find_all() if channel.is_enabled]
+    stats = await ScraperService().scrape_channels(channels, resume=resume)
+    log_crawl_throughput("shared", list(stats.values()), time.perf_counter() - started_at)
+
+async def scrape_channels_sharded(run_id: str, channel_url: str|None = None, resume: bool = False)->None:
+    config = RzConfig.instance()
+    started_at = time.perf_counter()
+    async for session in Database.get_session():
+        web_page_channel_service = WebPageChannelService(session)
+        if channel_url:
+            channel = await web_page_channel_service.find_by_url(channel_url)
+            channels = [channel] if channel else []
+        else:
+            channels = await web_page_channel_service.find_all()
+    leases = PostgresChannelLeases(run_id, f"{socket.gethostname()}-{os.getpid()}",
+                                   lease_seconds=config.scraper_shard_lease_seconds, max_attempts=config.scraper_shard_max_attempts)
+    await leases.create_run([channel.normalized_url_hash for channel in channels])
+    stats: list[RzScraperStats] = []
 
-            if not include_path_filter.is_passing(job.normalized_url) or exclude_path_filter.is_passing(job.normalized_url):
-                if job.state != WebPageJobState.UNPUBLISHED:
-                    job.state = WebPageJobState.NEED_UNPUBLISHING
-                    await web_page_job_service.upsert(job)
+    async def crawl_channel(channel_normalized_url_hash: str)->None:
+        async for session in Database.get_session():
+            channel = await WebPageChannelService(session).find_by_hash(channel_normalized_url_hash)
+        if channel is None:
+            logger.warning(f"Leased channel {channel_normalized_url_hash} not found")
+            return
+        await clean_channel_web_pages(channel)
+        stats.append(await scrape_channel(channel, resume))
+        await clean_channel_web_pages(channel)
+        await learn_channel_template(channel)
+        await train_channel_dictionary(channel)
+
+    shard_stats = await ChannelShardWorker(leases, crawl_channel, max_channels=config.scraper_shard_channels,
+                                           heartbeat_seconds=config.scraper_shard_heartbeat_seconds).run()
+    logger.info(f"Sharded run {run_id} replica {leases.holder}: claimed {shard_stats.claimed_count} channels, "
+                f"finished {shard_stats.finished_count}, failed {shard_stats.failed_count}, lost {shard_stats.lost_count} leases")
+    log_crawl_throughput("sharded", stats, time.perf_counter() - started_at)
+
+async def clean_channel_web_pages(channel: WebPageChannel)->None:
+    """Hides the audio of pages the channel's current path patterns exclude, in one query and one update."""
+    started_at = time.perf_counter()
+    async for session in Database.get_session():
+        audio_content_service = AudioContentService(session)
+        pages = await audio_content_service.find_unhidden_by_channel(channel.normalized_url_hash)
+        excluded = filtered_out([normalized_url for normalized_url, _ in pages],
+                                channel.include_path_patterns or [], channel.exclude_path_patterns or [])
+        hidden_count = await audio_content_service.hide_many([pages[i][1] for i in np.flatnonzero(excluded)])
+        logger.info(f"Cleaned channel {channel.normalized_url}: hid {hidden_count} of {len(pages)} pages "
+                    f"in {time.perf_counter() - started_at:.2f} s")
         
 
 async def clean_channels(channel_url: str|None = None)->None:
@@ -91,6 +185,130 @@ async def clean_channels(channel_url: str|None = None)->None:
         await task_manager.wait_all()        
         
     
+async def learn_channel_template(channel: WebPageChannel, sample_size: int = 50, max_age: timedelta = timedelta(days=7))->None:
+    async for session in Database.get_session():
+        web_page_channel_template_service = WebPageChannelTemplateService(session)
+        existing_template = await web_page_channel_template_service.find_by_channel(channel.normalized_url_hash)
+        # every template change invalidates the stored signatures of the channel, so relearn sparingly
+        if existing_template and existing_template.learned_at and datetime.now() - existing_template.learned_at < max_age:
+            return
+        
+        web_page_service = WebPageService(session)
+        learner = TemplateLearner()
+        for web_page in await web_page_service.find_sample_by_channel(channel.normalized_url_hash, sample_size):
+            web_page_content = await web_page_service.get_content(web_page, ("content",))
+            if web_page_content and web_page_content.content:
+                learner.add_page(web_page_content.content.decode("utf-8"))
+                
+        template = learner.build()
+        if template is None:
+            logger.info(f"Not enough pages to learn a template for channel {channel.normalized_url}")
+            return
+        stored_template = ChannelTemplate.from_block_hashes(existing_template.block_hashes) if existing_template else None
+        if stored_template is not None and not stored_template.differs_materially(template):
+            # the boilerplate barely moved, the template_id and the signatures computed with it stay valid
+            logger.info(f"Keeping the template of channel {channel.normalized_url}, the relearned one differs in a few blocks only")
+            template = stored_template
+        report = learner.report(template)
+        logger.info(f"Learned template for channel {channel.normalized_url}: {report.template_block_count} blocks from {report.page_count} pages, "
+                    f"tokens {report.tokens_before} -> {report.tokens_after} ({report.token_reduction:.1%} reduction)")
+        await web_page_channel_template_service.upsert(WebPageChannelTemplate(
+            channel_normalized_url_hash=channel.normalized_url_hash,
+            block_hashes=sorted(template.block_hashes),
+            page_count=report.page_count,
+            tokens_before=report.tokens_before,
+            tokens_after=report.tokens_after,
+            learned_at=datetime.now(),
+        ))
+        
+
+async def learn_channel_templates(channel_url: str|None = None)->None:
+    async for session in Database.get_session():
+        web_page_channel_service = WebPageChannelService(session)
+        task_manager = ParallelTaskManager[None](max_concurrent_tasks=5)
+        
+        if channel_url:
+            channel = await web_page_channel_service.find_by_url(channel_url)
+            if channel:
+                task_manager.submit_task(learn_channel_template(channel))
+            else:
+                logger.warning(f"Channel with URL {channel_url} not found")
+        else:
+            for channel in await web_page_channel_service.find_all():
+                task_manager.submit_task(learn_channel_template(channel))            
+                
+        await task_manager.wait_all()        
+
+async def train_channel_dictionary(channel: WebPageChannel, sample_size: int = 200, min_sample_size: int = 20, max_age: timedelta = timedelta(days=30))->None:
+    async for session in Database.get_session():
+        web_page_channel_dictionary_service = WebPageChannelDictionaryService(session)
+        existing_dictionary = await web_page_channel_dictionary_service.find_by_channel(channel.normalized_url_hash)
+        # rejected trainings count too, a channel whose pages do not compress better is not retrained every run
+        last_attempted_at = existing_dictionary and (existing_dictionary.attempted_at or existing_dictionary.trained_at)
+        if last_attempted_at and datetime.now() - last_attempted_at < max_age:
+            return
+        attempted_at = datetime.now()
+
+        web_page_service = WebPageService(session)
+        samples: list[bytes] = []
+        for web_page in await web_page_service.find_sample_by_channel(channel.normalized_url_hash, sample_size):
+            web_page_content = await web_page_service.get_content(web_page, ("content",))
+            if web_page_content and web_page_content.content:
+                samples.append(web_page_content.content)
+        if len(samples) < min_sample_size:
+            logger.info(f"Not enough pages to train a dictionary for channel {channel.normalized_url}")
+            await web_page_channel_dictionary_service.record_attempt(channel.normalized_url_hash, attempted_at)
+            return
+
+        # every fifth page is held out to measure the dictionary on pages it was not trained on
+        held_out_samples = samples[::5]
+        training_samples = [sample for i, sample in enumerate(samples) if i % 5]
+        # stored pages name the version they were compressed with, a retrained dictionary is a new version
+        version = existing_dictionary.version + 1 if existing_dictionary else 1
+        try:
+            dictionary = await asyncio.to_thread(train_dictionary, f"{channel.normalized_url_hash}-{version}", training_samples)
+        except zstandard.ZstdError as e:
+            logger.warning(f"Failed to train a dictionary for channel {channel.normalized_url}: {e}")
+            await web_page_channel_dictionary_service.record_attempt(channel.normalized_url_hash, attempted_at)
+            return
+        raw_size = sum(len(sample) for sample in held_out_samples)
+        plain_size = compressed_size(held_out_samples)
+        dictionary_size = compressed_size(held_out_samples, dictionary)
+        logger.info(f"Trained dictionary {dictionary.name} for channel {channel.normalized_url} on {len(training_samples)} pages, "
+                    f"compression ratio {raw_size / plain_size:.2f} -> {raw_size / dictionary_size:.2f}")
+        if dictionary_size >= plain_size:
+            await web_page_channel_dictionary_service.record_attempt(channel.normalized_url_hash, attempted_at)
+            return
+        await web_page_channel_dictionary_service.upsert(WebPageChannelDictionary(
+            channel_normalized_url_hash=channel.normalized_url_hash,
+            version=version,
+            name=dictionary.name,
+            size_bytes=len(dictionary.data),
+            sample_count=len(training_samples),
+            plain_compression_ratio=raw_size / plain_size,
+            compression_ratio=raw_size / dictionary_size,
+            trained_at=datetime.now(),
+            attempted_at=attempted_at,
+        ), dictionary)
+
+async def train_channel_dictionaries(channel_url: str|None = None)->None:
+    async for session in Database.get_session():
+        web_page_channel_service = WebPageChannelService(session)
+        task_manager = ParallelTaskManager[None](max_concurrent_tasks=5)
+        
+        if channel_url:
+            channel = await web_page_channel_service.find_by_url(channel_url)
+            if channel:
+                task_manager.submit_task(train_channel_dictionary(channel))
+            else:
+                logger.warning(f"Channel with URL {channel_url} not found")
+        else:
+            for channel in await web_page_channel_service.find_all():
+                task_manager.submit_task(train_channel_dictionary(channel))
+                
+        await task_manager.wait_all()
+        
+    
 def cli():
     return asyncio.run(main())
 
@@ -11,6 +11,7 @@ async def main() -> None:
     await Jobs.initialize()
     summarizer_service = SummarizerService(RzConfig.instance().ollama_model)
     await summarizer_service.summarize_web_pages()
+    await Jobs.shutdown()
     
 def cli()-> Any:
     return asyncio.run(main())
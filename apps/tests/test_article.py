@@ -0,0 +1,41 @@
+from lxml import html as lxml_html
+from pysrc.scraper.article import extract_article, link_density
+from pysrc.scraper.processing import process_page
+
+PARAGRAPH = "The committee met on Tuesday, and after a long debate, it approved the new policy for public transport in the city."
+
+def make_page(paragraphs: int) -> str:
+    body = "".join(f"<p>{PARAGRAPH}</p>" for _ in range(paragraphs))
+    return f"""
+    <html>
+        <head><title>News</title><script>var tracking = true;</script></head>
+        <body>
+            <div id="header"><a href="/">Home</a> <a href="/about">About</a></div>
+            <nav><ul><li><a href="/sports">Sports</a></li><li><a href="/politics">Politics</a></li></ul></nav>
+            <div class="content"><article><h1>Transport policy approved</h1>{body}</article></div>
+            <div class="sidebar"><p>Subscribe to our newsletter, get offers, and more, every single week for free.</p></div>
+            <div id="comments"><p>Great article, thanks, I really enjoyed reading it today, well done.</p></div>
+            <footer>Copyright News Inc.</footer>
+        </body>
+    </html>
+    """
+
+def test_extract_article():
+    article = extract_article(make_page(3))
+    assert article == "\n".join(["Transport policy approved"] + [PARAGRAPH] * 3)
+
+def test_extract_article_without_content():
+    assert extract_article("") is None
+    assert extract_article("<html><body><p>Too short</p></body></html>") is None
+    assert extract_article(make_page(1), min_length=1000) is None
+
+def test_link_density():
+    element = lxml_html.fragment_fromstring("<div>Read more: <a href='/a'>this</a> and <a href='/b'>that</a></div>")
+    assert link_density(element) == len("thisthat") / len("Read more: this and that")
+    assert link_density(lxml_html.fragment_fromstring("<div></div>")) == 0.0
+
+def test_process_page_extracts_article():
+    processed_page = process_page(make_page(3).encode("utf-8"))
+    assert processed_page.article_text is not None
+    assert processed_page.article_text.startswith("Transport policy approved")
+    assert "default" in processed_page.min_hashes
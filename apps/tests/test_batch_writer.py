@@ -0,0 +1,75 @@
+import asyncio
+import pytest
+from pysrc.utils.batch_writer import BatchWriter
+
+class RecordingFlush:
+    def __init__(self, delay: float = 0.0, fail: bool = False) -> None:
+        self.batches: list[list[int]] = []
+        self.delay = delay
+        self.fail = fail
+
+    async def __call__(self, batch: list[int]) -> None:
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("flush failed")
+        self.batches.append(batch)
+
+@pytest.mark.asyncio
+async def test_flushes_full_batches_in_background():
+    flush = RecordingFlush()
+    writer = BatchWriter[int](flush, max_batch_size=3, max_delay_seconds=60)
+    for item in range(7):
+        await writer.put(item)
+    # a full batch wakes the writer up long before the delay, it drains the whole queue
+    await asyncio.sleep(0.01)
+    assert flush.batches == [[0, 1, 2], [3, 4, 5], [6]]
+    assert writer.queue_depth == 0
+
+    await writer.close()
+    assert flush.batches == [[0, 1, 2], [3, 4, 5], [6]]
+    assert writer.stats.flushed_count == 7
+    assert writer.stats.flush_count == 3
+
+@pytest.mark.asyncio
+async def test_flushes_after_delay():
+    flush = RecordingFlush()
+    writer = BatchWriter[int](flush, max_batch_size=100, max_delay_seconds=0.05)
+    await writer.put(1)
+    await writer.put(2)
+    assert flush.batches == []
+    await asyncio.sleep(0.2)
+    assert flush.batches == [[1, 2]]
+    await writer.close()
+    assert flush.batches == [[1, 2]]
+
+@pytest.mark.asyncio
+async def test_close_waits_for_running_flush():
+    flush = RecordingFlush(delay=0.05)
+    writer = BatchWriter[int](flush, max_batch_size=2, max_delay_seconds=60)
+    for item in range(5):
+        await writer.put(item)
+    await asyncio.sleep(0.01)
+    await writer.close()
+    assert sorted(item for batch in flush.batches for item in batch) == list(range(5))
+    assert writer.queue_depth == 0
+    with pytest.raises(RuntimeError):
+        await writer.put(6)
+
+@pytest.mark.asyncio
+async def test_backpressure_at_max_queue_size():
+    flush = RecordingFlush(delay=0.05)
+    writer = BatchWriter[int](flush, max_batch_size=2, max_delay_seconds=60, max_queue_size=4)
+    for item in range(4):
+        await writer.put(item)
+    assert writer.queue_depth < 4
+    assert writer.stats.max_queue_depth == 4
+    await writer.close()
+
+@pytest.mark.asyncio
+async def test_failed_flush_is_counted():
+    writer = BatchWriter[int](RecordingFlush(fail=True), max_batch_size=10, max_delay_seconds=60)
+    await writer.put(1)
+    await writer.close()
+    assert writer.stats.failed_count == 1
+    assert writer.stats.flushed_count == 0
+    assert writer.stats.average_flush_seconds > 0
@@ -0,0 +1,78 @@
+from pysrc.scraper.boilerplate import TemplateLearner, ChannelTemplate, extract_blocks, strip_template, block_hash
+
+def make_page(article: str) -> str:
+    return f"""
+    <html>
+        <head><title>Channel</title><script>var x = 1;</script></head>
+        <body>
+            <nav><a href="/">Home</a> <a href="/news">News</a></nav>
+            <div><p>{article}</p></div>
+            <footer>Copyright Channel Inc. All rights reserved.</footer>
+        </body>
+    </html>
+    """
+
+ARTICLES = [
+    "Scientists discover a new species of frog in the rainforest",
+    "Local team wins the championship after a dramatic final",
+    "Central bank keeps interest rates unchanged this quarter",
+    "New bridge opens to traffic after three years of construction",
+    "City council approves budget for public libraries",
+    "Researchers publish results of a decade long climate study",
+]
+
+def test_extract_blocks():
+    assert extract_blocks(make_page("Hello world")) == [
+        "Channel",
+        "Home News",
+        "Hello world",
+        "Copyright Channel Inc. All rights reserved.",
+    ]
+    assert extract_blocks("") == []
+
+def test_learn_and_strip_template():
+    learner = TemplateLearner()
+    for article in ARTICLES:
+        learner.add_page(make_page(article))
+    template = learner.build()
+    assert template is not None
+    assert template.block_hashes == frozenset([
+        block_hash("Channel"),
+        block_hash("Home News"),
+        block_hash("Copyright Channel Inc. All rights reserved."),
+    ])
+    assert strip_template(make_page("Brand new article"), template) == "Brand new article"
+    assert strip_template(make_page("Brand new article"), None) == "Channel\nHome News\nBrand new article\nCopyright Channel Inc. All rights reserved."
+
+def test_learner_needs_min_pages():
+    learner = TemplateLearner(min_pages=5)
+    for article in ARTICLES[:4]:
+        learner.add_page(make_page(article))
+    assert learner.build() is None
+
+def test_template_report():
+    learner = TemplateLearner()
+    for article in ARTICLES:
+        learner.add_page(make_page(article))
+    template = learner.build()
+    assert template is not None
+    report = learner.report(template)
+    assert report.page_count == len(ARTICLES)
+    assert report.template_block_count == 3
+    assert report.tokens_after == sum(len(article.split()) for article in ARTICLES)
+    assert report.tokens_before == report.tokens_after + len(ARTICLES) * 9
+    assert 0.0 < report.token_reduction < 1.0
+
+def test_template_id_is_stable():
+    template = ChannelTemplate.from_block_hashes(["b", "a", "c"])
+    assert template.template_id == ChannelTemplate.from_block_hashes(["c", "b", "a"]).template_id
+    assert template.template_id != ChannelTemplate.from_block_hashes(["a", "b"]).template_id
+    assert ChannelTemplate.from_block_hashes(None).block_hashes == frozenset()
+
+def test_relearned_template_differs_materially():
+    template = ChannelTemplate.from_block_hashes([str(i) for i in range(20)])
+    # one menu entry renamed
+    assert not template.differs_materially(ChannelTemplate.from_block_hashes([str(i) for i in range(1, 21)]))
+    # a redesign
+    assert template.differs_materially(ChannelTemplate.from_block_hashes([str(i) for i in range(10, 30)]))
+    assert not ChannelTemplate.from_block_hashes([]).differs_materially(ChannelTemplate.from_block_hashes([]))
@@ -0,0 +1,100 @@
+import asyncio
+import zlib
+import json
+from datetime import datetime
+import numpy as np
+import pytest
+from pyminiscraper.model import ScrapeUrlMetadata, ScraperUrl, ScraperUrlType
+from pysrc.scraper.checkpoint import CrawlCheckpoint, CrawlCheckpointer, DomainCheckpoint, decode_checkpoint, encode_checkpoint
+from pysrc.scraper.politeness import DomainThrottle
+
+def make_checkpoint(pending_count: int = 3, visited_count: int = 5) -> CrawlCheckpoint:
+    return CrawlCheckpoint(
+        pending_urls=[ScraperUrl(f"https://a.com/{i}", max_depth=2) for i in range(pending_count)],
+        visited_url_keys=np.arange(visited_count, dtype=np.int64) - 2**62,
+        requested_urls_count=10,
+        success_urls_count=8,
+        error_urls_count=1,
+        skipped_urls_count=4,
+        domains={"a.com": DomainCheckpoint(4, 0.5, 0.12)},
+        high_water_marks={"https://a.com/sitemap.xml": "2024-02-10T00:00:00"},
+    )
+
+def test_round_trip():
+    checkpoint = make_checkpoint()
+    checkpoint.pending_urls.append(ScraperUrl("https://a.com/feed", max_depth=1, type=ScraperUrlType.FEED, high_priority=True,
+                                              metadata=ScrapeUrlMetadata("Title", None, datetime(2024, 1, 2, 3, 4), "https://a.com/i.png")))
+
+    decoded = decode_checkpoint(encode_checkpoint(checkpoint, max_pending_urls=100, max_visited_urls=100))
+
+    assert [scraper_url.normalized_url for scraper_url in decoded.pending_urls] == [scraper_url.normalized_url for scraper_url in checkpoint.pending_urls]
+    feed = decoded.pending_urls[-1]
+    assert (feed.type, feed.max_depth, feed.high_priority) == (ScraperUrlType.FEED, 1, True)
+    assert feed.metadata is not None and (feed.metadata.title, feed.metadata.published_at) == ("Title", datetime(2024, 1, 2, 3, 4))
+    assert np.array_equal(decoded.visited_url_keys, checkpoint.visited_url_keys)
+    assert (decoded.requested_urls_count, decoded.success_urls_count, decoded.error_urls_count, decoded.skipped_urls_count) == (10, 8, 1, 4)
+    assert decoded.domains == checkpoint.domains
+    assert decoded.high_water_marks == checkpoint.high_water_marks
+    assert decoded.dropped_urls_count == 0
+
+def test_size_is_bounded():
+    checkpoint = make_checkpoint(pending_count=10_000, visited_count=100_000)
+
+    data = encode_checkpoint(checkpoint, max_pending_urls=1_000, max_visited_urls=10_000)
+    decoded = decode_checkpoint(data)
+
+    # the next urls to pop and the latest visited urls are kept
+    assert [scraper_url.normalized_url for scraper_url in decoded.pending_urls] == [f"https://a.com/{i}" for i in range(1_000)]
+    assert np.array_equal(decoded.visited_url_keys, checkpoint.visited_url_keys[-10_000:])
+    assert decoded.dropped_urls_count == 9_000 + 90_000
+    assert len(data) < len(encode_checkpoint(checkpoint, max_pending_urls=10_000, max_visited_urls=100_000)) / 5
+
+def test_unsupported_version():
+    data = zlib.compress(json.dumps({"version": 0}).encode())
+    with pytest.raises(ValueError):
+        decode_checkpoint(data)
+
+def test_restored_throttle_stays_within_bounds():
+    throttle = DomainThrottle("a.com", max_concurrency=8, min_delay_seconds=0.5, max_delay_seconds=10)
+    throttle.restore(20, 0.1, 0.2)
+    assert (throttle.concurrency, throttle.delay_seconds, throttle.average_latency_seconds) == (8, 0.5, 0.2)
+
+class FakeCrawl:
+    def __init__(self) -> None:
+        self.requested_urls_count = 0
+        self.written: list[CrawlCheckpoint] = []
+
+    async def take_checkpoint(self) -> CrawlCheckpoint:
+        return CrawlCheckpoint(requested_urls_count=self.requested_urls_count)
+
+    async def write_checkpoint(self, data: bytes, checkpoint: CrawlCheckpoint) -> None:
+        self.written.append(decode_checkpoint(data))
+
+@pytest.mark.asyncio
+async def test_checkpointer_writes_only_after_progress():
+    crawl = FakeCrawl()
+    checkpointer = CrawlCheckpointer(crawl.take_checkpoint, crawl.write_checkpoint, interval_seconds=0.02)
+    checkpointer.start()
+    await asyncio.sleep(0.1)
+    assert len(crawl.written) == 1
+
+    crawl.requested_urls_count = 5
+    await asyncio.sleep(0.05)
+    await checkpointer.close()
+
+    assert [checkpoint.requested_urls_count for checkpoint in crawl.written] == [0, 5]
+    assert checkpointer.stats.written_count == 2
+
+@pytest.mark.asyncio
+async def test_checkpointer_survives_failed_writes():
+    async def fail(data: bytes, checkpoint: CrawlCheckpoint) -> None:
+        raise RuntimeError("database gone")
+
+    crawl = FakeCrawl()
+    checkpointer = CrawlCheckpointer(crawl.take_checkpoint, fail, interval_seconds=60)
+    await checkpointer.checkpoint()
+    await checkpointer.checkpoint()
+
+    # a failed write is retried by the next checkpoint
+    assert checkpointer.stats.failed_count == 2
+    assert checkpointer.stats.written_count == 0
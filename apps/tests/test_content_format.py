@@ -0,0 +1,148 @@
+import pickle
+import struct
+from dataclasses import astuple
+from datetime import datetime
+import pytest
+from pysrc.db.content_format import MAGIC, ContentDictionaryCache, ContentReader, compressed_size, encode_fields, train_dictionary
+from pysrc.db.web_page import LazyWebPageContent, WebPageContent, WebPageContentNotLoadedException
+
+def make_content(article_text: str | None = "Article body") -> WebPageContent:
+    return WebPageContent(
+        url="https://a.com/news/1",
+        normalized_url_hash="hash",
+        normalized_url="https://a.com/news/1",
+        status_code=200,
+        headers={"content-type": "text/html; charset=utf-8", "etag": "\"abc\""},
+        content=("<html><body>" + "<p>Paragraph ü</p>" * 500 + "</body></html>").encode("utf-8"),
+        content_type="text/html",
+        content_charset="utf-8",
+        requested_at=datetime(2024, 3, 1, 12, 30),
+        metadata_title="Title",
+        metadata_description=None,
+        metadata_image_url="https://a.com/i.png",
+        metadata_published_at=datetime(2024, 2, 29),
+        canonical_url=None,
+        outgoing_urls=["https://a.com/news/2", "https://a.com/news/3"],
+        visible_text="Paragraph ü\n" * 500,
+        sitemap_urls=[],
+        feed_urls=None,
+        robots_content=None,
+        text_chunks=["Paragraph ü"] * 10,
+        article_text=article_text,
+    )
+
+def test_round_trip_is_smaller_than_pickle():
+    web_page_content = make_content()
+    data = web_page_content.to_bytes()
+
+    assert data.startswith(MAGIC)
+    assert WebPageContent.from_bytes(data) == web_page_content
+    assert len(data) < len(pickle.dumps(web_page_content)) / 5
+
+def test_none_sections_stay_none():
+    web_page_content = make_content(article_text=None)
+    assert WebPageContent.from_bytes(web_page_content.to_bytes()) == web_page_content
+
+def test_legacy_pickle_is_read():
+    web_page_content = make_content()
+    assert WebPageContent.from_bytes(pickle.dumps(web_page_content)) == web_page_content
+
+def test_selected_fields_skip_other_sections():
+    web_page_content = make_content()
+
+    decoded = WebPageContent.from_bytes(web_page_content.to_bytes(), ("visible_text",))
+
+    assert decoded.visible_text == web_page_content.visible_text
+    assert (decoded.metadata_title, decoded.requested_at) == ("Title", datetime(2024, 3, 1, 12, 30))
+    assert decoded.content is None and decoded.text_chunks is None
+
+def test_fields_of_other_versions_are_tolerated():
+    # a newer writer's extra field is skipped, a field an older writer did not have is None
+    values = {"url": "https://a.com", "status_code": 200, "visible_text": "text", "future_field": 1}
+
+    decoded = WebPageContent.from_bytes(encode_fields(values))
+
+    assert (decoded.url, decoded.visible_text, decoded.article_text) == ("https://a.com", "text", None)
+
+def test_unsupported_version():
+    data = bytearray(make_content().to_bytes())
+    struct.pack_into(">B", data, len(MAGIC), 99)
+    with pytest.raises(ValueError):
+        ContentReader(bytes(data))
+
+@pytest.mark.asyncio
+async def test_external_content_is_loaded_on_demand():
+    web_page_content = make_content()
+    data = web_page_content.to_bytes(external_content=True)
+    raw_content = web_page_content.content_to_bytes()
+    assert raw_content is not None
+    downloads: list[bytes] = []
+
+    async def load_external_content() -> bytes | None:
+        downloads.append(raw_content)
+        return WebPageContent.content_from_bytes(raw_content)
+
+    lazy = WebPageContent.from_bytes(data, None, load_external_content)
+
+    assert isinstance(lazy, LazyWebPageContent)
+    assert lazy.visible_text == web_page_content.visible_text
+    assert ContentReader(data).section_sizes()["content"] == (0, len(web_page_content.content or b""))
+    with pytest.raises(WebPageContentNotLoadedException):
+        lazy.content
+    assert lazy.content_size == len(web_page_content.content or b"")
+    assert not downloads
+    assert await lazy.load_content() == web_page_content.content
+    assert await lazy.load_content() == web_page_content.content
+    assert len(downloads) == 1
+    assert astuple(lazy) == astuple(web_page_content)
+
+@pytest.mark.asyncio
+async def test_inline_content_not_asked_for_is_decoded_on_demand():
+    web_page_content = make_content()
+
+    async def load_external_content() -> bytes | None:
+        raise AssertionError("the content is in the blob")
+
+    lazy = WebPageContent.from_bytes(web_page_content.to_bytes(), ("visible_text",), load_external_content)
+
+    assert isinstance(lazy, LazyWebPageContent)
+    assert lazy.content_size == web_page_content.content_size
+    assert await lazy.load_content() == web_page_content.content
+    # a content without a body and a legacy pickle are never lazy
+    assert await WebPageContent.from_bytes(pickle.dumps(web_page_content), (), load_external_content).load_content() == web_page_content.content
+
+def channel_pages(count: int) -> list[bytes]:
+    # one template, the articles differ
+    template = "".join(f"<li class='menu-{i}'><a href='/section/{i * 7919 % 1000}'>Section {i}</a></li>" for i in range(200))
+    return [f"<html><nav>{template}</nav><article>Story {i} {' '.join(str(i * j % 997) for j in range(100))}</article><footer>{template}</footer></html>".encode()
+            for i in range(count)]
+
+def test_dictionary_round_trip():
+    pages = channel_pages(100)
+    dictionary = train_dictionary("channel-1", pages[20:])
+    web_page_content = make_content()
+    web_page_content.content = pages[0]
+
+    data = web_page_content.content_to_bytes(dictionary)
+    assert data is not None
+    reader = ContentReader(data)
+
+    assert reader.dictionary_names() == {"channel-1"}
+    with pytest.raises(ValueError):
+        reader.field("content")
+    assert WebPageContent.content_from_bytes(data, [dictionary]) == pages[0]
+    assert compressed_size(pages[:20], dictionary) < compressed_size(pages[:20]) / 2
+
+def test_dictionary_cache_evicts_least_recently_used():
+    pages = channel_pages(50)
+    cache = ContentDictionaryCache(max_count=2)
+    dictionaries = [train_dictionary(f"channel-{i}", pages, max_size=4096) for i in range(3)]
+    cache.put(dictionaries[0])
+    cache.put(dictionaries[1])
+    assert cache.get("channel-0") is dictionaries[0]
+
+    cache.put(dictionaries[2])
+
+    assert cache.get("channel-1") is None
+    assert cache.get("channel-0") is dictionaries[0]
+    assert cache.get("channel-2") is dictionaries[2]
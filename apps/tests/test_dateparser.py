@@ -0,0 +1,42 @@
+from datetime import datetime
+import pytest
+from pysrc.summarizer.dateparser import extract_date_from_url, extract_dates_from_urls
+
+NOW = datetime(2025, 6, 1)
+
+@pytest.mark.parametrize("url, expected", [
+    ("https://example.com/2024/03/05/story", datetime(2024, 3, 5)),
+    ("https://example.com/2021-review/2024/03/05/story", datetime(2024, 3, 5)),
+    ("https://example.com/news/20240305-story", datetime(2024, 3, 5)),
+    ("https://example.com/news/2019-12-31-story", datetime(2019, 12, 31)),
+    ("https://example.com/2024/mar/05/story", datetime(2024, 3, 5)),
+    ("https://example.com/news/05-march-2024", datetime(2024, 3, 5)),
+    ("https://example.com/news/march-5th-2024", datetime(2024, 3, 5)),
+    ("https://example.com/news/Sept-15-2023", datetime(2023, 9, 15)),
+    # future and impossible dates
+    ("https://example.com/2031/01/01/story", None),
+    ("https://example.com/2024/02/30/story", None),
+    # numbers that are not dates
+    ("https://example.com/item/1234202403051234", None),
+    ("https://example.com/2024/03/story", None),
+    ("https://example.com/marching-5-bands", None),
+])
+def test_extract_date_from_url(url: str, expected: datetime | None) -> None:
+    assert extract_date_from_url(url, NOW) == expected
+
+def test_extract_dates_from_urls_matches_single() -> None:
+    urls = [
+        "https://example.com/2024/03/05/story",
+        "",
+        "https://example.com/no-date",
+        "https://example.com/2024/02/30/then-2024-02-28",
+        "https://example.com/news/05-march-2024",
+        "https://example.com/2023/12/31",
+    ]
+    assert extract_dates_from_urls(urls, NOW) == [extract_date_from_url(url, NOW) for url in urls]
+    assert extract_dates_from_urls([], NOW) == []
+
+def test_extract_dates_from_urls_with_newlines() -> None:
+    urls = ["https://example.com/a\n2024/03/05", "https://example.com/İstanbul", "https://example.com/2023/12/31"]
+    assert extract_dates_from_urls(urls, NOW) == [datetime(2024, 3, 5), None, datetime(2023, 12, 31)]
+    assert extract_dates_from_urls(urls[1:], NOW) == [None, datetime(2023, 12, 31)]
@@ -0,0 +1,52 @@
+import os
+from pysrc.dfs.cache import DiskCache
+
+def cached_files(directory: str) -> list[str]:
+    return [name for _, _, names in os.walk(directory) for name in names]
+
+def test_generations_are_separate_entries(tmp_path):
+    cache = DiskCache(str(tmp_path), max_bytes=1_000_000)
+    cache.put("prod_web_pages_content", "page", 1, b"first")
+    cache.put("prod_web_pages_content", "page", 2, b"second")
+
+    assert cache.get("prod_web_pages_content", "page", 1) == b"first"
+    assert cache.get("prod_web_pages_content", "page", 2) == b"second"
+    assert cache.get("prod_web_pages_content", "page", 3) is None
+    assert cache.get("prod_web_images", "page", 1) is None
+    assert (cache.stats.hits, cache.stats.misses, cache.stats.hit_bytes) == (2, 2, 11)
+
+def test_writes_leave_no_temporary_files(tmp_path):
+    cache = DiskCache(str(tmp_path), max_bytes=1_000_000)
+    cache.put("bucket", "object", 1, b"content")
+    cache.put("bucket", "object", 1, b"content")
+
+    assert len(cached_files(str(tmp_path))) == 1
+    assert cache.stats.written_bytes == 14
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = DiskCache(str(tmp_path), max_bytes=1000)
+    for i in range(4):
+        cache.put("bucket", f"object{i}", 1, bytes(200))
+        os.utime(cache._path("bucket", f"object{i}", 1), (i, i))
+    # object0 was read last, object1 is now the least recently used
+    assert cache.get("bucket", "object0", 1) is not None
+
+    cache.put("bucket", "object4", 1, bytes(300))
+
+    assert cache.get("bucket", "object1", 1) is None
+    assert all(cache.get("bucket", f"object{i}", 1) is not None for i in (0, 2, 3, 4))
+    assert cache.stats.evicted_count == 1
+    assert sum(os.path.getsize(os.path.join(root, name)) for root, _, names in os.walk(str(tmp_path)) for name in names) <= 1000
+
+def test_shared_directory_is_seen_by_other_processes(tmp_path):
+    writer = DiskCache(str(tmp_path), max_bytes=1_000_000)
+    writer.put("bucket", "object", 7, b"shared")
+
+    # another container on the node mounts the same directory
+    reader = DiskCache(str(tmp_path), max_bytes=1_000_000)
+    assert reader.get("bucket", "object", 7) == b"shared"
+
+def test_oversized_objects_are_not_cached(tmp_path):
+    cache = DiskCache(str(tmp_path), max_bytes=10)
+    cache.put("bucket", "object", 1, bytes(11))
+    assert cache.get("bucket", "object", 1) is None
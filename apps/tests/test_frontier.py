@@ -0,0 +1,164 @@
+import asyncio
+import pytest
+from pyminiscraper.model import ScraperUrl
+from pysrc.scraper.frontier import CrawlFrontier
+
+class FakeScraper:
+    """Stands in for RzScraper, every url takes latency seconds and may queue follow up urls."""
+
+    def __init__(self, name: str, urls: list[str], latency: float = 0.0, links: dict[str, list[str]] | None = None,
+                 fail_on: str | None = None, stop_after_seeds: bool = False, log: list[str] | None = None,
+                 max_requested_urls: int | None = None) -> None:
+        self.name = name
+        self.url_queue = None
+        self.seed_urls = urls
+        self.latency = latency
+        self.links = links or {}
+        self.fail_on = fail_on
+        self.stop_after_seeds = stop_after_seeds
+        self.log = log if log is not None else []
+        self.max_requested_urls = max_requested_urls
+        self.queued_count = 0
+        self.requested_count = 0
+        self.done_count = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.finished = False
+
+    async def _queue(self, url: str) -> None:
+        self.queued_count += 1
+        await self.url_queue.appendleft(ScraperUrl(f"https://{self.name}.com/{url}"))
+
+    async def start(self) -> None:
+        for url in self.seed_urls:
+            await self._queue(url)
+        if self.stop_after_seeds:
+            # how pyminiscraper's stop() ends a scraper
+            await self.url_queue.appendright(ScraperUrl.create_terminal())
+
+    async def scrape_url(self, scraper_url: ScraperUrl, looper_name: str) -> None:
+        url = scraper_url.normalized_url.rsplit("/", 1)[-1]
+        self.requested_count += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.latency)
+            self.log.append(f"{self.name}/{url}")
+            if url == self.fail_on:
+                raise RuntimeError("callback failed")
+            for link in self.links.get(url, []):
+                await self._queue(link)
+        finally:
+            self.in_flight -= 1
+            self.done_count += 1
+
+    def is_finished(self) -> bool:
+        if self.max_requested_urls is not None and self.requested_count >= self.max_requested_urls:
+            return True
+        return self.done_count >= self.queued_count
+
+    async def finish(self) -> int:
+        self.finished = True
+        return self.done_count
+
+@pytest.mark.asyncio
+async def test_channels_take_turns():
+    log: list[str] = []
+    frontier = CrawlFrontier(max_workers=1, max_channel_workers=1)
+    frontier.add("big", FakeScraper("big", [str(i) for i in range(20)], log=log))
+    frontier.add("small", FakeScraper("small", ["a", "b"], log=log))
+
+    results = await frontier.run()
+
+    assert results == {"big": 20, "small": 2}
+    # the small channel is not stuck behind the big one's queue
+    assert log[:4] == ["big/0", "small/a", "big/1", "small/b"]
+
+@pytest.mark.asyncio
+async def test_follows_queued_links_and_caps_channel_workers():
+    scraper = FakeScraper("site", ["root"], latency=0.01, links={"root": [str(i) for i in range(10)]})
+    other = FakeScraper("other", [str(i) for i in range(10)], latency=0.01)
+    frontier = CrawlFrontier(max_workers=8, max_channel_workers=3)
+    frontier.add("site", scraper)
+    frontier.add("other", other)
+
+    results = await frontier.run()
+
+    assert results == {"site": 11, "other": 10}
+    assert scraper.max_in_flight == 3
+    assert frontier.channel_stats["site"].scheduled_urls_count == 11
+    assert frontier.channel_stats["site"].max_in_flight == 3
+
+@pytest.mark.asyncio
+async def test_shared_workers_overlap_channels():
+    scrapers = [FakeScraper(f"channel{i}", [str(j) for j in range(4)], latency=0.05) for i in range(5)]
+    frontier = CrawlFrontier(max_workers=20, max_channel_workers=4)
+    for scraper in scrapers:
+        frontier.add(scraper.name, scraper)
+
+    started_at = asyncio.get_running_loop().time()
+    await frontier.run()
+
+    # 20 urls of 50 ms on 20 workers take one round trip, not one per url
+    assert asyncio.get_running_loop().time() - started_at < 0.2
+
+@pytest.mark.asyncio
+async def test_failed_channel_does_not_stop_the_others():
+    failing = FakeScraper("failing", ["a", "b", "c"], fail_on="c")
+    healthy = FakeScraper("healthy", ["a", "b", "c"])
+    frontier = CrawlFrontier(max_workers=1, max_channel_workers=1)
+    frontier.add("failing", failing)
+    frontier.add("healthy", healthy)
+
+    results = await frontier.run()
+
+    assert isinstance(results["failing"], RuntimeError)
+    assert not failing.finished
+    assert results["healthy"] == 3
+
+@pytest.mark.asyncio
+async def test_terminal_url_stops_only_its_channel():
+    stopping = FakeScraper("stopping", [str(i) for i in range(5)], stop_after_seeds=True)
+    other = FakeScraper("other", [str(i) for i in range(5)])
+    frontier = CrawlFrontier(max_workers=1, max_channel_workers=1)
+    frontier.add("stopping", stopping)
+    frontier.add("other", other)
+
+    results = await frontier.run()
+
+    assert results == {"stopping": 0, "other": 5}
+
+@pytest.mark.asyncio
+async def test_empty_channels_finish_immediately():
+    frontier = CrawlFrontier(max_workers=4)
+    frontier.add("empty", FakeScraper("empty", []))
+
+    assert await frontier.run() == {"empty": 0}
+
+@pytest.mark.asyncio
+async def test_stop_finishes_running_crawl():
+    scraper = FakeScraper("slow", [str(i) for i in range(100)], latency=0.01)
+    frontier = CrawlFrontier(max_workers=2, max_channel_workers=2)
+    frontier.add("slow", scraper)
+
+    async def stop_soon():
+        await asyncio.sleep(0.03)
+        await frontier.stop()
+
+    results, _ = await asyncio.gather(frontier.run(), stop_soon())
+
+    assert 0 < results["slow"] < 100
+    assert scraper.finished
+
+@pytest.mark.asyncio
+async def test_request_cap_stops_channel_with_requests_in_flight():
+    capped = FakeScraper("capped", [str(i) for i in range(100)], latency=0.01, max_requested_urls=10)
+    other = FakeScraper("other", [str(i) for i in range(20)], latency=0.01)
+    frontier = CrawlFrontier(max_workers=4, max_channel_workers=4)
+    frontier.add("capped", capped)
+    frontier.add("other", other)
+
+    results = await frontier.run()
+
+    assert results == {"capped": 10, "other": 20}
+    assert capped.finished
@@ -0,0 +1,43 @@
+import io
+import pytest
+from PIL import Image
+from pysrc.scraper.image import fit_box, make_thumbnail, thumbnailed_image_width, thumbnailed_image_height
+
+def encode(image: Image.Image, format: str) -> bytes:
+    output_io = io.BytesIO()
+    image.save(output_io, format=format)
+    return output_io.getvalue()
+
+def test_fit_box():
+    assert fit_box((200, 100), (50, 50)) == (50, 0, 150, 100)
+    assert fit_box((100, 200), (50, 50)) == (0, 50, 100, 150)
+    assert fit_box((100, 100), (50, 50)) == (0, 0, 100, 100)
+
+def test_jpeg_is_decoded_in_draft_mode():
+    thumbnail = make_thumbnail(encode(Image.new("RGB", (3200, 1600), (200, 10, 10)), "JPEG"))
+    assert (thumbnail.source_width, thumbnail.source_height) == (3200, 1600)
+    # 1/8 scale still covers twice the thumbnail size
+    assert (thumbnail.decoded_width, thumbnail.decoded_height) == (400, 200)
+    assert thumbnail.decoded_bytes == 400 * 200 * 3
+    assert thumbnail.decode_seconds >= 0
+
+    image = Image.open(io.BytesIO(thumbnail.content))
+    assert image.format == "PNG"
+    assert image.size == (thumbnailed_image_width, thumbnailed_image_height)
+    red, green, blue = image.convert("RGB").getpixel((25, 25))  # type: ignore[misc]
+    assert red > 180 and green < 40 and blue < 40
+
+def test_small_jpeg_keeps_full_resolution():
+    thumbnail = make_thumbnail(encode(Image.new("RGB", (120, 80)), "JPEG"))
+    assert (thumbnail.decoded_width, thumbnail.decoded_height) == (120, 80)
+
+@pytest.mark.parametrize("mode, format", [("P", "GIF"), ("RGBA", "PNG"), ("1", "PNG"), ("L", "PNG")])
+def test_thumbnail_of_non_jpeg(mode: str, format: str):
+    thumbnail = make_thumbnail(encode(Image.new(mode, (400, 100)), format))
+    assert (thumbnail.source_width, thumbnail.source_height) == (400, 100)
+    assert Image.open(io.BytesIO(thumbnail.content)).size == (thumbnailed_image_width, thumbnailed_image_height)
+
+def test_webp_thumbnail():
+    thumbnail = make_thumbnail(encode(Image.new("RGB", (640, 480)), "JPEG"), "webp")
+    assert thumbnail.content_type == "image/webp"
+    assert Image.open(io.BytesIO(thumbnail.content)).format == "WEBP"
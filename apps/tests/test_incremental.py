@@ -0,0 +1,152 @@
+import tracemalloc
+from datetime import datetime
+from pyminiscraper.url import normalize_url, normalized_url_hash
+from pysrc.scraper.incremental import (FeedStreamParser, IncrementalFilter, SitemapStreamParser, high_water_marks_from_dict,
+                                       high_water_marks_to_dict, parse_modified_at)
+from pysrc.scraper.url_index import UrlIndex
+
+SITEMAP_NS = "http://www.sitemaps.org/schemas/sitemap/0.9"
+
+def url_hash(url: str) -> str:
+    return normalized_url_hash(normalize_url(url))
+
+def urlset(entries: list[tuple[str, str | None]]) -> bytes:
+    urls = "".join(
+        f"<url><loc>{loc}</loc>" + (f"<lastmod>{lastmod}</lastmod>" if lastmod else "") + "<priority>0.5</priority></url>"
+        for loc, lastmod in entries
+    )
+    return f'<?xml version="1.0" encoding="UTF-8"?><urlset xmlns="{SITEMAP_NS}">{urls}</urlset>'.encode()
+
+def parse_in_chunks(parser, document: bytes, chunk_size: int = 64):
+    for start in range(0, len(document), chunk_size):
+        parser.feed(document[start:start + chunk_size])
+    return parser.close()
+
+def test_parse_modified_at():
+    assert parse_modified_at("2024-03-01") == datetime(2024, 3, 1)
+    assert parse_modified_at(None) is None
+    assert parse_modified_at("not a date") is None
+    utc = parse_modified_at("2024-03-01T10:00:00Z")
+    assert utc is not None and utc.tzinfo is None
+    assert parse_modified_at("Fri, 01 Mar 2024 10:00:00 GMT") == utc
+
+def test_sitemap_parses_like_pyminiscraper():
+    sitemap = parse_in_chunks(SitemapStreamParser("https://a.com/sitemap.xml"), urlset([
+        ("https://a.com/1", "2024-01-01"),
+        ("https://a.com/2", None),
+    ]))
+    assert [(page_url.loc, page_url.lastmod, page_url.priority) for page_url in sitemap.page_urls] == [
+        ("https://a.com/1", datetime(2024, 1, 1), 0.5),
+        ("https://a.com/2", None, 0.5),
+    ]
+
+def test_sitemap_keeps_new_and_changed_pages_only():
+    url_index = UrlIndex([
+        (url_hash("https://a.com/unchanged"), datetime(2024, 2, 1), False),
+        (url_hash("https://a.com/changed"), datetime(2024, 2, 1), False),
+    ])
+    incremental_filter = IncrementalFilter(url_index)
+    sitemap = parse_in_chunks(SitemapStreamParser("https://a.com/sitemap.xml", incremental_filter), urlset([
+        ("https://a.com/unchanged", "2024-01-15"),
+        ("https://a.com/changed", "2024-02-10"),
+        ("https://a.com/new", "2024-01-01"),
+        ("https://a.com/undated", None),
+    ]))
+    assert [page_url.loc for page_url in sitemap.page_urls] == ["https://a.com/changed", "https://a.com/new", "https://a.com/undated"]
+    assert incremental_filter.stats.skipped_urls_count == 1
+    assert incremental_filter.high_water_marks == {"https://a.com/sitemap.xml": datetime(2024, 2, 10)}
+
+def test_sitemap_index_skips_children_below_high_water_mark():
+    index = (f'<sitemapindex xmlns="{SITEMAP_NS}">'
+             '<sitemap><loc>https://a.com/2023.xml</loc><lastmod>2023-12-31</lastmod></sitemap>'
+             '<sitemap><loc>https://a.com/2024.xml</loc><lastmod>2024-03-01</lastmod></sitemap>'
+             '</sitemapindex>').encode()
+    incremental_filter = IncrementalFilter(UrlIndex(), high_water_marks={
+        "https://a.com/2023.xml": datetime(2023, 12, 31),
+        "https://a.com/2024.xml": datetime(2024, 2, 1),
+    })
+    sitemap = parse_in_chunks(SitemapStreamParser("https://a.com/index.xml", incremental_filter), index)
+    assert [sitemap_url.loc for sitemap_url in sitemap.sitemap_urls] == ["https://a.com/2024.xml"]
+    assert incremental_filter.stats.skipped_sitemaps_count == 1
+
+    # the walked child is marked with the lastmod the index listed, not with its newest entry
+    parse_in_chunks(SitemapStreamParser("https://a.com/2024.xml", incremental_filter), urlset([("https://a.com/p", "2024-02-20")]))
+    assert incremental_filter.high_water_marks["https://a.com/2024.xml"] == datetime(2024, 3, 1)
+    assert incremental_filter.high_water_marks["https://a.com/2023.xml"] == datetime(2023, 12, 31)
+
+def test_failed_parse_does_not_advance_high_water_mark():
+    incremental_filter = IncrementalFilter(UrlIndex())
+    parser = SitemapStreamParser("https://a.com/sitemap.xml", incremental_filter)
+    parser.feed(urlset([("https://a.com/1", "2024-01-01")])[:-20])
+    assert incremental_filter.high_water_marks == {}
+
+def test_failed_page_keeps_previous_high_water_marks():
+    index = (f'<sitemapindex xmlns="{SITEMAP_NS}">'
+             '<sitemap><loc>https://a.com/2024.xml</loc><lastmod>2024-03-01</lastmod></sitemap>'
+             '<sitemap><loc>https://a.com/2025.xml</loc><lastmod>2025-03-01</lastmod></sitemap>'
+             '</sitemapindex>').encode()
+    incremental_filter = IncrementalFilter(UrlIndex(), high_water_marks={
+        "https://a.com/index.xml": datetime(2024, 1, 1),
+        "https://a.com/2024.xml": datetime(2024, 2, 1),
+    })
+    parse_in_chunks(SitemapStreamParser("https://a.com/index.xml", incremental_filter), index)
+    parse_in_chunks(SitemapStreamParser("https://a.com/2024.xml", incremental_filter), urlset([("https://a.com/p", "2024-02-20")]))
+    parse_in_chunks(SitemapStreamParser("https://a.com/2025.xml", incremental_filter), urlset([("https://a.com/q", "2025-02-20")]))
+
+    incremental_filter.fail(normalize_url("https://a.com/p"))
+    # the failed page is listed again by the next crawl, up to the index
+    assert incremental_filter.high_water_marks == {
+        "https://a.com/index.xml": datetime(2024, 1, 1),
+        "https://a.com/2024.xml": datetime(2024, 2, 1),
+        "https://a.com/2025.xml": datetime(2025, 3, 1),
+    }
+
+def test_high_water_marks_round_trip():
+    high_water_marks = {"https://a.com/sitemap.xml": datetime(2024, 2, 10, 8, 30)}
+    assert high_water_marks_from_dict(high_water_marks_to_dict(high_water_marks)) == high_water_marks
+    assert high_water_marks_from_dict(None) == {}
+
+def test_rss_feed():
+    rss = b"""<?xml version="1.0"?><rss version="2.0"><channel><title>News</title>
+        <item><title>Old</title><link>https://a.com/old</link><pubDate>Mon, 01 Jan 2024 10:00:00 GMT</pubDate></item>
+        <item><title>Fresh</title><link>https://a.com/fresh</link><description>Text</description>
+              <pubDate>Sat, 10 Feb 2024 10:00:00 GMT</pubDate></item>
+        </channel></rss>"""
+    url_index = UrlIndex([(url_hash("https://a.com/old"), datetime(2024, 1, 5), False)])
+    feed = parse_in_chunks(FeedStreamParser("https://a.com/rss", IncrementalFilter(url_index)), rss)
+    assert [(item.title, item.link, item.description) for item in feed.items] == [("Fresh", "https://a.com/fresh", "Text")]
+
+def test_atom_updated_marks_entry_changed():
+    atom = b"""<?xml version="1.0"?><feed xmlns="http://www.w3.org/2005/Atom"><title>News</title>
+        <entry><title>Edited</title><link rel="alternate" href="https://a.com/edited"/>
+               <published>2024-01-01T10:00:00Z</published><updated>2024-02-10T10:00:00Z</updated></entry>
+        <entry><title>Same</title><link href="https://a.com/same"/><published>2024-01-01T10:00:00Z</published></entry>
+        </feed>"""
+    url_index = UrlIndex([
+        (url_hash("https://a.com/edited"), datetime(2024, 1, 5), False),
+        (url_hash("https://a.com/same"), datetime(2024, 1, 5), False),
+    ])
+    feed = parse_in_chunks(FeedStreamParser("https://a.com/atom", IncrementalFilter(url_index)), atom)
+    assert [item.link for item in feed.items] == ["https://a.com/edited"]
+    # the metadata keeps the publication date
+    assert feed.items[0].pub_date == parse_modified_at("2024-01-01T10:00:00Z")
+
+def parse_peak_memory(entries_count: int) -> tuple[int, int]:
+    entries = [(f"https://a.com/page/{i}", "2024-01-01") for i in range(entries_count)]
+    document = urlset(entries)
+    url_index = UrlIndex([(url_hash(loc), datetime(2024, 2, 1), False) for loc, _ in entries])
+    parser = SitemapStreamParser("https://a.com/sitemap.xml", IncrementalFilter(url_index))
+
+    tracemalloc.start()
+    sitemap = parse_in_chunks(parser, document, chunk_size=16 * 1024)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert sitemap.page_urls == []
+    return len(document), peak
+
+def test_sitemap_memory_does_not_grow_with_document_size():
+    small_size, small_peak = parse_peak_memory(500)
+    large_size, large_peak = parse_peak_memory(5_000)
+    assert large_size > 9 * small_size
+    # the document is never held as a tree, unchanged entries are dropped as they are parsed
+    assert large_peak < small_peak * 1.5
@@ -0,0 +1,50 @@
+import pytest
+import numpy as np
+from pysrc.scraper.minhash import MinHasher
+from pysrc.scraper.lsh import MinHashLshIndex
+
+ARTICLE = " ".join(f"word{i} appears in the syndicated article body" for i in range(200))
+
+@pytest.fixture
+def index() -> MinHashLshIndex:
+    return MinHashLshIndex(MinHasher(num_permutations=256, seed=3), bands=32, rows=8)
+
+def signature(index: MinHashLshIndex, html: str) -> np.ndarray:
+    doc = index.min_hasher.compute_signature(html)
+    assert doc.minhash_signature is not None
+    return doc.minhash_signature
+
+def test_invalid_band_layout() -> None:
+    with pytest.raises(ValueError):
+        MinHashLshIndex(MinHasher(num_permutations=64, seed=3), bands=16, rows=8)
+
+def test_band_hashes_are_deterministic(index: MinHashLshIndex) -> None:
+    other = MinHashLshIndex(MinHasher(num_permutations=256, seed=3), bands=32, rows=8)
+    np.testing.assert_array_equal(
+        index.compute_band_hashes(signature(index, ARTICLE)),
+        other.compute_band_hashes(signature(other, ARTICLE)))
+    assert index.index_id == other.index_id
+
+def test_query_finds_near_duplicates(index: MinHashLshIndex) -> None:
+    index.add("original", signature(index, f"<p>{ARTICLE}</p>"))
+    index.add("unrelated", signature(index, "<p>" + " ".join(f"other{i} text entirely" for i in range(200)) + "</p>"))
+
+    matches = index.query(signature(index, f"<div><p>{ARTICLE}</p><p>Mirrored from example.com</p></div>"))
+    assert [key for key, _ in matches] == ["original"]
+    assert matches[0][1] >= 0.8
+
+def test_remove(index: MinHashLshIndex) -> None:
+    article_signature = signature(index, ARTICLE)
+    index.add("original", article_signature)
+    assert "original" in index
+    index.remove("original")
+    assert "original" not in index
+    assert index.query(article_signature) == []
+
+def test_missing_signatures(index: MinHashLshIndex) -> None:
+    article_signature = signature(index, ARTICLE)
+    index.add_band_hashes("stored", index.compute_band_hashes(article_signature))
+    assert index.missing_signatures(article_signature) == ["stored"]
+    assert index.query(article_signature) == []
+    index.set_signature("stored", article_signature)
+    assert index.query(article_signature) == [("stored", 1.0)]
@@ -0,0 +1,18 @@
+import re
+from sqlalchemy.dialects import postgresql
+from pysrc.db.base import Base
+from pysrc.db.migrations import MIGRATIONS
+import pysrc.db.web_page  # noqa: F401, registers the tables
+
+ADD_COLUMN = re.compile(r"ALTER TABLE (\w+) ADD COLUMN IF NOT EXISTS (\w+) (.+)")
+
+def test_added_columns_match_the_models():
+    added_columns = [ADD_COLUMN.fullmatch(statement) for statement in MIGRATIONS]
+    assert any(added_columns)
+    for match in added_columns:
+        if match is None:
+            continue
+        table_name, column_name, column_type = match.groups()
+        column = Base.metadata.tables[table_name].columns[column_name]
+        assert column.nullable
+        assert column.type.compile(dialect=postgresql.dialect()) == column_type
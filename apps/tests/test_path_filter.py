@@ -0,0 +1,38 @@
+from urllib.parse import urlparse
+from pyminiscraper.filter import PathFilter
+from pysrc.scraper.path_filter import PathPatterns, filtered_out, url_paths
+
+URLS = [
+    "https://a.com",
+    "https://a.com/",
+    "https://a.com/news/2024/story.html",
+    "https://a.com/news/tag/politics",
+    "https://a.com/sport/video/goal?autoplay=1",
+    "https://a.com/about#team",
+    "https://a.com/index.html?page=/news/x",
+    "https://a.com/prices$",
+]
+
+def test_url_paths_match_urlparse():
+    assert url_paths(URLS) == [urlparse(url).path or "/" for url in URLS]
+
+def test_url_paths_keep_one_path_per_url():
+    urls = ["a.com/news/x", "", "https://a.com/a\nhttps://b.com/b", "https://a.com/last"]
+    assert url_paths(urls) == ["a.com/news/x", "/", "/ahttps://b.com/b", "/last"]
+    include_path_patterns = ["/last"]
+    assert filtered_out(urls, include_path_patterns, []).tolist() == [True, True, True, False]
+
+def test_filtered_out_matches_path_filter():
+    include_path_patterns = ["/news/*", "/sport/", "*.html$", "/prices$"]
+    exclude_path_patterns = ["/news/tag/*", "*video*"]
+    include_path_filter = PathFilter(include_path_patterns, True)
+    exclude_path_filter = PathFilter(exclude_path_patterns, False)
+
+    assert filtered_out(URLS, include_path_patterns, exclude_path_patterns).tolist() == [
+        not include_path_filter.is_passing(url) or exclude_path_filter.is_passing(url) for url in URLS
+    ]
+
+def test_no_patterns_keep_everything():
+    assert not filtered_out(URLS, [], []).any()
+    assert PathPatterns([], default_value=False).is_passing(["/a"]).tolist() == [False]
+    assert filtered_out([], ["/news/*"], ["/tag/*"]).tolist() == []
@@ -0,0 +1,82 @@
+import asyncio
+from datetime import datetime, timezone
+import pytest
+from pysrc.scraper.politeness import DomainThrottle, DomainThrottles, parse_retry_after
+
+def test_parse_retry_after():
+    now = datetime(2025, 3, 5, 12, 0, tzinfo=timezone.utc)
+    assert parse_retry_after("120") == 120.0
+    assert parse_retry_after("Wed, 05 Mar 2025 12:01:30 GMT", now) == 90.0
+    assert parse_retry_after("Wed, 05 Mar 2025 11:00:00 GMT", now) == 0.0
+    assert parse_retry_after("soon") is None
+    assert parse_retry_after(None) is None
+
+def test_fast_host_ramps_up():
+    throttle = DomainThrottle("fast.example.com", max_concurrency=4, initial_concurrency=1, initial_delay_seconds=1.0, min_delay_seconds=0.1)
+    for _ in range(100):
+        throttle.on_response(0.05, 200, None, now=0.0)
+    assert throttle.concurrency == 4
+    assert throttle.delay_seconds == pytest.approx(0.1)
+    assert throttle.timeout_seconds == 5.0
+
+def test_throttled_host_backs_off_and_pauses():
+    throttle = DomainThrottle("fragile.example.com", initial_concurrency=4, initial_delay_seconds=1.0)
+    throttle.on_response(0.2, 429, 30.0, now=100.0)
+    assert throttle.concurrency == 2
+    assert throttle.delay_seconds == 2.0
+    assert throttle._blocked_until == 130.0
+    throttle.on_response(0.2, 503, None, now=101.0)
+    throttle.on_response(0.2, 503, None, now=102.0)
+    assert throttle.concurrency == 1
+    assert throttle.delay_seconds == 8.0
+    assert throttle.settings().throttled_count == 3
+
+def test_errors_and_slow_responses_reduce_concurrency():
+    throttle = DomainThrottle("slow.example.com", initial_concurrency=4, initial_delay_seconds=0.2)
+    throttle.on_response(0.0, None, None, now=0.0)
+    assert throttle.concurrency == 2
+    assert throttle.delay_seconds == 0.5
+    assert throttle.errors_count == 1
+
+    throttle.on_response(0.2, 200, None, now=0.0)
+    throttle.on_response(0.2, 404, None, now=0.0)
+    for _ in range(10):
+        throttle.on_response(5.0, 200, None, now=0.0)
+    assert throttle.concurrency == 1
+    assert throttle.timeout_seconds == 30.0
+
+def test_crawl_delay_is_a_floor():
+    throttle = DomainThrottle("polite.example.com", initial_delay_seconds=1.0)
+    throttle.set_crawl_delay(3)
+    assert throttle.delay_seconds == 3.0
+    for _ in range(100):
+        throttle.on_response(0.05, 200, None, now=0.0)
+    assert throttle.delay_seconds == 3.0
+
+@pytest.mark.asyncio
+async def test_acquire_limits_concurrency_and_spaces_requests():
+    throttle = DomainThrottle("example.com", max_concurrency=2, initial_concurrency=2, initial_delay_seconds=0.02)
+    active = 0
+    max_active = 0
+    started_at: list[float] = []
+
+    async def request() -> None:
+        nonlocal active, max_active
+        await throttle.acquire()
+        started_at.append(asyncio.get_running_loop().time())
+        active += 1
+        max_active = max(max_active, active)
+        await asyncio.sleep(0.05)
+        active -= 1
+        await throttle.release(0.05, 200)
+
+    await asyncio.gather(*(request() for _ in range(6)))
+    assert max_active == 2
+    assert all(later - earlier >= 0.015 for earlier, later in zip(started_at, started_at[1:]))
+    assert throttle.requests_count == 6
+
+def test_throttles_are_shared_per_host():
+    throttles = DomainThrottles(max_host_concurrency=3)
+    assert throttles.get("example.com") is throttles.get("example.com")
+    assert throttles.get("example.com") is not throttles.get("other.example.com")
+    assert throttles.get("example.com").max_concurrency == 3
@@ -0,0 +1,27 @@
+import os
+import pytest
+from pysrc.utils.process_pool import ProcessPool
+from pysrc.scraper.processing import compute_min_hashes, compute_similarity
+
+HTML = b"<html><body><h1>Process pool</h1><p>Signature computed in a worker</p></body></html>"
+
+@pytest.mark.asyncio
+async def test_in_process_execution():
+    pool = ProcessPool(max_workers=0)
+    assert pool.in_process
+    assert await pool.run(pow, 2, 10) == 1024
+    assert await pool.run(os.getpid) == os.getpid()
+
+@pytest.mark.asyncio
+async def test_worker_execution_matches_in_process():
+    pool = ProcessPool(max_workers=2, max_tasks_per_child=1)
+    try:
+        assert await pool.run(os.getpid) != os.getpid()
+        # seeded registry hashers give identical signatures in every process
+        assert await pool.run(compute_min_hashes, HTML) == compute_min_hashes(HTML)
+        assert await pool.run(compute_similarity, HTML, HTML) == 1.0
+    finally:
+        pool.shutdown()
+
+def test_default_worker_count():
+    assert ProcessPool().max_workers == (os.cpu_count() or 1)
@@ -0,0 +1,41 @@
+from pysrc.scraper.minhash import MinHasher
+from pysrc.scraper.minhash_registry import MinHashRegistry
+from pysrc.scraper.processing import content_hash, process_page, compute_min_hashes
+
+PAGE = "<html><head><script>var nonce = '{nonce}';</script></head><body><p>Rates stay unchanged{suffix}</p></body></html>"
+
+def make_page(nonce: str = "a1", suffix: str = "") -> bytes:
+    return PAGE.format(nonce=nonce, suffix=suffix).encode("utf-8")
+
+def test_content_hash():
+    assert content_hash(make_page()) == content_hash(make_page())
+    assert content_hash(make_page()) != content_hash(make_page(nonce="b2"))
+    assert content_hash(None) == content_hash(b"")
+    assert len(content_hash(make_page())) == 32
+
+def test_process_page_stops_at_same_text():
+    processed_page = process_page(make_page())
+    assert processed_page.min_hashes == compute_min_hashes(make_page())
+
+    # only the script changed, the normalized text hash matches
+    unchanged_page = process_page(make_page(nonce="b2"), known_text_hash=processed_page.text_hash)
+    assert unchanged_page.text_hash == processed_page.text_hash
+    assert unchanged_page.min_hashes is None
+    assert unchanged_page.article_text is None
+
+    changed_page = process_page(make_page(suffix=" for now"), known_text_hash=processed_page.text_hash)
+    assert changed_page.text_hash != processed_page.text_hash
+    assert changed_page.min_hashes is not None
+
+def test_article_signature_ignores_site_chrome():
+    paragraphs = "".join(f"<p>Paragraph {i} of the syndicated story about the rate decision and what it means for savers.</p>" for i in range(6))
+    first = f"<html><body><nav>Home | World | Sport</nav><article>{paragraphs}</article><footer>First Daily</footer></body></html>"
+    second = f"<html><body><nav>News | Opinion | Weather | Puzzles</nav><article>{paragraphs}</article><footer>Second Gazette</footer></body></html>"
+
+    min_hasher = MinHashRegistry.get("default")
+    first_signature = min_hasher.decode_signature(process_page(first.encode()).min_hashes["article"])
+    second_signature = min_hasher.decode_signature(process_page(second.encode()).min_hashes["article"])
+    assert first_signature is not None and second_signature is not None
+    assert MinHasher.estimate_signature_similarity(first_signature, second_signature) == 1.0
+    # pages without an article are marked, never banded on their chrome
+    assert process_page(b"<html><body><nav>Home</nav></body></html>").min_hashes["article"] == ""
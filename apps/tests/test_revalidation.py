@@ -0,0 +1,29 @@
+import pytest
+from pysrc.scraper.revalidation import RevalidationHeaders, RevalidationStats, get_header
+
+def test_to_request_headers():
+    assert RevalidationHeaders('"abc"', "Wed, 21 Oct 2015 07:28:00 GMT").to_request_headers() == {
+        "If-None-Match": '"abc"',
+        "If-Modified-Since": "Wed, 21 Oct 2015 07:28:00 GMT",
+    }
+    assert RevalidationHeaders(None, "Wed, 21 Oct 2015 07:28:00 GMT").to_request_headers() == {
+        "If-Modified-Since": "Wed, 21 Oct 2015 07:28:00 GMT",
+    }
+    assert RevalidationHeaders("", None).to_request_headers() == {}
+
+def test_get_header():
+    headers = {"ETag": '"abc"', "last-modified": "Wed, 21 Oct 2015 07:28:00 GMT"}
+    assert get_header(headers, "etag") == '"abc"'
+    assert get_header(headers, "Last-Modified") == "Wed, 21 Oct 2015 07:28:00 GMT"
+    assert get_header(headers, "Content-Type") is None
+    assert get_header(None, "ETag") is None
+
+def test_seconds_saved():
+    assert RevalidationStats(not_modified_count=3).seconds_saved == 0.0
+
+    stats = RevalidationStats(not_modified_count=4, download_count=2, download_seconds=2.0, not_modified_seconds=1.0)
+    assert stats.seconds_saved == pytest.approx(3.0)
+
+    # slow 304s never report negative savings
+    stats = RevalidationStats(not_modified_count=1, download_count=1, download_seconds=0.1, not_modified_seconds=0.5)
+    assert stats.seconds_saved == 0.0
@@ -0,0 +1,189 @@
+import asyncio
+import json
+import os
+import pytest
+import pytest_asyncio
+from aiohttp import web
+from pysrc.dfs.storage import CHUNK_ALIGNMENT, AsyncStorage, StorageException
+
+class FakeStorage:
+    """The parts of the Cloud Storage JSON api the client uses, with injected failures."""
+
+    def __init__(self) -> None:
+        self.objects: dict[str, tuple[bytes, int]] = {}
+        self.acls: dict[str, str] = {}
+        self.uploads: dict[str, dict] = {}
+        self.failures = 0
+        self.partial_chunks = 0
+        self.chunk_failures = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.latency_seconds = 0.0
+        self.generation = 0
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_post("/upload/storage/v1/b/{bucket}/o", self.upload)
+        app.router.add_put("/upload/session/{id}", self.upload_chunk)
+        app.router.add_get("/storage/v1/b/{bucket}/o/{name:.+}", self.get)
+        return app
+
+    async def _enter(self) -> web.Response | None:
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(self.latency_seconds)
+        self.in_flight -= 1
+        if self.failures:
+            self.failures -= 1
+            return web.Response(status=503)
+        return None
+
+    def _store(self, name: str, data: bytes, acl: str) -> int:
+        self.generation += 1
+        self.objects[name] = (data, self.generation)
+        self.acls[name] = acl
+        return self.generation
+
+    async def upload(self, request: web.Request) -> web.Response:
+        failure = await self._enter()
+        if failure:
+            return failure
+        body = await request.read()
+        if request.query["uploadType"] == "resumable":
+            upload_id = str(len(self.uploads))
+            self.uploads[upload_id] = {"metadata": json.loads(body), "data": b"", "acl": request.query["predefinedAcl"]}
+            return web.Response(headers={"Location": f"{request.scheme}://{request.host}/upload/session/{upload_id}"})
+        boundary = request.headers["Content-Type"].split("boundary=")[1].encode()
+        parts = body.split(b"--" + boundary)
+        metadata = json.loads(parts[1].split(b"\r\n\r\n", 1)[1].rstrip(b"\r\n"))
+        data = parts[2].split(b"\r\n\r\n", 1)[1][:-2]
+        generation = self._store(metadata["name"], data, request.query["predefinedAcl"])
+        return web.json_response({"name": metadata["name"], "generation": str(generation)})
+
+    async def upload_chunk(self, request: web.Request) -> web.Response:
+        failure = await self._enter()
+        if failure:
+            return failure
+        upload = self.uploads[request.match_info["id"]]
+        chunk = await request.read()
+        if self.chunk_failures:
+            self.chunk_failures -= 1
+            return web.Response(status=503)
+        content_range = request.headers["Content-Range"].removeprefix("bytes ")
+        byte_range, total = content_range.split("/")
+        if byte_range != "*":
+            start = int(byte_range.split("-")[0])
+            assert start == len(upload["data"])
+            if self.partial_chunks:
+                # the server persisted only part of the chunk
+                self.partial_chunks -= 1
+                chunk = chunk[:CHUNK_ALIGNMENT // 2]
+            upload["data"] += chunk
+        if len(upload["data"]) == int(total):
+            generation = self._store(upload["metadata"]["name"], upload["data"], upload["acl"])
+            return web.json_response({"generation": str(generation)})
+        headers = {"Range": f"bytes=0-{len(upload['data']) - 1}"} if upload["data"] else {}
+        return web.Response(status=308, headers=headers)
+
+    async def get(self, request: web.Request) -> web.Response:
+        failure = await self._enter()
+        if failure:
+            return failure
+        stored = self.objects.get(request.match_info["name"])
+        if stored is None:
+            return web.Response(status=404)
+        data, generation = stored
+        if "ifGenerationMatch" in request.query and int(request.query["ifGenerationMatch"]) != generation:
+            return web.Response(status=412)
+        if request.query.get("alt") == "media":
+            return web.Response(body=data)
+        return web.json_response({"generation": str(generation)})
+
+@pytest_asyncio.fixture
+async def fake_storage():
+    fake = FakeStorage()
+    runner = web.AppRunner(fake.app())
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]  # type: ignore
+    storage = AsyncStorage("bucket", base_url=f"http://127.0.0.1:{port}", concurrency=4, backoff_seconds=0.001, chunk_bytes=CHUNK_ALIGNMENT)
+    yield fake, storage
+    await storage.close()
+    await runner.cleanup()
+
+@pytest.mark.asyncio
+async def test_upload_sets_acl_and_returns_generation(fake_storage):
+    fake, storage = fake_storage
+
+    url, generation = await storage.upload_buffer_generation("prod_pages", "a b", b"content", "text/html")
+
+    assert url == "https://storage.googleapis.com/bucket/prod_pages/a%20b"
+    assert fake.acls["prod_pages/a b"] == "publicRead"
+    assert await storage.get_generation("prod_pages", "a b") == generation
+    assert await storage.download_buffer("prod_pages", "a b", generation) == b"content"
+    assert await storage.get_generation("prod_pages", "missing") is None
+    # one request per upload, no separate acl call
+    assert fake.generation == 1 and storage.stats.requests == 4
+
+@pytest.mark.asyncio
+async def test_retriable_failures_are_retried(fake_storage):
+    fake, storage = fake_storage
+    fake.failures = 2
+
+    await storage.upload_buffer("prod_pages", "page", b"content")
+
+    assert fake.objects["prod_pages/page"][0] == b"content"
+    assert storage.stats.retries == 2
+
+@pytest.mark.asyncio
+async def test_other_failures_are_not_retried(fake_storage):
+    fake, storage = fake_storage
+    await storage.upload_buffer("prod_pages", "page", b"first")
+    _, generation = await storage.upload_buffer_generation("prod_pages", "page", b"second")
+
+    with pytest.raises(StorageException) as e:
+        await storage.download_buffer("prod_pages", "page", generation - 1)
+
+    assert e.value.status == 412
+    assert storage.stats.retries == 0
+
+@pytest.mark.asyncio
+async def test_resumable_upload_continues_from_acknowledged_bytes(fake_storage, tmp_path):
+    fake, storage = fake_storage
+    data = os.urandom(CHUNK_ALIGNMENT * 2 + 1000)
+    local_file_path = tmp_path / "audio.mp3"
+    local_file_path.write_bytes(data)
+    fake.partial_chunks = 1
+    fake.chunk_failures = 1
+
+    url = await storage.upload_file("prod_audio", "audio.mp3", str(local_file_path))
+
+    assert url == "https://storage.googleapis.com/bucket/prod_audio/audio.mp3"
+    assert fake.objects["prod_audio/audio.mp3"][0] == data
+    assert fake.acls["prod_audio/audio.mp3"] == "publicRead"
+    assert storage.stats.retries == 1
+
+    downloaded_path = tmp_path / "downloaded.mp3"
+    assert await storage.download_file("prod_audio", "audio.mp3", str(downloaded_path)) == "gs://bucket/prod_audio/audio.mp3"
+    assert downloaded_path.read_bytes() == data
+
+@pytest.mark.asyncio
+async def test_concurrency_is_bounded(fake_storage):
+    fake, storage = fake_storage
+    fake.latency_seconds = 0.02
+
+    await asyncio.gather(*(storage.upload_buffer("prod_pages", f"page{i}", b"content") for i in range(20)))
+
+    assert len(fake.objects) == 20
+    assert 1 < fake.max_in_flight <= 4
+
+def test_session_of_a_previous_loop_is_closed():
+    storage = AsyncStorage("bucket")
+    first_session, _ = asyncio.run(storage._get_session())
+    # a job running asyncio.run once per step gets a new loop every time
+    second_session, _ = asyncio.run(storage._get_session())
+
+    assert first_session.closed and not second_session.closed
+    asyncio.run(storage.close())
+    assert second_session.closed
@@ -1,6 +1,6 @@
 from datetime import datetime
 import pytest
-from pysrc.scraper.text import extract_date_from_url
+from pysrc.scraper.text import extract_date_from_url, textify_html, TextifyBackend
 
 @pytest.mark.parametrize("url, expected", [
     # Valid dates
@@ -26,4 +26,44 @@ from pysrc.scraper.text import extract_date_from_url
 def test_extract_date_from_url(url: str, expected: datetime | None) -> None:
     """Test URL date extraction with various formats."""
     result = extract_date_from_url(url)
-    assert result == expected
\ No newline at end of file
+    assert result == expected
+
+TEXTIFY_DOCUMENTS = [
+    "",
+    "plain text no tags",
+    "<!DOCTYPE html><html><head><title>Title &amp; more</title><style>p{}</style></head>"
+    "<body><p>Hello <b>World</b>!</p><script>alert(1)</script></body></html>",
+    "<p>Unclosed <div>nested <span>text",
+    "<!-- a comment --><p>after comment</p>",
+    "<noscript>Enable JS</noscript><p>x</p>",
+    "<p>Ünïcödé ÄÖÜ straße İstanbul</p>",
+    "<svg><style>.a{}</style><text>svg text</text></svg>",
+    "<script>var s = \"</div>\";</script><p>after</p>",
+    "<p>a&nbsp;b&#169;c&#x41;</p>",
+    "<SCRIPT>UPPER</SCRIPT><P>Upper</P>",
+    "<p>1 < 2 and 3 > 2</p>",
+    "<style>unterminated",
+    "<nav><a href='/'>Home</a></nav><article><h1>Headline</h1>" + "<p>Paragraph text, with punctuation.</p>" * 200 + "</article>",
+]
+
+# markup libxml2 parses unlike html.parser, see TextifyBackend
+TEXTIFY_DIFFERING_DOCUMENTS = [
+    "<template><p>template</p></template><p>x</p>",
+    "<p>a<![CDATA[cdata text]]>b</p>",
+    "<xmp><b>xmp</b> text</xmp><p>x</p>",
+    "<plaintext><b>plain</b> rest",
+    "<textarea><b>text area</b></textarea>",
+    "<p>&notit; &copy2024 &ampx</p>",
+    "<!--unterminated comment <p>x</p>",
+]
+
+@pytest.mark.parametrize("html", TEXTIFY_DOCUMENTS)
+def test_textify_backends_are_equivalent(html: str) -> None:
+    """The lxml streaming backend matches the BeautifulSoup reference output."""
+    assert textify_html(html, TextifyBackend.LXML) == textify_html(html, TextifyBackend.BS4)
+
+@pytest.mark.parametrize("html", TEXTIFY_DIFFERING_DOCUMENTS)
+def test_textify_defaults_to_bs4(html: str) -> None:
+    """Stored text hashes keep matching, the documented lxml differences stay opt-in."""
+    assert textify_html(html) == textify_html(html, TextifyBackend.BS4)
+    assert textify_html(html, TextifyBackend.LXML) != textify_html(html, TextifyBackend.BS4)
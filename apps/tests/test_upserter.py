@@ -0,0 +1,34 @@
+import pytest
+from sqlalchemy.dialects import postgresql
+from pysrc.db.upserter import Upserter
+from pysrc.db.user import AudioContent, AudioContentState
+
+class RecordingSession:
+    def __init__(self) -> None:
+        self.statements: list = []
+
+    async def execute(self, stmt):
+        self.statements.append(stmt.compile(dialect=postgresql.dialect()))
+
+@pytest.mark.asyncio
+async def test_upsert_many_groups_rows_by_columns():
+    session = RecordingSession()
+    await Upserter[AudioContent](session).upsert_many([  # type: ignore[arg-type]
+        AudioContent(id=1, web_page_normalized_url_hash="a", state=AudioContentState.IMPORTED_NEED_SUMMARIZING, title="first"),
+        AudioContent(web_page_normalized_url_hash="b", state=AudioContentState.IMPORTED_NEED_SUMMARIZING, title="new"),
+        AudioContent(web_page_normalized_url_hash="c", state=AudioContentState.IMPORTED_NEED_SUMMARIZING, title="new"),
+        AudioContent(id=1, web_page_normalized_url_hash="a", state=AudioContentState.IMPORTED_NEED_SUMMARIZING, title="last"),
+    ])
+    assert len(session.statements) == 2
+    updates, inserts = (str(statement) for statement in session.statements)
+    assert "ON CONFLICT (id) DO UPDATE SET" in updates
+    assert "title = excluded.title" in updates
+    assert session.statements[0].params["title_m0"] == "last"
+    assert "audio_contents (web_page_normalized_url_hash, state, title)" in inserts
+    assert "title_m1" in inserts
+
+@pytest.mark.asyncio
+async def test_upsert_many_empty():
+    session = RecordingSession()
+    await Upserter[AudioContent](session).upsert_many([])  # type: ignore[arg-type]
+    assert session.statements == []
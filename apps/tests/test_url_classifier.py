@@ -0,0 +1,49 @@
+from datetime import datetime
+from pysrc.scraper.url_classifier import UrlClassifier, UrlDecision, url_shape, is_article_page
+
+def test_url_shape():
+    assert url_shape("https://a.com/tag/python?page=2") == "a.com/tag/{w}?page"
+    assert url_shape("https://a.com/tag/java") == "a.com/tag/{w}"
+    assert url_shape("https://a.com/2024/05/12/my-story") == "a.com/{n}/{n}/{n}/{slug}"
+    assert url_shape("https://a.com/news/my-story") == "a.com/news/{slug}"
+    assert url_shape("https://a.com/my-story") == "a.com/{slug}"
+    assert url_shape("https://a.com/") == "a.com/"
+    assert url_shape("https://a.com/p/3f2a9c1e-1111") == "a.com/p/{id}"
+
+def test_is_article_page():
+    assert is_article_page("Title", datetime(2024, 1, 1))
+    assert not is_article_page("Title", None)
+    assert not is_article_page(None, datetime(2024, 1, 1))
+
+def make_classifier(**kwargs) -> UrlClassifier:
+    pages = [(f"https://a.com/news/story-{i}", True) for i in range(20)]
+    pages += [(f"https://a.com/tag/topic{chr(ord('a') + i)}", False) for i in range(20)]
+    pages += [(f"https://a.com/page/{i}", i % 2 == 0) for i in range(20)]
+    pages += [(f"https://a.com/about/team{chr(ord('a') + i)}", False) for i in range(3)]
+    return UrlClassifier.from_pages(pages, **kwargs)
+
+def test_classify():
+    classifier = make_classifier()
+    assert classifier.classify("https://a.com/news/another-story") == UrlDecision.PRIORITY
+    assert classifier.classify("https://a.com/tag/music") == UrlDecision.SKIP
+    assert classifier.classify("https://a.com/page/100") == UrlDecision.PRIORITY
+    # too few samples to decide
+    assert classifier.classify("https://a.com/about/history") == UrlDecision.FETCH
+    assert classifier.classify("https://b.com/tag/music") == UrlDecision.FETCH
+
+def test_decide_explores_skipped_clusters():
+    classifier = make_classifier(explore_every=5)
+    decisions = [classifier.decide(f"https://a.com/tag/new{chr(ord('a') + i)}") for i in range(10)]
+    assert decisions.count(UrlDecision.FETCH) == 2
+    assert decisions[0] == UrlDecision.FETCH
+    assert classifier.skipped_count == 8
+    assert classifier.explored_count == 2
+    classifier.decide("https://a.com/news/yet-another-story")
+    assert classifier.prioritized_count == 1
+
+def test_observe_updates_clusters():
+    classifier = UrlClassifier(min_pages=2)
+    assert classifier.classify("https://a.com/news/x-1") == UrlDecision.FETCH
+    classifier.observe("https://a.com/news/x-2", True)
+    classifier.observe("https://a.com/news/x-3", True)
+    assert classifier.classify("https://a.com/news/x-1") == UrlDecision.PRIORITY
@@ -0,0 +1,37 @@
+from datetime import datetime, timedelta
+from pyminiscraper.url import normalized_url_hash
+from pysrc.scraper.url_index import UrlIndex, UrlIndexEntry, url_hash_key
+
+REQUESTED_AT = datetime(2025, 3, 5, 12, 30)
+
+def test_url_hash_key():
+    url_hash = normalized_url_hash("https://example.com/news/story")
+    assert url_hash_key(url_hash) == url_hash_key(url_hash)
+    assert url_hash_key(url_hash) != url_hash_key(normalized_url_hash("https://example.com/news/other-story"))
+
+def test_lookup():
+    pages = [(normalized_url_hash(f"https://example.com/news/{i}"), REQUESTED_AT + timedelta(hours=i), i % 2 == 0) for i in range(100)]
+    pages.append((normalized_url_hash("https://example.com/never-requested"), None, False))
+    url_index = UrlIndex(pages)
+    assert len(url_index) == 101
+    assert url_index.nbytes == 101 * 17
+
+    assert url_index.lookup(normalized_url_hash("https://example.com/news/7")) == UrlIndexEntry(REQUESTED_AT + timedelta(hours=7), False)
+    assert url_index.lookup(normalized_url_hash("https://example.com/news/42")) == UrlIndexEntry(REQUESTED_AT + timedelta(hours=42), True)
+    assert url_index.lookup(normalized_url_hash("https://example.com/never-requested")) == UrlIndexEntry(None, False)
+    assert url_index.lookup(normalized_url_hash("https://example.com/unknown")) is None
+    assert UrlIndex().lookup(normalized_url_hash("https://example.com/unknown")) is None
+
+def test_record():
+    url_hash = normalized_url_hash("https://example.com/news/1")
+    url_index = UrlIndex([(url_hash, REQUESTED_AT, False)])
+    url_index.record(url_hash, REQUESTED_AT + timedelta(days=1), True)
+    url_index.record(normalized_url_hash("https://example.com/news/2"), REQUESTED_AT, False)
+    assert url_index.lookup(url_hash) == UrlIndexEntry(REQUESTED_AT + timedelta(days=1), True)
+    assert url_index.lookup(normalized_url_hash("https://example.com/news/2")) == UrlIndexEntry(REQUESTED_AT, False)
+
+def test_is_stale():
+    entry = UrlIndexEntry(REQUESTED_AT, False)
+    assert not entry.is_stale(60 * 60, now=REQUESTED_AT + timedelta(minutes=30))
+    assert entry.is_stale(60 * 60, now=REQUESTED_AT + timedelta(hours=2))
+    assert not UrlIndexEntry(None, False).is_stale(0)
@@ -57,6 +57,7 @@ async def main() -> None:
         parallel.submit_task(process_web_page_summary(normalized_url))
         
     await parallel.wait_all()
+    await Jobs.shutdown()
         
 
       